@@ -5,9 +5,6 @@ application or as a web application built on top of a Tornado server.
 """
 import argparse
 
-from src.makeSamples import MakeSamples
-import src.server as server
-
 desc = "Colorgorical is a color palette design assistance tools to make\
         aesthetically pleasing and legible categorical color palettes for\
         information visualization."
@@ -17,20 +14,83 @@ parser.add_argument("--server", action="store_true",
     help="Flag marking that Colorgorical should be launched as a web server.")
 
 parser.add_argument("--makeSamples", action="store_true",
-    help="Flag to create samples of 66 unique Colorgorical settings output to `samples/`.")
+    help="Flag to create samples of 66 unique Colorgorical settings output to `samples/`. Interrupted runs resume from a checkpoint.")
+
+parser.add_argument("--precomputePairScores", action="store_true",
+    help="Flag to precompute the pairwise scores of all colors to `src/data/pairScores`.")
+
+parser.add_argument("--pairScoreType", default="float32",
+    choices=["float32", "float16", "uint16"],
+    help="How precomputed pair scores are stored on disk.")
+
+parser.add_argument("--precomputeStartingColors", action="store_true",
+    help="Flag to precompute the starting colors of the default filter settings to `src/data/startingColors.npz`.")
 
 parser.add_argument("--port",
     help="The port to start the Colorgorical server on", default=8888)
 
+parser.add_argument("--numPalettes", type=int, default=10,
+    help="The number of candidate palettes the server makes per palette request.")
+
+parser.add_argument("--timeBudget", type=float, default=None,
+    help="The most seconds the server makes candidate palettes for per palette request (default: no limit).")
+
+parser.add_argument("--processes", type=int, default=0,
+    help="The number of worker processes the server makes candidate palettes in (default: none), or that samples are made in (default: the CPU count).")
+
+parser.add_argument("--scoreThreads", type=int, default=1,
+    help="The number of threads to split large scoring inputs over.")
+
+parser.add_argument("--executor", default="thread",
+    choices=["thread", "process"],
+    help="Whether the server makes and scores palettes in threads or in worker processes.")
+
+parser.add_argument("--executorWorkers", type=int, default=None,
+    help="The number of palette requests the server handles concurrently (default: the CPU count).")
+
+parser.add_argument("--production", action="store_true",
+    help="Flag to serve with compiled templates and cached static files rather than in debug mode.")
+
+parser.add_argument("--benchmark", nargs="?", const="all",
+    help="Run a benchmark by name from `src/benchmark.py` (default: all).")
+
+parser.add_argument("--verify", nargs="?", const="all",
+    help="Run a parity check by name from `src/verify.py` (default: all).")
+
 args = parser.parse_args()
 
+# Each mode imports only what it needs, which keeps start up fast (e.g., the
+# server never imports matplotlib). `--benchmark startup` measures it.
 if args.server:
-    s = server.ColorgoricalServer()
+    import src.server as server
+    s = server.ColorgoricalServer(numPalettes=args.numPalettes,
+        processes=args.processes, scoreThreads=args.scoreThreads,
+        executorType=args.executor, executorWorkers=args.executorWorkers,
+        production=args.production, timeBudget=args.timeBudget)
     portNumber = args.port if args.port else 8888
     s.start(port=portNumber)
 
+elif args.precomputePairScores:
+    import src.precompute as precompute
+    precompute.precomputePairScores(storageType=args.pairScoreType,
+        threads=args.scoreThreads)
+
+elif args.precomputeStartingColors:
+    import src.precompute as precompute
+    precompute.precomputeStartingColors()
+
+elif args.benchmark:
+    import src.benchmark as benchmark
+    benchmark.run(args.benchmark)
+
+elif args.verify:
+    import src.verify as verify
+    if not verify.run(args.verify):
+        raise SystemExit(1)
+
 elif args.makeSamples:
-    ms = MakeSamples()
+    from src.makeSamples import MakeSamples
+    ms = MakeSamples(processes=args.processes if args.processes > 0 else None)
     if ms.savedResultsExist() == False:
         print 'Making palettes'
         ms.make()
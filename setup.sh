@@ -1,3 +1,5 @@
 #!/bin/bash
+set -e
 cd src/model
+python buildTables.py
 python setup.py build_ext --inplace
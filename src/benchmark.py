@@ -0,0 +1,447 @@
+"""Benchmarks of Colorgorical's performance-sensitive code paths.
+
+Each benchmark prints the timings it measured and can be run with
+`python run.py --benchmark <name>`.
+"""
+from collections import OrderedDict
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import timeit
+import urllib2
+import numpy as np
+
+from model import model
+from model import neighborIndex
+from model import parallel
+from model import numpyColorgorical as npc
+from model.util import convert
+from model.util import jnd
+
+
+def bestTime(fn, repeat=5, number=1):
+    """The fastest time (in seconds) of a single call to fn over repeat runs."""
+    return min(timeit.repeat(fn, repeat=repeat, number=number)) / number
+
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+
+def printTimes(title, times):
+    """Print the timings of a benchmark relative to the first one."""
+    print title
+    baseline = times.values()[0]
+    for name, seconds in times.items():
+        print '  %-40s %10.3f ms  (%.2fx)' % (name, seconds * 1000,
+            baseline / seconds)
+
+
+def benchmarkMetricScoring(repeat=5):
+    """Benchmark metric-selective scoring against scoring all metrics.
+
+    Times the pair scoring of `Model.make` (every color against a palette,
+    when no pair score table is available) and the pair preference scoring of
+    `Model.computeStartingColors` with `npc.score`, which always computes all
+    five scores, and with the metric-selective ufuncs.
+    """
+    colorgorical = model.Model(pairScorePath='', startingColorsPath='')
+    labs = colorgorical.colorSpaces[:,:3]
+
+    palette = labs[np.random.RandomState(0).choice(labs.shape[0], 5)]
+    makePairs = np.ascontiguousarray(np.hstack((
+        np.repeat(labs, palette.shape[0], axis=0),
+        np.tile(palette, (labs.shape[0], 1)))))
+
+    printTimes('make: %d pairs' % makePairs.shape[0], OrderedDict([
+        ('npc.score', bestTime(lambda: npc.score(makePairs), repeat)),
+        ('npc.scorePair', bestTime(lambda: npc.scorePair(makePairs), repeat))
+    ]))
+
+    intervals = model.CIE_LAB_STARTING_SUBSPACE_INTERVALS
+    isInterval = np.all([np.in1d(labs[:,i], intervals[axis])
+        for i, axis in enumerate(["L", "a", "b"])], axis=0)
+    isRGB = np.all(np.logical_and(colorgorical.colorSpaces[:,6:9] >= 0,
+        colorgorical.colorSpaces[:,6:9] <= 255), axis=1)
+    startLabs = labs[np.logical_and(isInterval, isRGB)]
+    idxs = np.transpose(np.array(np.triu_indices(len(startLabs), 1)))
+    startPairs = np.ascontiguousarray(startLabs[idxs,].reshape((-1, 6)))
+
+    printTimes('computeStartingColors: %d pairs' % startPairs.shape[0],
+        OrderedDict([
+            ('npc.score', bestTime(lambda: npc.score(startPairs), repeat)),
+            ('npc.pairPreference',
+                bestTime(lambda: npc.pairPreference(startPairs), repeat))
+        ]))
+
+    nuColors = np.ascontiguousarray(labs)
+    nuPairs = np.ascontiguousarray(np.hstack((labs, labs)))
+    printTimes('nameUniqueness: %d colors' % labs.shape[0], OrderedDict([
+        ('npc.score', bestTime(lambda: npc.score(nuPairs), repeat)),
+        ('npc.nameUniqueness',
+            bestTime(lambda: npc.nameUniqueness(nuColors), repeat))
+    ]))
+
+
+def benchmarkCandidateScoring(repeat=5, paletteSizes=(2, 5, 10)):
+    """Benchmark scoring every candidate color against a palette.
+
+    Compares scoring the tiled candidate x palette pairs and taking the minimum
+    of each candidate's scores with `npc.minScores`, which never materializes
+    the pairs, with name difference as a matrix product of name term vectors,
+    and with pair score table lookups when a table has been built.
+    """
+    colorgorical = model.Model(startingColorsPath='')
+    labs = np.ascontiguousarray(colorgorical.colorSpaces[:,:3])
+    n = labs.shape[0]
+
+    for k in paletteSizes:
+        palette = labs[np.random.RandomState(k).choice(n, k)]
+
+        def scoreTiled():
+            pairs = np.hstack((np.repeat(labs, k, axis=0),
+                np.tile(palette, (n, 1))))
+            scores = npc.scorePair(pairs)[:,0:3]
+            return scores.reshape((n, k, 3)).min(axis=1)
+
+        paletteIdx = colorgorical.getColorIndexes(palette)
+        def scoreMatrixProduct():
+            scores = npc.minScoresExceptNameDifference(labs, palette)
+            scores[:,1] = colorgorical.nameDifferences(np.arange(n),
+                paletteIdx).min(axis=1)
+            return scores
+
+        times = OrderedDict([
+            ('tiled npc.scorePair', bestTime(scoreTiled, repeat)),
+            ('npc.minScores',
+                bestTime(lambda: npc.minScores(labs, palette), repeat)),
+            ('minScores + name difference product',
+                bestTime(scoreMatrixProduct, repeat))
+        ])
+        if colorgorical.pairScores is not None:
+            candidateIdx = np.arange(n)
+            def scoreTable():
+                scores = [colorgorical.pairScores.score(candidateIdx, pi)
+                    for pi in paletteIdx]
+                return np.minimum.reduce(scores)
+            times['pair score table'] = bestTime(scoreTable, repeat)
+
+        printTimes('%d candidates x %d palette colors' % (n, k), times)
+
+
+def benchmarkCandidatePalettes(repeat=3, palSize=8,
+        numPalettes=(10, 50, 200)):
+    """Benchmark growing more candidate palettes together.
+
+    Times `makePalettes` for each number of palettes, with and without the
+    pair score table, in milliseconds per palette; batching shares the
+    candidate space and scores the colors palettes have in common once.
+    """
+    for title, pairScorePath in [('pair score table', None),
+            ('no pair score table', '')]:
+        kwargs = {} if pairScorePath is None else \
+            dict(pairScorePath=pairScorePath)
+        colorgorical = model.Model(startingColorsPath='', **kwargs)
+        if pairScorePath is None and colorgorical.pairScores is None:
+            continue
+
+        times = OrderedDict()
+        for num in numPalettes:
+            def makePalettes():
+                colorgorical.makePalettes(palSize, num,
+                    randomState=np.random.RandomState(0))
+            times['%d palettes (per palette)' % num] = \
+                bestTime(makePalettes, repeat) / num
+        printTimes('%s, %d colors' % (title, palSize), times)
+
+
+def benchmarkPaletteScoring(repeat=3, numPalettes=2000, sizes=(3, 12)):
+    """Benchmark scoring a batch of palettes one by one and all at once.
+
+    Compares calling `Model.scorePalette` for every palette with a single
+    `Model.scorePalettes` call, with and without a pair score table.
+    """
+    for pairScorePath in ['', model.PAIR_SCORES_PATH]:
+        colorgorical = model.Model(pairScorePath=pairScorePath,
+            startingColorsPath='')
+        labs = colorgorical.colorSpaces[:,:3]
+        randomState = np.random.RandomState(0)
+        palettes = [labs[randomState.choice(labs.shape[0], size)] for size in
+            randomState.randint(sizes[0], sizes[1] + 1, size=numPalettes)]
+
+        printTimes('%d palettes of %d-%d colors, %s' % (numPalettes,
+            sizes[0], sizes[1], 'pair score table'
+            if colorgorical.pairScores is not None else 'no pair score table'),
+            OrderedDict([
+                ('scorePalette per palette', bestTime(lambda:
+                    [colorgorical.scorePalette(p) for p in palettes], repeat)),
+                ('scorePalettes', bestTime(lambda:
+                    colorgorical.scorePalettes(palettes), repeat))
+            ]))
+
+
+def benchmarkConversion(repeat=5):
+    """Benchmark converting the whole color space between CIE Lab and sRGB.
+
+    Compares converting one color at a time, as the scalar conversions are
+    called per color, with a single call of the array conversions.
+    """
+    colorgorical = model.Model(pairScorePath='', startingColorsPath='')
+    labs = colorgorical.colorSpaces[:,:3]
+    rgbs = convert.convertLabsToRGBs(labs)
+
+    printTimes('CIE Lab -> sRGB: %d colors' % labs.shape[0], OrderedDict([
+        ('convertLabToRGB per color',
+            bestTime(lambda: [convert.convertLabToRGB(c) for c in labs],
+                repeat)),
+        ('convertLabsToRGBs',
+            bestTime(lambda: convert.convertLabsToRGBs(labs), repeat))
+    ]))
+    printTimes('sRGB -> CIE Lab: %d colors' % rgbs.shape[0], OrderedDict([
+        ('convertRGBToLab per color',
+            bestTime(lambda: [convert.convertRGBToLab(c) for c in rgbs],
+                repeat)),
+        ('convertRGBsToLabs',
+            bestTime(lambda: convert.convertRGBsToLabs(rgbs), repeat))
+    ]))
+
+
+def benchmarkFiltering(repeat=20):
+    """Benchmark filtering the color space into candidate colors.
+
+    Compares comparing every color against each filter, as `makePalettes`
+    did, with the bitset `FilterIndex`.
+    """
+    colorgorical = model.Model(pairScorePath='', startingColorsPath='')
+    colorSpaces = colorgorical.colorSpaces
+
+    for hueFilters, lightnessRange in [([], (25.01, 85)),
+            ([[0, 90], [200, 300]], (25.01, 85)),
+            ([[10.5, 20.5], [45, 60], [100, 140], [350, 360]], (40.01, 60))]:
+        hueRanges = convert.convertHueRanges(hueFilters)
+
+        def filterMasks():
+            isCandidate = np.logical_and(colorgorical.isRGB,
+                np.logical_not(colorgorical.isUgly))
+            if hueRanges.size > 0:
+                okHue = [np.logical_and(colorSpaces[:,3] >= low,
+                    colorSpaces[:,3] <= high) for low, high in hueRanges]
+                isCandidate &= np.any(np.array(okHue), axis=0)
+            isCandidate &= np.logical_not(np.logical_or(
+                colorSpaces[:,0] < lightnessRange[0],
+                colorSpaces[:,0] > lightnessRange[1]))
+            return np.flatnonzero(isCandidate)
+
+        printTimes('%d hue ranges, lightness %s' % (len(hueRanges),
+            lightnessRange), OrderedDict([
+                ('masks', bestTime(filterMasks, repeat)),
+                ('filter index', bestTime(lambda:
+                    colorgorical.filterIndex.select(hueRanges, lightnessRange,
+                        ["isRGB", "isNotUgly"]), repeat))
+            ]))
+
+
+def benchmarkPruning(repeat=20, numPalettes=10):
+    """Benchmark pruning candidates that are not noticeably different.
+
+    Compares comparing each palette's new color against every candidate, as
+    `makePalettes` did, with gathering its lattice neighbors from a
+    `NeighborIndex`, for shrinking candidate sets.
+    """
+    colorgorical = model.Model(pairScorePath='', startingColorsPath='')
+    ndL, ndA, ndB = [d * 3 for d in jnd.cieLabJND(1.0 / 3.0)]
+    randomState = np.random.RandomState(0)
+
+    for fraction in [1.0, 0.25, 0.05]:
+        colorIdx = np.flatnonzero(
+            randomState.random_sample(colorgorical.labs.shape[0]) < fraction)
+        candidates = colorgorical.labs[colorIdx]
+        choiceIdx = randomState.choice(colorIdx.shape[0], numPalettes)
+        choices = candidates[choiceIdx]
+        isAlive = np.ones((numPalettes, colorIdx.shape[0]), dtype=bool)
+        neighbors = neighborIndex.NeighborIndex(
+            colorgorical.latticeCoordinates[colorIdx],
+            model.CIE_LAB_LATTICE_SHAPE, model.CIE_LAB_LATTICE_STEP,
+            (ndL, ndA, ndB))
+        rowIdx = np.arange(numPalettes)
+
+        def pruneMasks():
+            isAlive[:] &= np.logical_or(
+                np.absolute(candidates[:,0] - choices[:,0:1]) >= ndL,
+                np.logical_or(
+                    np.absolute(candidates[:,1] - choices[:,1:2]) >= ndA,
+                    np.absolute(candidates[:,2] - choices[:,2:3]) >= ndB))
+
+        def pruneNeighbors():
+            rows, positions = neighbors.getNeighbors(
+                neighbors.cells[choiceIdx])
+            isAlive[rowIdx[rows], positions] = False
+
+        printTimes('%d candidates, %d palettes' % (colorIdx.shape[0],
+            numPalettes), OrderedDict([
+                ('compare every candidate', bestTime(pruneMasks, repeat)),
+                ('lattice neighbors', bestTime(pruneNeighbors, repeat))
+            ]))
+
+
+def benchmarkBranchAndBound(numPalettes=40, sizes=(8, 12), seeds=5):
+    """Benchmark abandoning losing candidate palettes.
+
+    Compares making every candidate palette of the palette pool's tasks in
+    full, as `makePreferablePalette` did, with abandoning those that fall
+    behind the best complete palette, and with growing every palette in one
+    task, as `makePreferablePalette` does without the pool, in candidate
+    palettes made per second.
+    """
+    colorgorical = model.Model(startingColorsPath='')
+    kwargs = dict(hueFilters=[], lightnessRange=[25, 85], onlyUseRGB=True,
+        noticeableDifferenceAngle=1.0/3.0, startPalette=[],
+        weights={"ciede2000": 1, "nameDifference": 1, "nameUniqueness": 0,
+            "pairPreference": 1})
+
+    for palSize in sizes:
+        def makeComplete():
+            for seed in xrange(seeds):
+                tasks = parallel.makeTasks(palSize, numPalettes, seed, kwargs)
+                palettes = np.array([p for task in tasks
+                    for p in parallel.runTask(colorgorical, task)])
+                palettes[np.argmax(
+                    colorgorical.lowestPairPreferences(palettes))]
+
+        def makeAbandoning():
+            for seed in xrange(seeds):
+                tasks = parallel.makeTasks(palSize, numPalettes, seed, kwargs)
+                colorgorical.runPaletteTasks(tasks, palSize)
+
+        def makeOneTask():
+            for seed in xrange(seeds):
+                colorgorical.makePreferablePalette(palSize, numPalettes,
+                    seed=seed)
+
+        print '%d colors, %d candidate palettes' % (palSize, numPalettes)
+        baseline = None
+        for name, fn in [('complete palettes', makeComplete),
+                ('abandon losing palettes', makeAbandoning),
+                ('one task', makeOneTask)]:
+            rate = seeds * numPalettes / bestTime(fn, 3)
+            baseline = baseline or rate
+            print '  %-40s %10.1f candidates/s  (%.2fx)' % (name, rate,
+                rate / baseline)
+
+
+# Run in a fresh interpreter so that nothing is imported or cached yet. Prints
+# the seconds each cold start stage took as a JSON object.
+MODEL_STARTUP_SCRIPT = """
+import json, time
+from collections import OrderedDict
+start = time.time()
+from src.model import model
+imported = time.time()
+colorgorical = model.Model()
+constructed = time.time()
+colorgorical.makePreferablePalette(5, 10, seed=0)
+print json.dumps(OrderedDict([
+    ('import model', imported - start),
+    ('Model()', constructed - imported),
+    ('first palette', time.time() - constructed)
+]))
+"""
+
+
+def freePort():
+    """An unused local TCP port."""
+    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    s.bind(('localhost', 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+def timeServerStartup(timeout=120):
+    """Time a cold `run.py --server` until it serves its first requests.
+
+    Returns:
+        times (OrderedDict): the seconds from launching the process until the
+            main page is served, and then until the first palette is made.
+    """
+    port = freePort()
+    url = 'http://localhost:%d' % port
+    devnull = open(os.devnull, 'w')
+    start = time.time()
+    server = subprocess.Popen([sys.executable, 'run.py', '--server', '--port',
+        str(port)], cwd=ROOT_PATH, stdout=devnull, stderr=devnull)
+    try:
+        while True:
+            if server.poll() is not None:
+                raise RuntimeError("run.py --server exited while starting")
+            if time.time() - start > timeout:
+                raise RuntimeError("run.py --server did not start in time")
+            try:
+                urllib2.urlopen(url + '/').read()
+                break
+            except (urllib2.URLError, socket.error):
+                time.sleep(0.01)
+        served = time.time()
+
+        urllib2.urlopen(url + '/color/makePalette',
+            json.dumps(dict(paletteSize=5))).read()
+        return OrderedDict([
+            ('run.py --server: first page', served - start),
+            ('run.py --server: first palette', time.time() - served)
+        ])
+    finally:
+        server.kill()
+        server.wait()
+        devnull.close()
+
+
+def benchmarkStartup(repeat=3):
+    """Benchmark cold start latency of the model and the web server.
+
+    Autoscaled server instances and short-lived batch workers pay these costs
+    on every launch. Each repeat starts a fresh Python process, reports the
+    fastest time of every stage, and relies on the color space and lookup
+    tables already being built (and in the page cache) as they are in
+    production.
+    """
+    def timeModelStartup():
+        output = subprocess.check_output([sys.executable, '-c',
+            MODEL_STARTUP_SCRIPT], cwd=ROOT_PATH)
+        return json.loads(output.strip().splitlines()[-1],
+            object_pairs_hook=OrderedDict)
+
+    def timeInterpreter():
+        start = time.time()
+        subprocess.check_call([sys.executable, '-c', 'pass'])
+        return OrderedDict([('python -c pass', time.time() - start)])
+
+    for title, timeStartup in [('Python interpreter', timeInterpreter),
+            ('model module', timeModelStartup),
+            ('web server', timeServerStartup)]:
+        runs = [timeStartup() for i in range(repeat)]
+        print title
+        for stage in runs[0].keys():
+            print '  %-40s %10.3f ms' % (stage,
+                min(run[stage] for run in runs) * 1000)
+
+
+BENCHMARKS = OrderedDict([
+    ('metricScoring', benchmarkMetricScoring),
+    ('candidateScoring', benchmarkCandidateScoring),
+    ('candidatePalettes', benchmarkCandidatePalettes),
+    ('paletteScoring', benchmarkPaletteScoring),
+    ('conversion', benchmarkConversion),
+    ('filtering', benchmarkFiltering),
+    ('pruning', benchmarkPruning),
+    ('branchAndBound', benchmarkBranchAndBound),
+    ('startup', benchmarkStartup),
+])
+
+
+def run(name):
+    """Run a benchmark by name, or all benchmarks if name is 'all'."""
+    names = BENCHMARKS.keys() if name == 'all' else [name]
+    for benchmarkName in names:
+        BENCHMARKS[benchmarkName]()
@@ -0,0 +1,157 @@
+"""Handler for serving large, immutable data files to the client."""
+import gzip
+import hashlib
+import os
+from StringIO import StringIO
+import tornado.web as web
+
+# brotli is optional; assets are only served gzipped or uncompressed without it
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ASSET_URL_PREFIX = '/data/'
+
+# Assets are named after their content, so a cached copy never goes stale
+ASSET_MAX_AGE = 365 * 24 * 60 * 60
+
+BROTLI_QUALITY = 9
+
+# Encodings to serve, best first, when the client accepts several equally;
+# None is the uncompressed asset
+ENCODING_PREFERENCE = ['br', 'gzip', None]
+
+
+class Asset():
+    """A data file with its compressed variants, named after its content.
+
+    Attributes:
+        fileName: the content-hashed name that the asset is served under,
+            e.g., `map-us-counties.<hash>.json`.
+        url: the path of the asset on the server.
+        contentType: the MIME type of the asset.
+        etag: the quoted content hash of the asset.
+        bodies: the asset's bytes keyed by content encoding, where None is
+            the uncompressed asset.
+    """
+    def __init__(self, path, contentType='application/json'):
+        """Reads and compresses a data file.
+
+        Args:
+            path (str): the path of the data file.
+            contentType (str): the MIME type of the data file.
+        """
+        with open(path, 'rb') as f:
+            body = f.read()
+
+        contentHash = hashlib.sha1(body).hexdigest()[:16]
+        name, extension = os.path.splitext(os.path.basename(path))
+        self.fileName = name + '.' + contentHash + extension
+        self.url = ASSET_URL_PREFIX + self.fileName
+        self.contentType = contentType
+        self.etag = '"' + contentHash + '"'
+
+        gzipped = StringIO()
+        with gzip.GzipFile(fileobj=gzipped, mode='wb', mtime=0) as f:
+            f.write(body)
+
+        self.bodies = {None: body, 'gzip': gzipped.getvalue()}
+        if brotli is not None:
+            self.bodies['br'] = brotli.compress(body, quality=BROTLI_QUALITY)
+
+
+def parseAcceptEncoding(header):
+    """Parse an Accept-Encoding header into the quality of each encoding.
+
+    Args:
+        header (str): the header, e.g., `gzip;q=0.8, br, *;q=0`.
+
+    Returns:
+        qualities (dict): the quality ([0,1]) of each listed encoding (or `*`),
+            in lower case. Encodings with a malformed quality are left out.
+    """
+    qualities = {}
+    for entry in header.split(','):
+        params = [param.strip() for param in entry.split(';')]
+        if params[0] == '':
+            continue
+
+        quality = 1.0
+        for param in params[1:]:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = min(max(float(value), 0.0), 1.0)
+                except ValueError:
+                    quality = None
+        if quality is not None:
+            qualities[params[0].lower()] = quality
+    return qualities
+
+
+def chooseEncoding(qualities, available):
+    """Choose the best encoding the client accepts.
+
+    Encodings that are not listed take the quality of `*`, if listed, and are
+    otherwise not accepted. The uncompressed identity encoding is always
+    acceptable, but unless it (or `*`) is listed it is only served when no
+    other encoding is accepted. Ties are broken by ENCODING_PREFERENCE.
+
+    Args:
+        qualities (dict): the qualities made by `parseAcceptEncoding`.
+        available (iterable): the encodings that can be served.
+
+    Returns:
+        encoding (str): the encoding with the highest nonzero quality, or None
+            for the uncompressed asset.
+    """
+    best, bestQuality = None, 0.0
+    for encoding in ENCODING_PREFERENCE:
+        if encoding not in available:
+            continue
+        name = 'identity' if encoding is None else encoding
+        quality = qualities.get(name, qualities.get('*', 0.0))
+        if quality > bestQuality:
+            best, bestQuality = encoding, quality
+    return best
+
+
+class AssetHandler(web.RequestHandler):
+    """The request handler for content-hashed data assets.
+
+    Assets are served precompressed with the best encoding that the client
+    accepts, may be cached forever, and are revalidated by ETag.
+
+    Attributes:
+        assets: the served `Asset`s keyed by their file name.
+    """
+    def initialize(self, assets):
+        """Initializes the asset handler.
+
+        Args:
+            assets (dict): the served `Asset`s keyed by their file name.
+        """
+        self.assets = assets
+
+    def get(self, fileName):
+        """Serves an asset in the best encoding the client accepts."""
+        if fileName not in self.assets:
+            raise web.HTTPError(404)
+        asset = self.assets[fileName]
+
+        self.set_header('Content-Type', asset.contentType)
+        self.set_header('Cache-Control',
+            'public, max-age=%d, immutable' % ASSET_MAX_AGE)
+        self.set_header('Vary', 'Accept-Encoding')
+        self.set_header('Etag', asset.etag)
+        if self.check_etag_header():
+            self.set_status(304)
+            return
+
+        encoding = chooseEncoding(parseAcceptEncoding(
+            self.request.headers.get('Accept-Encoding', '')), asset.bodies)
+
+        if encoding is not None:
+            self.set_header('Content-Encoding', encoding)
+        self.write(asset.bodies[encoding])
@@ -9,24 +9,21 @@ class MainHandler(web.RequestHandler):
     index page of Colorgorical.
 
     Attributes:
-        topoData: map data, which will be used in the client to demo palettes.
-        valueData: values for each of the counties specified in ``topoData``.
+        mapDataUrls: the URLs of the map data (``topo``) and the values of its
+            counties (``unemployment``) used in the client to demo palettes.
     """
-    def initialize(self, topoData, valueData):
+    def initialize(self, mapDataUrls):
         """Initializes the main handler.
 
         Args:
-            topoData (JSON): map data to use in the client to demo palettes.
-            valueData (JSON): values to use when showing colors in the topoData.
+            mapDataUrls (dict): the URLs of the map data to demo palettes with.
         """
         # map data for the visualization previews
-        self.topoData = topoData
-        self.valueData = valueData
+        self.mapDataUrls = mapDataUrls
 
     def get(self):
-        """Serves the index template to the client with topo and value data."""
+        """Serves the index template to the client with map data URLs."""
         templateOps = dict(
-            topoData=self.topoData,
-            valueData=self.valueData
+            mapDataUrls=self.mapDataUrls
         )
         self.render('index.html', **templateOps)
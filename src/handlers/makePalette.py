@@ -1,6 +1,8 @@
 """The handler for palette making requests from the client."""
+import tornado.gen as gen
 import tornado.web as web
 import json
+import numpy as np
 from ..model.util import convert
 
 class MakePaletteHandler(web.RequestHandler):
@@ -10,17 +12,28 @@ class MakePaletteHandler(web.RequestHandler):
     passed through with the request (e.g., the number of colors).
 
     Attributes:
-        model: an initialized Colorgorical model.
+        executor: the executor that palettes are made in.
+        numPalettes: the number of candidate palettes to pick each palette from.
+        timeBudget: the most seconds to make candidate palettes for, or None.
     """
-    def initialize(self, model):
+    def initialize(self, executor, numPalettes=10, timeBudget=None):
         """Initializes the main handler.
 
         Args:
-            model (src.model.Model): an initialized Colorgorical model.
+            executor (src.modelExecutor.ModelExecutor): the executor to call
+                the Colorgorical model in.
+            numPalettes (int): the number of candidate palettes to make for
+                each request, of which the most preferable is returned.
+            timeBudget (float): the default and largest number of seconds a
+                request may make candidate palettes for, or None to always
+                make numPalettes of them.
         """
 
-        self.model = model
+        self.executor = executor
+        self.numPalettes = numPalettes
+        self.timeBudget = timeBudget
 
+    @gen.coroutine
     def post(self):
         if len(self.request.body) == 0:
             body = dict()
@@ -59,18 +72,31 @@ class MakePaletteHandler(web.RequestHandler):
             }
         weights = body["weights"]
 
-
+        # Requests may ask for a shorter time budget than the server's
+        timeBudget = self.timeBudget
+        if "timeBudget" in body and body["timeBudget"] is not None:
+            timeBudget = float(body["timeBudget"])
+            if self.timeBudget is not None:
+                timeBudget = min(timeBudget, self.timeBudget)
+
+        # Seed here rather than in the executor, whose worker processes may
+        # share the random state they were forked with
+        seed = np.random.randint(2**31 - 1)
+
+        preferablePalette, stats = yield self.executor.submit(
+            'makePreferablePalette', paletteSize, self.numPalettes,
+            weights=weights,
+            lightnessRange=lightnessRange,
+            hueFilters=hueFilters, startPalette=startPalette,
+            seed=seed, timeBudget=timeBudget, returnStats=True)
         palette = [list([int(c) for c in color]) for color in
-            self.model.makePreferablePalette(paletteSize, 10,weights=weights,
-                lightnessRange=lightnessRange,
-                hueFilters=hueFilters, startPalette=startPalette)
-        ]
+            preferablePalette]
         paletteStr = [
             "lab("+",".join([str(c) for c in lab])+")"
             for lab in palette
         ]
 
-        rgbPalette = [convert.convertLabToRGB(color) for color in palette]
+        rgbPalette = convert.convertLabsToRGBs(palette).tolist()
         rgbPaletteStr = [
             "rgb("+",".join([str(c) for c in rgb])+")"
             for rgb in rgbPalette
@@ -85,7 +111,9 @@ class MakePaletteHandler(web.RequestHandler):
             "html": self.render_string("results.html", **templateOps),
             "palette":palette,
             "paletteSize":paletteSize,
-            "weights": weights
+            "weights": weights,
+            "candidates": stats["candidates"],
+            "timedOut": stats["timedOut"]
         }
 
         self.write(output)
@@ -1,6 +1,8 @@
 """Handler for calculating palette scores of already-made color palettes."""
+import tornado.gen as gen
 import tornado.web as web
 import json
+import numbers
 import os
 import time
 
@@ -8,118 +10,209 @@ import numpy as np
 
 from ..model.util import convert
 
+# The score weights of batch score requests that do not set them
+DEFAULT_SCORE_WEIGHTS = {"ciede2000":1, "nameDifference":1,
+    "nameUniqueness":1, "pairPreference":1}
+
+
+def makeComparison(model):
+    """Score the industry-standard palettes used in the TVCG Colorgorical paper.
+
+    The comparison never changes, so the server makes it once when it starts.
+
+    Args:
+        model (src.model.Model): an initialized Colorgorical model.
+
+    Returns:
+        comparison (dict): the palettes (keyed by size, collection, and name)
+            and their paletteScores, orderedPaletteScores (sorted), and
+            orderedAveragePaletteScores (averaged by collection).
+    """
+    thisFilePath = os.path.dirname(os.path.realpath(__file__))
+    paletteSets = json.load(open(thisFilePath+'/../data/palette-sets.json'))
+    palettes = {}
+    threePalettes = dict(ColorBrewer={}, Microsoft={}, Tableau={})
+    fivePalettes = dict(ColorBrewer={}, Microsoft={}, Tableau={})
+    eightPalettes = dict(ColorBrewer={}, Microsoft={}, Tableau={})
+
+    threePalettes["ColorBrewer"]["Pastel1"]=paletteSets["ColorBrewer"]["CbPastel1_3"]
+    threePalettes["ColorBrewer"]["Dark2"]=paletteSets["ColorBrewer"]["CbDark2_3"]
+    threePalettes["ColorBrewer"]["Set1"]=paletteSets["ColorBrewer"]["CbSet1_3"]
+    threePalettes["ColorBrewer"]["Set2"]=paletteSets["ColorBrewer"]["CbSet2_3"]
+    threePalettes["Microsoft"]["Microsoft-1"]=paletteSets["Microsoft"]["Microsoft-1"][:3]
+    threePalettes["Microsoft"]["Microsoft-2"]=paletteSets["Microsoft"]["Microsoft-2"][:3]
+    threePalettes["Microsoft"]["Microsoft-3"]=paletteSets["Microsoft"]["Microsoft-3"][:3]
+    threePalettes["Microsoft"]["Microsoft-4"]=paletteSets["Microsoft"]["Microsoft-4"][:3]
+    threePalettes["Tableau"]["Tableau 10"]=paletteSets["Tableau"]["Tableau 10"][:3]
+    threePalettes["Tableau"]["Blue Red"]=paletteSets["Tableau"]["Blue Red 6"][:3]
+    threePalettes["Tableau"]["Green Orange"]=paletteSets["Tableau"]["Green Orange 6"][:3]
+    threePalettes["Tableau"]["Purple Gray"]=paletteSets["Tableau"]["Purple Gray 6"][:3]
+
+    fivePalettes["ColorBrewer"]["Pastel1"]=paletteSets["ColorBrewer"]["CbPastel1_5"]
+    fivePalettes["ColorBrewer"]["Dark2"]=paletteSets["ColorBrewer"]["CbDark2_5"]
+    fivePalettes["ColorBrewer"]["Set1"]=paletteSets["ColorBrewer"]["CbSet1_5"]
+    fivePalettes["ColorBrewer"]["Set2"]=paletteSets["ColorBrewer"]["CbSet2_5"]
+    fivePalettes["Microsoft"]["Microsoft-1"]=paletteSets["Microsoft"]["Microsoft-1"][:5]
+    fivePalettes["Microsoft"]["Microsoft-2"]=paletteSets["Microsoft"]["Microsoft-2"][:5]
+    fivePalettes["Microsoft"]["Microsoft-3"]=paletteSets["Microsoft"]["Microsoft-3"][:5]
+    fivePalettes["Microsoft"]["Microsoft-4"]=paletteSets["Microsoft"]["Microsoft-4"][:5]
+    fivePalettes["Tableau"]["Tableau 10"]=paletteSets["Tableau"]["Tableau 10"][:5]
+    fivePalettes["Tableau"]["Blue Red"]=paletteSets["Tableau"]["Blue Red 6"][:5]
+    fivePalettes["Tableau"]["Green Orange"]=paletteSets["Tableau"]["Green Orange 6"][:5]
+    fivePalettes["Tableau"]["Purple Gray"]=paletteSets["Tableau"]["Purple Gray 6"][:5]
+
+    eightPalettes["ColorBrewer"]["Pastel1"]=paletteSets["ColorBrewer"]["CbPastel1_8"]
+    eightPalettes["ColorBrewer"]["Dark2"]=paletteSets["ColorBrewer"]["CbDark2_8"]
+    eightPalettes["ColorBrewer"]["Set1"]=paletteSets["ColorBrewer"]["CbSet1_8"]
+    eightPalettes["ColorBrewer"]["Set2"]=paletteSets["ColorBrewer"]["CbSet2_8"]
+    eightPalettes["Microsoft"]["Microsoft-1"]=paletteSets["Microsoft"]["Microsoft-1"][:8]
+    eightPalettes["Microsoft"]["Microsoft-2"]=paletteSets["Microsoft"]["Microsoft-2"][:8]
+    eightPalettes["Microsoft"]["Microsoft-3"]=paletteSets["Microsoft"]["Microsoft-3"][:8]
+    eightPalettes["Microsoft"]["Microsoft-4"]=paletteSets["Microsoft"]["Microsoft-4"][:8]
+    eightPalettes["Tableau"]["Tableau 10"]=paletteSets["Tableau"]["Tableau 10"][:8]
+    eightPalettes["Tableau"]["Blue Red"]=paletteSets["Tableau"]["Blue Red 12"][:8]
+    eightPalettes["Tableau"]["Green Orange"]=paletteSets["Tableau"]["Green Orange 12"][:8]
+    eightPalettes["Tableau"]["Purple Gray"]=paletteSets["Tableau"]["Purple Gray 12"][:8]
+    palettes["3"] = threePalettes
+    palettes["5"] = fivePalettes
+    palettes["8"] = eightPalettes
+
+    paletteScores = { "3": { "ColorBrewer":{}, "Microsoft":{}, "Tableau":{} }, "5": { "ColorBrewer":{}, "Microsoft":{}, "Tableau":{} }, "8": { "ColorBrewer":{}, "Microsoft":{}, "Tableau":{} }}
+    orderedPaletteScores = { "3": { "de": [], "nd": [], "pp": [], "nu": [] }, "5": { "de": [], "nd": [], "pp": [], "nu": [] }, "8": { "de": [], "nd": [], "pp": [], "nu": [] }}
+    orderedAveragePaletteScores = { "3": { "de": [], "nd": [], "pp": [], "nu": [] }, "5": { "de": [], "nd": [], "pp": [], "nu": [] }, "8": { "de": [], "nd": [], "pp": [], "nu": [] }}
+    for size, sizeGroups in palettes.iteritems():
+        for company, companyPalettes in sizeGroups.iteritems():
+            for paletteName, palette in companyPalettes.iteritems():
+                palette = [[int(i) for i in c.replace('rgb(','').replace(')','').split(',')] for c in palette]
+                labs = [[int(5 * round(float(i)/5)) for i in c] for c in convert.convertRGBsToLabs(palette)]
+                kwargs = {"seedPalette": labs, "paletteSize": len(labs)}
+                scores = model.scorePalette(labs)["minScores"]
+
+                def lowerSigFig(score,s):
+                    if score == "de" or score == "pp":
+                        s = round(s)
+                    else:
+                        s = round(s*100)/100.0
+                    return s
+
+                paletteScores[size][company][paletteName] = {}
+                paletteScores[size][company][paletteName]["de"] = scores["de"]
+                paletteScores[size][company][paletteName]["nd"] = scores["nd"]
+                paletteScores[size][company][paletteName]["pp"] = scores["pp"]
+                paletteScores[size][company][paletteName]["nu"] = scores["nu"]
+
+                orderedPaletteScores[size]["de"].append({"name": paletteName, "score": lowerSigFig("de",scores["de"]), "collection":company})
+                orderedPaletteScores[size]["nd"].append({"name": paletteName, "score": lowerSigFig("nd",scores["nd"]), "collection":company})
+                orderedPaletteScores[size]["pp"].append({"name": paletteName, "score": lowerSigFig("pp",scores["pp"]), "collection":company})
+                orderedPaletteScores[size]["nu"].append({"name": paletteName, "score": lowerSigFig("nu",scores["nu"]), "collection":company})
+
+    for size, sizeGroups in orderedPaletteScores.iteritems():
+        for score, scorePalettes in sizeGroups.iteritems():
+            scorePalettes.sort(key=lambda x: float(x["score"]), reverse=True)
+            orderedPaletteScores[size][score] = scorePalettes
+
+            collections = ["ColorBrewer", "Microsoft", "Tableau"]
+            def groupByCollection(c):
+                scores = [p["score"] for p in scorePalettes if p["collection"] == c]
+                s = np.mean(scores)
+                sd = np.std(scores)
+                s = round(s*100)/100.0
+                se = sd/np.sqrt(len(scores))
+                return {"score": s, "collection": c, "size": size, "sd": sd, "se": se}
+
+            avgpalettes = [groupByCollection(c) for c in collections]
+            avgpalettes.sort(key=lambda x: float(x["score"]), reverse=True)
+            orderedAveragePaletteScores[size][score] = avgpalettes
+
+    return dict(
+        palettes=palettes,
+        paletteScores=paletteScores,
+        orderedPaletteScores=orderedPaletteScores,
+        orderedAveragePaletteScores=orderedAveragePaletteScores
+    )
+
+
+def checkColorSpaceMembers(model, palette):
+    """Reject a request whose palette has colors outside of the color space.
+
+    Name difference and name uniqueness are only defined for the colors of the
+    color space, so palettes with other colors cannot be scored.
+
+    Raises:
+        tornado.web.HTTPError: a 400 error naming the first such color.
+    """
+    palette = np.array(palette, dtype=np.float64).reshape((-1, 3))
+    isMember = model.getColorIndexes(palette) >= 0
+    if not np.all(isMember):
+        color = palette[np.argmin(isMember)].tolist()
+        raise web.HTTPError(400, 'color %s is not in the color space', color,
+            reason='Color ' + str(color) + ' is not in the color space')
+
+
+def mergeScoreWeights(weights):
+    """Merge the score weights of a request over DEFAULT_SCORE_WEIGHTS.
+
+    Raises:
+        tornado.web.HTTPError: a 400 error if the weights are not an object of
+            finite numbers keyed by score name.
+    """
+    if not isinstance(weights, dict):
+        raise web.HTTPError(400, 'weights %r are not an object', weights,
+            reason='Weights must be an object')
+
+    merged = dict(DEFAULT_SCORE_WEIGHTS)
+    for name, weight in weights.items():
+        if name not in DEFAULT_SCORE_WEIGHTS:
+            raise web.HTTPError(400, 'unknown weight %r', name,
+                reason='Unknown weight')
+        if isinstance(weight, bool) or \
+                not isinstance(weight, numbers.Real) or \
+                not np.isfinite(weight):
+            raise web.HTTPError(400, 'weight %s is %r', name, weight,
+                reason='Weight ' + name + ' is not a number')
+        merged[name] = weight
+    return merged
+
+
+def makeComparisonResponse(comparison, loader):
+    """Render the response to every comparison request.
+
+    Args:
+        comparison (dict): the comparison made by `makeComparison`.
+        loader (tornado.template.Loader): the loader of the server's templates.
+
+    Returns:
+        response (str): the JSON encoded comparison and its rendered HTML.
+    """
+    returnObj = dict(comparison)
+    returnObj["html"] = \
+        loader.load("snippet/scoreSummary.html").generate(**comparison)
+    return json.dumps(returnObj)
+
+
 class ScorePaletteHandler(web.RequestHandler):
-    """The request handler for making palettes with Colorgorical.
+    """The request handler for scoring palettes with Colorgorical.
 
-    The handler makes Colorgorical palettes given the user-defined parameters
-    passed through with the request (e.g., the number of colors).
+    The handler scores a user-defined palette passed through with the request,
+    or returns the scores of industry-standard palettes to compare against.
 
     Attributes:
-        model: an initialized Colorgorical model.
-        paletteSets: the industry standards used in the TVCG Colorgorical paper.
-        palettes: an alternative ordering of paletteSets.
-        paletteScores: precalculated palette scores of the industry standards.
-        orderedPaletteScores: sorted paletteScores.
-        orderedAveragePaletteScores: averaged orderedPaletteScores.
+        executor: the executor that palettes are scored in.
+        comparisonResponse: the precomputed response to comparison requests.
     """
-    def initialize(self, model):
-        self.model = model
-        thisFilePath = os.path.dirname(os.path.realpath(__file__))
-        self.paletteSets = json.load(open(thisFilePath+'/../data/palette-sets.json'))
-        self.palettes = {}
-        threePalettes = dict(ColorBrewer={}, Microsoft={}, Tableau={})
-        fivePalettes = dict(ColorBrewer={}, Microsoft={}, Tableau={})
-        eightPalettes = dict(ColorBrewer={}, Microsoft={}, Tableau={})
-
-        threePalettes["ColorBrewer"]["Pastel1"]=self.paletteSets["ColorBrewer"]["CbPastel1_3"]
-        threePalettes["ColorBrewer"]["Dark2"]=self.paletteSets["ColorBrewer"]["CbDark2_3"]
-        threePalettes["ColorBrewer"]["Set1"]=self.paletteSets["ColorBrewer"]["CbSet1_3"]
-        threePalettes["ColorBrewer"]["Set2"]=self.paletteSets["ColorBrewer"]["CbSet2_3"]
-        threePalettes["Microsoft"]["Microsoft-1"]=self.paletteSets["Microsoft"]["Microsoft-1"][:3]
-        threePalettes["Microsoft"]["Microsoft-2"]=self.paletteSets["Microsoft"]["Microsoft-2"][:3]
-        threePalettes["Microsoft"]["Microsoft-3"]=self.paletteSets["Microsoft"]["Microsoft-3"][:3]
-        threePalettes["Microsoft"]["Microsoft-4"]=self.paletteSets["Microsoft"]["Microsoft-4"][:3]
-        threePalettes["Tableau"]["Tableau 10"]=self.paletteSets["Tableau"]["Tableau 10"][:3]
-        threePalettes["Tableau"]["Blue Red"]=self.paletteSets["Tableau"]["Blue Red 6"][:3]
-        threePalettes["Tableau"]["Green Orange"]=self.paletteSets["Tableau"]["Green Orange 6"][:3]
-        threePalettes["Tableau"]["Purple Gray"]=self.paletteSets["Tableau"]["Purple Gray 6"][:3]
-
-        fivePalettes["ColorBrewer"]["Pastel1"]=self.paletteSets["ColorBrewer"]["CbPastel1_5"]
-        fivePalettes["ColorBrewer"]["Dark2"]=self.paletteSets["ColorBrewer"]["CbDark2_5"]
-        fivePalettes["ColorBrewer"]["Set1"]=self.paletteSets["ColorBrewer"]["CbSet1_5"]
-        fivePalettes["ColorBrewer"]["Set2"]=self.paletteSets["ColorBrewer"]["CbSet2_5"]
-        fivePalettes["Microsoft"]["Microsoft-1"]=self.paletteSets["Microsoft"]["Microsoft-1"][:5]
-        fivePalettes["Microsoft"]["Microsoft-2"]=self.paletteSets["Microsoft"]["Microsoft-2"][:5]
-        fivePalettes["Microsoft"]["Microsoft-3"]=self.paletteSets["Microsoft"]["Microsoft-3"][:5]
-        fivePalettes["Microsoft"]["Microsoft-4"]=self.paletteSets["Microsoft"]["Microsoft-4"][:5]
-        fivePalettes["Tableau"]["Tableau 10"]=self.paletteSets["Tableau"]["Tableau 10"][:5]
-        fivePalettes["Tableau"]["Blue Red"]=self.paletteSets["Tableau"]["Blue Red 6"][:5]
-        fivePalettes["Tableau"]["Green Orange"]=self.paletteSets["Tableau"]["Green Orange 6"][:5]
-        fivePalettes["Tableau"]["Purple Gray"]=self.paletteSets["Tableau"]["Purple Gray 6"][:5]
-
-        eightPalettes["ColorBrewer"]["Pastel1"]=self.paletteSets["ColorBrewer"]["CbPastel1_8"]
-        eightPalettes["ColorBrewer"]["Dark2"]=self.paletteSets["ColorBrewer"]["CbDark2_8"]
-        eightPalettes["ColorBrewer"]["Set1"]=self.paletteSets["ColorBrewer"]["CbSet1_8"]
-        eightPalettes["ColorBrewer"]["Set2"]=self.paletteSets["ColorBrewer"]["CbSet2_8"]
-        eightPalettes["Microsoft"]["Microsoft-1"]=self.paletteSets["Microsoft"]["Microsoft-1"][:8]
-        eightPalettes["Microsoft"]["Microsoft-2"]=self.paletteSets["Microsoft"]["Microsoft-2"][:8]
-        eightPalettes["Microsoft"]["Microsoft-3"]=self.paletteSets["Microsoft"]["Microsoft-3"][:8]
-        eightPalettes["Microsoft"]["Microsoft-4"]=self.paletteSets["Microsoft"]["Microsoft-4"][:8]
-        eightPalettes["Tableau"]["Tableau 10"]=self.paletteSets["Tableau"]["Tableau 10"][:8]
-        eightPalettes["Tableau"]["Blue Red"]=self.paletteSets["Tableau"]["Blue Red 12"][:8]
-        eightPalettes["Tableau"]["Green Orange"]=self.paletteSets["Tableau"]["Green Orange 12"][:8]
-        eightPalettes["Tableau"]["Purple Gray"]=self.paletteSets["Tableau"]["Purple Gray 12"][:8]
-        self.palettes["3"] = threePalettes
-        self.palettes["5"] = fivePalettes
-        self.palettes["8"] = eightPalettes
-
-        self.paletteScores = { "3": { "ColorBrewer":{}, "Microsoft":{}, "Tableau":{} }, "5": { "ColorBrewer":{}, "Microsoft":{}, "Tableau":{} }, "8": { "ColorBrewer":{}, "Microsoft":{}, "Tableau":{} }}
-        self.orderedPaletteScores = { "3": { "de": [], "nd": [], "pp": [], "nu": [] }, "5": { "de": [], "nd": [], "pp": [], "nu": [] }, "8": { "de": [], "nd": [], "pp": [], "nu": [] }}
-        self.orderedAveragePaletteScores = { "3": { "de": [], "nd": [], "pp": [], "nu": [] }, "5": { "de": [], "nd": [], "pp": [], "nu": [] }, "8": { "de": [], "nd": [], "pp": [], "nu": [] }}
-        for size, sizeGroups in self.palettes.iteritems():
-            for company, companyPalettes in sizeGroups.iteritems():
-                for paletteName, palette in companyPalettes.iteritems():
-                    palette = [[int(i) for i in c.replace('rgb(','').replace(')','').split(',')] for c in palette]
-                    labs = [[int(5 * round(float(i)/5)) for i in convert.convertRGBToLab(c)] for c in palette]
-                    kwargs = {"seedPalette": labs, "paletteSize": len(labs)}
-                    scores = self.model.scorePalette(labs)["minScores"]
-
-                    def lowerSigFig(score,s):
-                        if score == "de" or score == "pp":
-                            s = round(s)
-                        else:
-                            s = round(s*100)/100.0
-                        return s
-
-                    self.paletteScores[size][company][paletteName] = {}
-                    self.paletteScores[size][company][paletteName]["de"] = scores["de"]
-                    self.paletteScores[size][company][paletteName]["nd"] = scores["nd"]
-                    self.paletteScores[size][company][paletteName]["pp"] = scores["pp"]
-                    self.paletteScores[size][company][paletteName]["nu"] = scores["nu"]
-
-                    self.orderedPaletteScores[size]["de"].append({"name": paletteName, "score": lowerSigFig("de",scores["de"]), "collection":company})
-                    self.orderedPaletteScores[size]["nd"].append({"name": paletteName, "score": lowerSigFig("nd",scores["nd"]), "collection":company})
-                    self.orderedPaletteScores[size]["pp"].append({"name": paletteName, "score": lowerSigFig("pp",scores["pp"]), "collection":company})
-                    self.orderedPaletteScores[size]["nu"].append({"name": paletteName, "score": lowerSigFig("nu",scores["nu"]), "collection":company})
-
-        for size, sizeGroups in self.orderedPaletteScores.iteritems():
-            for score, palettes in sizeGroups.iteritems():
-                palettes.sort(key=lambda x: float(x["score"]), reverse=True)
-                self.orderedPaletteScores[size][score] = palettes
-
-                collections = ["ColorBrewer", "Microsoft", "Tableau"]
-                def groupByCollection(c):
-                    scores = [p["score"] for p in palettes if p["collection"] == c]
-                    s = np.mean(scores)
-                    sd = np.std(scores)
-                    s = round(s*100)/100.0
-                    se = sd/np.sqrt(len(scores))
-                    return {"score": s, "collection": c, "size": size, "sd": sd, "se": se}
-
-                avgpalettes = [groupByCollection(c) for c in collections]
-                avgpalettes.sort(key=lambda x: float(x["score"]), reverse=True)
-                self.orderedAveragePaletteScores[size][score] = avgpalettes
+    def initialize(self, executor, comparisonResponse):
+        """Initializes the score handler.
+
+        Args:
+            executor (src.modelExecutor.ModelExecutor): the executor to call
+                the Colorgorical model in.
+            comparisonResponse (str): the response made by
+                `makeComparisonResponse`.
+        """
+        self.executor = executor
+        self.comparisonResponse = comparisonResponse
 
+    @gen.coroutine
     def post(self):
         if len(self.request.body) == 0:
             body = dict()
@@ -129,9 +222,11 @@ class ScorePaletteHandler(web.RequestHandler):
         if 'getComparison' not in body:
             originalPalette = body["palette"]
             palette = seeds = [ [int(5 * round(float(i)/5)) for i in c] for c in body["palette"]]
+            checkColorSpaceMembers(self.executor.model, palette)
 
-            scores=self.model.scorePalette(palette,weights={"ciede2000":1,"nameDifference":1,\
-                    "nameUniqueness":1, "pairPreference":1})
+            scores = yield self.executor.submit('scorePalette', palette,
+                weights={"ciede2000":1, "nameDifference":1,
+                "nameUniqueness":1, "pairPreference":1})
 
             deMtx = np.ones((len(palette), len(palette)))*-200
             ndMtx = np.ones((len(palette), len(palette)))*-200
@@ -170,12 +265,48 @@ class ScorePaletteHandler(web.RequestHandler):
             returnObj["html"] = html
             self.write(json.dumps(returnObj))
         else: # need to return a comparison display of all experiment palettes
-            returnObj = {}
-            returnObj["palettes"] = self.palettes
-            returnObj["paletteScores"] = self.paletteScores
-            returnObj["orderedPaletteScores"] = self.orderedPaletteScores
-            returnObj["orderedAveragePaletteScores"] = self.orderedAveragePaletteScores
+            self.write(self.comparisonResponse)
 
-            html = self.render_string("snippet/scoreSummary.html", **returnObj)
-            returnObj["html"] = html
-            self.write(json.dumps(returnObj))
+
+class ScorePalettesHandler(web.RequestHandler):
+    """The request handler for scoring many palettes in one request.
+
+    The request body is a JSON object with a list of ``palettes``, each a list
+    of CIE Lab colors, and optional score ``weights``, which override the
+    DEFAULT_SCORE_WEIGHTS they set. The response holds the ``minScores`` of
+    every palette as arrays in the order of the request, with null for scores
+    that a palette is too small to have.
+
+    Attributes:
+        executor: the executor that palettes are scored in.
+    """
+    def initialize(self, executor):
+        """Initializes the batch score handler.
+
+        Args:
+            executor (src.modelExecutor.ModelExecutor): the executor to call
+                the Colorgorical model in.
+        """
+        self.executor = executor
+
+    @gen.coroutine
+    def post(self):
+        body = json.loads(self.request.body)
+
+        palettes = [
+            (5 * np.round(np.array(p, dtype=np.float64).reshape((-1, 3)) / 5))
+            for p in body["palettes"]
+        ]
+        for palette in palettes:
+            checkColorSpaceMembers(self.executor.model, palette)
+        weights = mergeScoreWeights(body.get("weights", {}))
+
+        minScores = yield self.executor.submit('scorePalettes', palettes,
+            weights=weights)
+
+        self.write(json.dumps(dict(
+            minScores=dict([
+                (name, [None if np.isnan(s) else s for s in scores.tolist()])
+                for name, scores in minScores.items()
+            ])
+        )))
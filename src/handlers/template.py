@@ -7,20 +7,18 @@ class TemplateHandler(web.RequestHandler):
     """The Tornado template handler for Colorgorical.
 
     Attributes:
-        topoData: map data, which will be used in the client to demo palettes.
-        valueData: values for each of the counties specified in ``topoData``.
+        mapDataUrls: the URLs of the map data (``topo``) and the values of its
+            counties (``unemployment``) used in the client to demo palettes.
         paletteSets: a dictionary that contains names and RGB-color arrays for
             a number of industry-standard categorical color palettes.
     """
-    def initialize(self, topoData, valueData):
+    def initialize(self, mapDataUrls):
         """Initializes the template handler.
 
         Args:
-            topoData (JSON): map data to use in the client to demo palettes.
-            valueData (JSON): values to use when showing colors in the topoData.
+            mapDataUrls (dict): the URLs of the map data to demo palettes with.
         """
-        self.topoData = topoData
-        self.valueData = valueData
+        self.mapDataUrls = mapDataUrls
 
         # Load industry-standard palette sets into memory
         thisFilePath = os.path.dirname(os.path.realpath(__file__))
@@ -31,8 +29,7 @@ class TemplateHandler(web.RequestHandler):
         """Serves rendered templates to the client."""
         templateOps = dict(
             paletteSets = self.paletteSets,
-            topoData=self.topoData,
-            valueData=self.valueData
+            mapDataUrls=self.mapDataUrls
         )
 
         self.render(pageName+'.html', **templateOps)
@@ -1,24 +1,143 @@
-"""Output samples of various Colorgorical settings."""
+"""Output samples of various Colorgorical settings.
+
+Samples are made in work units of one weight setting and palette size, which
+are spread over a pool of worker processes. Each finished unit is appended to a
+JSON-lines checkpoint file, so an interrupted run only makes the units that are
+missing when it is restarted.
+"""
 import itertools as it
 import json
+import multiprocessing
 import numpy as np
 import os
 from os import listdir
 from os.path import isfile, join
 import datetime
-
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-from matplotlib import gridspec
-import matplotlib.tri as tri
+import hashlib
 
 from model import model
 from model.util import convert
 
-import model.numpyColorgorical as npc
+# Finished work units are appended to this file in the output directory until
+# every unit is done and the samples are written to examplePalettes.json.
+CHECKPOINT_FILE_NAME = 'examplePalettes.checkpoint.jsonl'
+
+# Maps each figure's file name to the hash of the sample palettes it was
+# rendered from (see `hashSamples`).
+FIGURE_MANIFEST_FILE_NAME = 'figures.manifest.json'
+
+# The MakeSamples of a worker process, set once by `initializeWorker`.
+workerSamples = None
+
+
+def initializeWorker(samples):
+    """Initializes a worker process with the samples' Colorgorical model."""
+    global workerSamples
+    workerSamples = samples
+
+
+def makeWorkerUnit(unit):
+    """Make the palettes of a work unit inside a worker process."""
+    return workerSamples.makeUnit(*unit)
+
+
+def getFigureName(weights):
+    """Get the file name (without extension) of a weight setting's figure."""
+    sortedWeights = [ str(int(10*weights[key])) for key in sorted(weights.keys())]
+    shorthand = ["PD", "ND", "NU", "PP"]
+    return "__".join(['-'.join(d) for d in zip(sortedWeights, shorthand)])
+
+
+def hashSamples(weightSamples):
+    """Hash a weight setting's entry in the sample palette JSON."""
+    return hashlib.sha1(json.dumps(weightSamples, sort_keys=True)).hexdigest()
+
+
+def saveFigure(figure):
+    """Render the figure of a weight setting's sample palettes.
+
+    Args:
+        figure (tuple): the weight setting's entry in the sample palette JSON,
+            the RGB swatch image of each palette size, and the output path.
+
+    Returns:
+        fname (str): the output path.
+    """
+    # Render off screen with Agg, which needs no display in worker processes
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from matplotlib import gridspec
+
+    weightSamples, rgbPalettes, fname = figure
+    ws = weightSamples["weights"]
+    palettes = weightSamples["palettes"]
+    repeats = weightSamples["repeats"]
+    print ws, repeats, len(palettes[0])
+
+    shorthand = ["PD", "ND", "NU", "PP"]
+
+    def makeName(palette):
+        return '; '.join(['[' + ','.join([str(int(i)) for i in c]) + ']' for c in palette])
+    labNames = [[makeName(repeat)] for sizes in palettes for repeat in sizes]
+
+    fig = plt.figure(figsize=(24, 10), dpi=300)
+
+    sortedWeights = [ str(ws[key]) for key in sorted(ws.keys())]
+    figName = " ".join([':'.join(d) for d in zip(shorthand, sortedWeights)])
+    fig.suptitle("Slider settings:: "+figName, fontsize=30, x=0, fontweight="bold", color="#010101")
+
+    # http://matplotlib.org/users/gridspec.html
+    gs0 = gridspec.GridSpec(1, 2, width_ratios=[2,1.1])
+    gs0.update(left=0)
+
+    gs1 = gridspec.GridSpecFromSubplotSpec(1, 3, subplot_spec=gs0[0], width_ratios=[3,5,8])
+    # gs1 = gridspec.GridSpec(1, 4, width_ratios=[5,3,5,8])
+    # gs1.update(left=0.23, right=0.68, wspace=0)
+    # gs = gridspec.GridSpec(2, 3, width_ratios=[3,5,8])
+
+    ax1 = fig.add_subplot(gs1[0])
+    ax2 = fig.add_subplot(gs1[1])
+    ax3 = fig.add_subplot(gs1[2])
+
+    gs2 = gridspec.GridSpecFromSubplotSpec(1, 1, subplot_spec=gs0[1])
+    # gs2 = gridspec.GridSpec(1, 1)
+    # gs2.update(left=0.7, right=1, hspace=0.05)
+    ax4 = fig.add_subplot(gs2[:,:])
+
+    allButLast = repeats*2-1
+    ax1.imshow(rgbPalettes[0][:allButLast], interpolation="nearest")
+    ax2.imshow(rgbPalettes[1][:allButLast], interpolation="nearest")
+    ax3.imshow(rgbPalettes[2][:allButLast], interpolation="nearest")
+
+    table = ax4.table(cellText=labNames,loc='center')
+    table.auto_set_font_size(False)
+    table.set_fontsize(10)
+
+    for key, cell in table.get_celld().items():
+        cell.set_linewidth(0)
+        cell.set_height(0.03)
+        cell._text.set_color('#333333')
+
+    ax1.set_axis_off()
+    ax2.set_axis_off()
+    ax3.set_axis_off()
+    ax4.axis('tight')
+    ax4.set_axis_off()
+
+    fig.savefig(fname, dpi=300, bbox_inches='tight')
+    plt.close(fig)
+    return fname
+
 
 class MakeSamples():
-    def __init__(self):
+    def __init__(self, processes=None):
+        """Sample maker initializer.
+
+        Args:
+            processes (int): the number of worker processes to make samples
+                in. Defaults to the CPU count; 1 makes them in this process.
+        """
         self.colorgorical = model.Model()
 
         self.repeats = 10
@@ -41,12 +160,17 @@ class MakeSamples():
 
         self.weights = np.array([w for w in weights if isOk(w)])
 
+        if processes is None:
+            processes = multiprocessing.cpu_count()
+        self.processes = processes
+
         thisFilePath = os.path.dirname(os.path.realpath(__file__))
         projectDir = os.path.abspath(os.path.join(thisFilePath, os.pardir))
         outputPath = os.path.join(projectDir, 'examplePalettes')
 
         self.outputPath = outputPath
         self.paletteFile = os.path.join(outputPath, 'examplePalettes.json')
+        self.checkpointFile = os.path.join(outputPath, CHECKPOINT_FILE_NAME)
 
         self.samplePalettes = None
 
@@ -60,51 +184,137 @@ class MakeSamples():
             print e
 
 
+    def getWeights(self, weightIdx):
+        """Get the model weights of a weight setting."""
+        ws = self.weights[weightIdx]
+        return {
+            "ciede2000": ws[0], "nameDifference": ws[1],
+            "nameUniqueness": 0.0, "pairPreference": ws[2]
+        }
+
+
+    def getUnitKey(self, weights, size):
+        """Get the checkpoint key of the work unit of weights and a size."""
+        return (tuple(sorted(weights.items())), size)
+
+
+    def getUniqueIdx(self, pals):
+        """Get the index of the first palette of each distinct set of colors."""
+        palIdx = self.colorgorical.getColorIndexes(
+            np.array(pals).reshape((-1, 3))).reshape((len(pals), -1))
+        palIdx = np.sort(palIdx, axis=1)
+
+        # Thanks to http://stackoverflow.com/a/16973510/239924
+        b = np.ascontiguousarray(palIdx).view(np.dtype((np.void,
+            palIdx.dtype.itemsize * palIdx.shape[1])))
+        _, uniquePalIdx = np.unique(b, return_index=True)
+        return uniquePalIdx
+
+
+    def makeUnit(self, weightIdx, size):
+        """Make a work unit of `repeats` unique palettes of a weight setting.
+
+        Palettes are seeded from the weight setting and size, so a unit makes
+        the same palettes no matter which worker makes it, or when.
+
+        Returns:
+            unit (dict): the weights, size, and palettes of the work unit.
+        """
+        weights = self.getWeights(weightIdx)
+        print "Making:"+str(weights)+" "+str(size)+" "+str(datetime.datetime.now())
+
+        randomState = np.random.RandomState([weightIdx, size])
+        def makePalettes(n):
+            return np.array([
+                self.colorgorical.makePreferablePalette(size, 10,
+                    weights=weights, seed=randomState.randint(2**31 - 1))
+                for r in xrange(n)
+            ])
+
+        pals = makePalettes(self.repeats)
+        pals = pals[self.getUniqueIdx(pals)]
+
+        while pals.shape[0] < self.repeats:
+            pals = np.vstack((pals, makePalettes(self.repeats - pals.shape[0])))
+            pals = pals[self.getUniqueIdx(pals)]
+
+        pals = pals[:self.repeats]
+
+        return {'weights': weights, 'size': size,
+                'palettes': [[list(color) for color in p] for p in pals]}
+
+
+    def loadCheckpoint(self):
+        """Load the finished work units of an interrupted run.
+
+        Returns:
+            units (dict): finished work units keyed by `getUnitKey`.
+        """
+        units = {}
+        if not os.path.isfile(self.checkpointFile):
+            return units
+        with open(self.checkpointFile, 'rb') as f:
+            for line in f:
+                try:
+                    unit = json.loads(line)
+                except ValueError:
+                    # The last unit may have been cut off mid-write
+                    continue
+                units[self.getUnitKey(unit['weights'], unit['size'])] = unit
+        return units
+
+
+    def runUnits(self, units):
+        """Make work units in the worker processes, yielding each when done."""
+        if self.processes == 1:
+            for unit in units:
+                yield self.makeUnit(*unit)
+            return
+
+        pool = multiprocessing.Pool(self.processes,
+            initializer=initializeWorker, initargs=(self,))
+        try:
+            for unit in pool.imap_unordered(makeWorkerUnit, units):
+                yield unit
+        finally:
+            pool.terminate()
+            pool.join()
+
+
     def make(self):
-        def makeSwatch(weights):
-            def rep(size):
-                print "Making:"+str(weights)+" "+str(size)+" "+str(datetime.datetime.now())
-                # Thanks to http://stackoverflow.com/a/16973510/239924
-                def getUniqueIdx(pals):
-                    palIdx = np.array([ sorted([npc.colorIndex(c).astype(int)[0] for c in p]) for p in pals ])
-
-                    b = np.ascontiguousarray(palIdx).view(np.dtype((np.void, palIdx.dtype.itemsize * palIdx.shape[1])))
-                    _, uniquePalIdx = np.unique(b, return_index=True)
-                    return uniquePalIdx
-
-                pals = np.array([
-                    self.colorgorical.makePreferablePalette(s, 10, weights=weights)
-                    for r in xrange(self.repeats)
-                ])
-
-                pals = pals[getUniqueIdx(pals)]
-
-                while pals.shape[0] < self.repeats:
-                    newPals = np.array([
-                        self.colorgorical.makePreferablePalette(s, 10, weights=weights)
-                        for r in xrange(self.repeats - pals.shape[0])
-                    ])
-                    pals = np.vstack((pals, newPals))
-                    pals = pals[getUniqueIdx(pals)]
-
-                pals = pals[:self.repeats]
-
-                return [[list(color) for color in p] for p in pals]
-
-            weights = {
-                "ciede2000": weights[0], "nameDifference": weights[1],
-                "nameUniqueness": 0.0, "pairPreference": weights[2]
-            }
-            palettes = [ rep(s) for s in self.sizes ]
-            for p in palettes:
-                print p, '====='
-            print '\n\n'
-            return {'weights': weights, 'palettes': palettes,
-                    'repeats': self.repeats, 'sizes': self.sizes}
-
-        self.samplePalettes = [makeSwatch(ws) for ws in self.weights]
-        with open(self.paletteFile, 'w') as f:
+        finished = self.loadCheckpoint()
+        units = [(wi, s) for wi in xrange(len(self.weights)) for s in self.sizes
+            if self.getUnitKey(self.getWeights(wi), s) not in finished]
+        print '%d of %d work units left' % (len(units),
+            len(self.weights) * len(self.sizes))
+
+        with open(self.checkpointFile, 'ab') as f:
+            # Start on a new line if the last unit was cut off mid-write
+            if f.tell() > 0:
+                with open(self.checkpointFile, 'rb') as checkpoint:
+                    checkpoint.seek(-1, os.SEEK_END)
+                    if checkpoint.read(1) != '\n':
+                        f.write('\n')
+
+            for unit in self.runUnits(units):
+                finished[self.getUnitKey(unit['weights'], unit['size'])] = unit
+                f.write(json.dumps(unit) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+
+        self.samplePalettes = []
+        for wi in xrange(len(self.weights)):
+            weights = self.getWeights(wi)
+            self.samplePalettes.append({'weights': weights,
+                'palettes': [finished[self.getUnitKey(weights, s)]['palettes']
+                    for s in self.sizes],
+                'repeats': self.repeats, 'sizes': self.sizes})
+
+        tempFile = self.paletteFile + '.tmp'
+        with open(tempFile, 'w') as f:
             json.dump(self.samplePalettes, f)
+        os.rename(tempFile, self.paletteFile)
+        os.remove(self.checkpointFile)
 
 
     def savedResultsExist(self):
@@ -112,81 +322,70 @@ class MakeSamples():
 
 
     def savePlots(self):
-        def saveWeight(weightSamples):
-            ws = weightSamples["weights"]
-            palettes = weightSamples["palettes"]
-            repeats = weightSamples["repeats"]
-            print ws, repeats, len(palettes[0])
-
-            sortedWeights = [ str(int(10*ws[key])) for key in sorted(ws.keys())]
-            shorthand = ["PD", "ND", "NU", "PP"]
-            name = "__".join(['-'.join(d) for d in zip(sortedWeights, shorthand)])
-            imgType = "eps"
-            fname = os.path.join(self.outputPath, name+"."+imgType)
-
-            rgbPalettes = [
-                np.vstack([
-                    np.array([
-                        [ np.array(convert.convertLabToRGB(color))/255.0 for color in repeat ],
-                        [ np.array([1,1,1]) for color in repeat ]
-                    ])
-                    for repeat in sizes
-                ])
-                for sizes in palettes
-            ]
-
-            def makeName(palette):
-                return '; '.join(['[' + ','.join([str(int(i)) for i in c]) + ']' for c in palette])
-            labNames = [[makeName(repeat)] for sizes in palettes for repeat in sizes]
-
-            fig = plt.figure(figsize=(24, 10), dpi=300)
-
-            sortedWeights = [ str(ws[key]) for key in sorted(ws.keys())]
-            figName = " ".join([':'.join(d) for d in zip(shorthand, sortedWeights)])
-            fig.suptitle("Slider settings:: "+figName, fontsize=30, x=0, fontweight="bold", color="#010101")
-
-            # http://matplotlib.org/users/gridspec.html
-            gs0 = gridspec.GridSpec(1, 2, width_ratios=[2,1.1])
-            gs0.update(left=0)
-
-            gs1 = gridspec.GridSpecFromSubplotSpec(1, 3, subplot_spec=gs0[0], width_ratios=[3,5,8])
-            # gs1 = gridspec.GridSpec(1, 4, width_ratios=[5,3,5,8])
-            # gs1.update(left=0.23, right=0.68, wspace=0)
-            # gs = gridspec.GridSpec(2, 3, width_ratios=[3,5,8])
-
-            ax1 = fig.add_subplot(gs1[0])
-            ax2 = fig.add_subplot(gs1[1])
-            ax3 = fig.add_subplot(gs1[2])
-
-            gs2 = gridspec.GridSpecFromSubplotSpec(1, 1, subplot_spec=gs0[1])
-            # gs2 = gridspec.GridSpec(1, 1)
-            # gs2.update(left=0.7, right=1, hspace=0.05)
-            ax4 = fig.add_subplot(gs2[:,:])
-
-            allButLast = repeats*2-1
-            ax1.imshow(rgbPalettes[0][:allButLast], interpolation="nearest")
-            ax2.imshow(rgbPalettes[1][:allButLast], interpolation="nearest")
-            ax3.imshow(rgbPalettes[2][:allButLast], interpolation="nearest")
-
-            table = ax4.table(cellText=labNames,loc='center')
-            table.auto_set_font_size(False)
-            table.set_fontsize(10)
-
-            for key, cell in table.get_celld().items():
-                cell.set_linewidth(0)
-                cell.set_height(0.03)
-                cell._text.set_color('#333333')
-
-            ax1.set_axis_off()
-            ax2.set_axis_off()
-            ax3.set_axis_off()
-            ax4.axis('tight')
-            ax4.set_axis_off()
-
-            fig.savefig(fname, dpi=300, bbox_inches='tight')
-
+        """Render the figure of each weight setting in the worker processes.
+
+        Figures are skipped if they were rendered from the same entry of the
+        sample palette JSON, as recorded by content hash in the manifest.
+        """
+        manifestFile = os.path.join(self.outputPath, FIGURE_MANIFEST_FILE_NAME)
+        manifest = {}
+        if os.path.isfile(manifestFile):
+            with open(manifestFile, 'rb') as f:
+                manifest = json.load(f)
+
+        stale = []
         for weightSamples in self.samplePalettes:
-            saveWeight(weightSamples)
+            fileName = getFigureName(weightSamples["weights"]) + ".eps"
+            contentHash = hashSamples(weightSamples)
+            if manifest.get(fileName) == contentHash and \
+                    os.path.isfile(os.path.join(self.outputPath, fileName)):
+                continue
+            stale.append((weightSamples, fileName, contentHash))
+        print '%d of %d figures to render' % (len(stale),
+            len(self.samplePalettes))
+        if len(stale) == 0:
+            return
+
+        # Convert every swatch color at once, then split the colors back into
+        # each figure's swatch image of 1 x 3 rows between its palettes
+        labs = np.array([color for weightSamples, _, _ in stale
+            for sizes in weightSamples["palettes"]
+            for repeat in sizes for color in repeat], dtype=np.float64)
+        rgbs = convert.convertLabsToRGBs(labs)/255.0
+
+        figures = []
+        start = 0
+        for weightSamples, fileName, _ in stale:
+            rgbPalettes = []
+            for sizes in weightSamples["palettes"]:
+                rows = []
+                for repeat in sizes:
+                    rows.append(rgbs[start:start + len(repeat)])
+                    rows.append(np.ones((len(repeat), 3)))
+                    start += len(repeat)
+                rgbPalettes.append(np.array(rows))
+            figures.append((weightSamples, rgbPalettes,
+                os.path.join(self.outputPath, fileName)))
+
+        hashes = dict([(os.path.join(self.outputPath, fileName), contentHash)
+            for _, fileName, contentHash in stale])
+        def recordFigure(fname):
+            manifest[os.path.basename(fname)] = hashes[fname]
+            with open(manifestFile, 'w') as f:
+                json.dump(manifest, f, indent=2, sort_keys=True)
+
+        if self.processes == 1:
+            for figure in figures:
+                recordFigure(saveFigure(figure))
+            return
+
+        pool = multiprocessing.Pool(self.processes)
+        try:
+            for fname in pool.imap_unordered(saveFigure, figures):
+                recordFigure(fname)
+        finally:
+            pool.terminate()
+            pool.join()
 
 
     def writeTex(self):
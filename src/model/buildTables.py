@@ -0,0 +1,104 @@
+'''Converts the C lookup table literals in `c/tables` into binary blobs.
+
+The `numpyColorgorical` extension memory maps its large lookup tables from
+compact binary files when it is imported (see `c/util/tables.h`) rather than
+compiling multi-megabyte array literals into the extension. To (re)generate the
+blobs, run `python buildTables.py` from the `model` directory; `setup.sh` does
+so before building the extension.
+'''
+import os
+import re
+import numpy as np
+
+# Every table the extension loads: its name, the `c/tables` file that defines
+# it as a C array literal, its blob type, and its number of entries. Must match
+# COLORGORICAL_TABLES in `c/util/tables.c`.
+TABLES = (
+    ('COLORGORICAL_LAB_TO_CH', 'labToCH.c', 'float32', 67032),
+    ('COLORGORICAL_LAB_TO_COOLNESS', 'labToCoolness.c', 'float32', 33516),
+    ('COLORGORICAL_CIS', 'colorIndex.c', 'int16', 33516),
+    ('COLORGORICAL_LAB', 'labList.c', 'int8', 24975),
+    ('COLORGORICAL_LAB_IS_VALID_RGB', 'labList.c', 'uint8', 8325),
+    ('COLORGORICAL_NAMES_CCOUNT', 'colorNames_Counts.c', 'int16', 8325),
+    ('COLORGORICAL_NAMES_TCOUNT', 'colorNames_Counts.c', 'int32', 153),
+    ('COLORGORICAL_NAMES_T', 'colorNames_T.c', 'int16', 1273725),
+)
+
+TABLE_SOURCE_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)),
+    'c/tables')
+TABLE_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)),
+    'tables')
+
+
+def parseTable(sourcePath, name):
+    """Parse the values of a C array literal.
+
+    Args:
+        sourcePath (str): the C file that defines the array.
+        name (str): the name of the array.
+
+    Returns:
+        values (np.ndarray): the array's values as float64.
+    """
+    with open(sourcePath, 'rb') as f:
+        source = f.read()
+
+    match = re.search(r'\b' + name + r'\s*\[[^\]]*\]\s*=\s*\{([^}]*)\}', source)
+    if match is None:
+        raise ValueError(name + " is not defined in " + sourcePath)
+
+    return np.fromstring(match.group(1), sep=',')
+
+
+def buildTables(sourcePath=TABLE_SOURCE_PATH, outputPath=TABLE_PATH):
+    """Write every table in TABLES as a blob of its type.
+
+    Args:
+        sourcePath (str): the directory of the C table literals.
+        outputPath (str): the directory to write `<table name>.bin` blobs to.
+    """
+    # colorNames_T.c is too large for some checkouts to include, so report
+    # every missing literal before writing any blobs
+    missing = sorted(set(fileName for name, fileName, dtype, count in TABLES
+        if not os.path.isfile(os.path.join(sourcePath, fileName))))
+    if len(missing) > 0:
+        raise IOError("Missing table literal(s) " + ", ".join(missing) +
+            "; copy them from the Colorgorical repository into " + sourcePath)
+
+    if not os.path.isdir(outputPath):
+        os.makedirs(outputPath)
+
+    for name, fileName, dtype, count in TABLES:
+        values = parseTable(os.path.join(sourcePath, fileName), name)
+        if values.shape[0] != count:
+            raise ValueError(name + " has " + str(values.shape[0]) +
+                " entries rather than " + str(count))
+
+        table = values.astype(dtype)
+        if np.issubdtype(table.dtype, np.integer) and \
+            np.any(table != values):
+            raise ValueError(name + " does not fit in " + dtype)
+
+        table.tofile(os.path.join(outputPath, name + '.bin'))
+
+
+def loadTable(name, dtype, tablePath=TABLE_PATH):
+    """Load the blob of a table as written by `buildTables`."""
+    return np.fromfile(os.path.join(tablePath, name + '.bin'), dtype=dtype)
+
+
+def compareTables(sourcePath=TABLE_SOURCE_PATH, tablePath=TABLE_PATH):
+    """Compare every blob with the C array literal it was built from.
+
+    Returns:
+        differences (list): (name, maximum absolute difference) of each table.
+    """
+    return [
+        (name, np.max(np.abs(loadTable(name, dtype, tablePath) -
+            parseTable(os.path.join(sourcePath, fileName), name))))
+        for name, fileName, dtype, count in TABLES
+    ]
+
+
+if __name__ == "__main__":
+    buildTables()
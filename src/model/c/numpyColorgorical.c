@@ -78,6 +78,227 @@ void double_score_ufunc(char **args, npy_intp *dimensions, npy_intp* steps,
 }
 
 
+// Shared loop of the metric-selective ufuncs. Each row of the input holds two
+// CIE Lab colors; only the requested pair metrics are computed, written to the
+// first columns of the row in the order given, and the remaining columns are
+// set to NaN.
+static void pairMetricLoop(char **args, npy_intp *dimensions, npy_intp* steps,
+    const pairMetric *metrics, int nmetrics) {
+  npy_intp i;
+  npy_intp n = dimensions[0];
+  int m;
+
+  int nrow = 6;
+
+  char *in = args[0], *out = args[1];
+  npy_intp in_step = steps[0];
+  npy_intp out_step = steps[1];
+
+  double l1,a1,b1,l2,a2,b2;
+
+  for(i = 0; i < n/nrow; i++) {
+    l1 = *(double *) in;
+    in+=in_step;
+    a1 = *(double *) in;
+    in+=in_step;
+    b1 = *(double *) in;
+    in+=in_step;
+
+    l2 = *(double *) in;
+    in+=in_step;
+    a2 = *(double *) in;
+    in+=in_step;
+    b2 = *(double *) in;
+    in+=in_step;
+
+    for(m = 0; m < nmetrics; m++) {
+      *((double *) out) = metrics[m](l1,a1,b1,l2,a2,b2);
+      out +=out_step;
+    }
+    for(m = nmetrics; m < nrow; m++) {
+      *((double *) out) = NAN;
+      out +=out_step;
+    }
+  }
+}
+
+static const pairMetric CIEDE2000_METRICS[1] = {&ciede2000};
+static const pairMetric NAME_DIFFERENCE_METRICS[1] = {&nameDifference};
+static const pairMetric PAIR_PREFERENCE_METRICS[1] = {&pairPreference};
+static const pairMetric PAIR_SCORE_METRICS[3] =
+    {&ciede2000, &nameDifference, &pairPreference};
+
+void double_ciede2000_ufunc(char **args, npy_intp *dimensions,
+    npy_intp* steps, void* data) {
+  assert(dimensions[1] == 6);
+  pairMetricLoop(args, dimensions, steps, CIEDE2000_METRICS, 1);
+}
+
+void double_nameDifference_ufunc(char **args, npy_intp *dimensions,
+    npy_intp* steps, void* data) {
+  assert(dimensions[1] == 6);
+  pairMetricLoop(args, dimensions, steps, NAME_DIFFERENCE_METRICS, 1);
+}
+
+void double_pairPreference_ufunc(char **args, npy_intp *dimensions,
+    npy_intp* steps, void* data) {
+  assert(dimensions[1] == 6);
+  pairMetricLoop(args, dimensions, steps, PAIR_PREFERENCE_METRICS, 1);
+}
+
+void double_scorePair_ufunc(char **args, npy_intp *dimensions,
+    npy_intp* steps, void* data) {
+  assert(dimensions[1] == 6);
+  pairMetricLoop(args, dimensions, steps, PAIR_SCORE_METRICS, 3);
+}
+
+
+void double_nameUniqueness_ufunc(char **args, npy_intp *dimensions,
+    npy_intp* steps, void* data) {
+  npy_intp i;
+  npy_intp n = dimensions[0];
+  assert(dimensions[1] == 3);
+
+  char *in = args[0], *out = args[1];
+  npy_intp in_step = steps[0];
+  npy_intp out_step = steps[1];
+
+  double l,a,b;
+
+  for(i = 0; i < n; i+=3) {
+    l = *(double *) in;
+    in+=in_step;
+    a = *(double *) in;
+    in+=in_step;
+    b = *(double *) in;
+    in+=in_step;
+
+    *((double *) out) = nameUniqueness(l, a, b);
+    out +=out_step;
+    *((double *) out) = NAN;
+    out +=out_step;
+    *((double *) out) = NAN;
+    out +=out_step;
+  }
+}
+
+
+void double_minScores_gufunc(char **args, npy_intp *dimensions,
+    npy_intp* steps, void* data) {
+  npy_intp outer, i, j;
+  npy_intp nouter = dimensions[0];
+  npy_intp n = dimensions[1], m = dimensions[3];
+  int c;
+
+  char *candidates = args[0], *colors = args[1], *out = args[2];
+  npy_intp candidates_outer_step = steps[0], colors_outer_step = steps[1],
+      out_outer_step = steps[2];
+  npy_intp candidates_n_step = steps[3], candidates_d_step = steps[4];
+  npy_intp colors_m_step = steps[5], colors_d_step = steps[6];
+  npy_intp out_n_step = steps[7], out_d_step = steps[8];
+
+  // The metric of each output column, or NULL for columns left as NaN
+  const pairMetric *metrics = (const pairMetric *) data;
+
+  char *candidate, *color, *score;
+  double l1,a1,b1,l2,a2,b2, s, mins[3];
+
+  assert(dimensions[2] == 3);
+
+  for(outer = 0; outer < nouter; outer++) {
+    for(i = 0; i < n; i++) {
+      candidate = candidates + i*candidates_n_step;
+      l1 = *(double *) candidate;
+      a1 = *(double *) (candidate + candidates_d_step);
+      b1 = *(double *) (candidate + 2*candidates_d_step);
+
+      for(c = 0; c < 3; c++) mins[c] = metrics[c] != NULL ? INFINITY : NAN;
+
+      // NaN scores stick, as they would with np.minimum
+      for(j = 0; j < m; j++) {
+        color = colors + j*colors_m_step;
+        l2 = *(double *) color;
+        a2 = *(double *) (color + colors_d_step);
+        b2 = *(double *) (color + 2*colors_d_step);
+
+        for(c = 0; c < 3; c++) {
+          if(metrics[c] == NULL) continue;
+          s = metrics[c](l1,a1,b1,l2,a2,b2);
+          if(s < mins[c] || isnan(s)) mins[c] = s;
+        }
+      }
+
+      score = out + i*out_n_step;
+      for(c = 0; c < 3; c++) *((double *) (score + c*out_d_step)) = mins[c];
+    }
+
+    candidates += candidates_outer_step;
+    colors += colors_outer_step;
+    out += out_outer_step;
+  }
+}
+
+
+static PyObject *colorNameCounts(PyObject *self, PyObject *args) {
+  npy_intp termDims[2] = {8325, 153};
+  npy_intp colorDims[1] = {8325};
+  PyObject *terms, *colors;
+  int *termData, *colorData;
+  npy_intp i;
+
+  terms = PyArray_SimpleNew(2, termDims, NPY_INT);
+  if(terms == NULL) return NULL;
+  colors = PyArray_SimpleNew(1, colorDims, NPY_INT);
+  if(colors == NULL) {
+    Py_DECREF(terms);
+    return NULL;
+  }
+
+  termData = (int *) PyArray_DATA((PyArrayObject *) terms);
+  for(i = 0; i < termDims[0] * termDims[1]; i++) {
+    termData[i] = COLORGORICAL_NAMES_T[i];
+  }
+  colorData = (int *) PyArray_DATA((PyArrayObject *) colors);
+  for(i = 0; i < colorDims[0]; i++) {
+    colorData[i] = COLORGORICAL_NAMES_CCOUNT[i];
+  }
+
+  return Py_BuildValue("NN", terms, colors);
+}
+
+
+void double_illuminantC_ufunc(char **args, npy_intp *dimensions,
+    npy_intp* steps, void* data) {
+  npy_intp i;
+  npy_intp n = dimensions[0];
+  assert(dimensions[1] == 3);
+
+  char *in = args[0], *out = args[1];
+  npy_intp in_step = steps[0];
+  npy_intp out_step = steps[1];
+
+  double l,a,b, LCH[3];
+
+  for(i = 0; i < n; i+=3) {
+    l = *(double *) in;
+    in+=in_step;
+    a = *(double *) in;
+    in+=in_step;
+    b = *(double *) in;
+    in+=in_step;
+
+    labToIlluminantCLCH(l, a, b, LCH);
+
+    *((double *) out) = LCH[0];
+    out +=out_step;
+    *((double *) out) = LCH[1];
+    out +=out_step;
+    *((double *) out) = LCH[2];
+    out +=out_step;
+  }
+}
+
+
 void double_scorePenalty_ufunc(char **args, npy_intp *dimensions,
     npy_intp* steps, void* data) {
   npy_intp i;
@@ -99,7 +320,7 @@ void double_scorePenalty_ufunc(char **args, npy_intp *dimensions,
     b = *(double *) in;
     in+=in_step;
 
-    colorIdx = getLabIndex(l, a, b) * 2;
+    colorIdx = getClampedLabIndex(l, a, b) * 2;
     hue = COLORGORICAL_LAB_TO_CH[colorIdx+1];
 
     if(hue >= 70.0 && hue <= 115.0) { // ``puke''-like colors
@@ -136,13 +357,50 @@ PyUFuncGenericFunction double_scorePenalty_func[1] =
 static char double_scorePenalty_types[2] = {NPY_DOUBLE, NPY_DOUBLE};
 static void *double_scorePenalty_data[1] = {NULL};
 
+PyUFuncGenericFunction double_ciede2000_func[1] = {&double_ciede2000_ufunc};
+PyUFuncGenericFunction double_nameDifference_func[1] =
+    {&double_nameDifference_ufunc};
+PyUFuncGenericFunction double_pairPreference_func[1] =
+    {&double_pairPreference_ufunc};
+PyUFuncGenericFunction double_scorePair_func[1] = {&double_scorePair_ufunc};
+PyUFuncGenericFunction double_nameUniqueness_func[1] =
+    {&double_nameUniqueness_ufunc};
+PyUFuncGenericFunction double_illuminantC_func[1] =
+    {&double_illuminantC_ufunc};
+static char double_metric_types[2] = {NPY_DOUBLE, NPY_DOUBLE};
+static void *double_metric_data[1] = {NULL};
+
+PyUFuncGenericFunction double_minScores_func[1] = {&double_minScores_gufunc};
+static char double_minScores_types[3] = {NPY_DOUBLE, NPY_DOUBLE, NPY_DOUBLE};
+static pairMetric MIN_SCORES_METRICS[3] =
+    {&ciede2000, &nameDifference, &pairPreference};
+static void *double_minScores_data[1] = {MIN_SCORES_METRICS};
+static pairMetric MIN_SCORES_EXCEPT_NAME_DIFFERENCE_METRICS[3] =
+    {&ciede2000, NULL, &pairPreference};
+static void *double_minScoresExceptNameDifference_data[1] =
+    {MIN_SCORES_EXCEPT_NAME_DIFFERENCE_METRICS};
+
+// Creates a one input, one output double ufunc and adds it to the module.
+static void addMetricUfunc(PyObject *dict, PyUFuncGenericFunction *func,
+    char *name) {
+  PyObject *ufunc = PyUFunc_FromFuncAndData(func, double_metric_data,
+                                  double_metric_types, 1, 1, 1, PyUFunc_None,
+                                  name, "metric_docstring", 0);
+  PyDict_SetItemString(dict, name, ufunc);
+  Py_DECREF(ufunc);
+}
+
 // TODO improve documentation on what this object does
 static PyMethodDef ScoreMethods[] = {
+        {"colorNameCounts", colorNameCounts, METH_NOARGS,
+            "Copies of the color-term counts and total term counts of colors."},
         {NULL, NULL, 0, NULL}
 };
 
 PyMODINIT_FUNC initnumpyColorgorical(void) {
-  PyObject *colorIndex, *dict, *module, *score, *scorePenalty;
+  PyObject *colorIndex, *dict, *minScores, *minScoresExceptNameDifference,
+      *module, *score, *scorePenalty;
+  const char *tablesError;
 
   module = Py_InitModule("numpyColorgorical", ScoreMethods);
   if (module == NULL) return;
@@ -150,6 +408,14 @@ PyMODINIT_FUNC initnumpyColorgorical(void) {
   import_array();
   import_umath();
 
+  tablesError = loadColorgoricalTables(NULL);
+  if(tablesError != NULL) {
+    PyErr_SetString(PyExc_ImportError, tablesError);
+    return;
+  }
+
+  initLabToIlluminantC();
+
   colorIndex = PyUFunc_FromFuncAndData(double_colorIndex_func, double_colorIndex_data,
                                   double_colorIndex_types, 1, 1, 1, PyUFunc_None,
                                   "colorIndex", "colorIndex_docstring", 0);
@@ -164,6 +430,21 @@ PyMODINIT_FUNC initnumpyColorgorical(void) {
                                   PyUFunc_None, "scorePenalty",
                                   "scorePenalty_docstring", 0);
 
+  minScores = PyUFunc_FromFuncAndDataAndSignature(double_minScores_func,
+                                  double_minScores_data,
+                                  double_minScores_types, 1, 2, 1,
+                                  PyUFunc_None, "minScores",
+                                  "minScores_docstring", 0,
+                                  "(n,d),(m,d)->(n,d)");
+
+  minScoresExceptNameDifference = PyUFunc_FromFuncAndDataAndSignature(
+                                  double_minScores_func,
+                                  double_minScoresExceptNameDifference_data,
+                                  double_minScores_types, 1, 2, 1,
+                                  PyUFunc_None, "minScoresExceptNameDifference",
+                                  "minScores_docstring", 0,
+                                  "(n,d),(m,d)->(n,d)");
+
   dict = PyModule_GetDict(module);
 
   PyDict_SetItemString(dict, "colorIndex", colorIndex);
@@ -174,4 +455,18 @@ PyMODINIT_FUNC initnumpyColorgorical(void) {
 
   PyDict_SetItemString(dict, "scorePenalty", scorePenalty);
   Py_DECREF(scorePenalty);
+
+  PyDict_SetItemString(dict, "minScores", minScores);
+  Py_DECREF(minScores);
+
+  PyDict_SetItemString(dict, "minScoresExceptNameDifference",
+      minScoresExceptNameDifference);
+  Py_DECREF(minScoresExceptNameDifference);
+
+  addMetricUfunc(dict, double_ciede2000_func, "ciede2000");
+  addMetricUfunc(dict, double_nameDifference_func, "nameDifference");
+  addMetricUfunc(dict, double_pairPreference_func, "pairPreference");
+  addMetricUfunc(dict, double_scorePair_func, "scorePair");
+  addMetricUfunc(dict, double_nameUniqueness_func, "nameUniqueness");
+  addMetricUfunc(dict, double_illuminantC_func, "illuminantC");
 }
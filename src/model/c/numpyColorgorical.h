@@ -2,18 +2,26 @@
 #define NUMPY_COLORGORICAL_H
 
 #include <assert.h>
+#include <math.h>
 #include "Python.h"
+#include "numpy/arrayobject.h"
 #include "numpy/ndarraytypes.h"
 #include "numpy/ufuncobject.h"
 #include "numpy/npy_3kcompat.h"
 
 #include "scores/scores.h"
 #include "util/getIndex.h"
+#include "util/tables.h"
 
 // NOTE: for ufuncs it is EXTREMELY important that all input np.ndarrays are
 // contiguous (i.e., passed through np.ascontiguousarray). Otherwise you will
 // likely get segfaults from the ufunc trying to step into bad neighboring
 // memory blocks.
+//
+// NOTE: the ufunc loops below must stay reentrant and must not call the Python
+// C API. They only take double arrays, so NumPy releases the GIL while running
+// them (NPY_BEGIN_THREADS), which lets `scoring.Scorer` score row chunks on
+// several threads at once.
 
 // Retrieves the 1D indecies of Lab colors in an n x 3 numpy array. An example
 // use of this function would be to create bit masks based on what colors are
@@ -31,6 +39,45 @@ extern void double_score_ufunc(char **args, npy_intp *dimensions, npy_intp* step
     void* data);
 
 
+// A pair metric from `scores/scores.h`, e.g., `ciede2000`.
+typedef double (*pairMetric)(double, double, double, double, double, double);
+
+// Metric-selective versions of `double_score_ufunc` that only compute the
+// scores their callers use. Each expects the same 6 column array of color
+// pairs. The ciede2000, nameDifference, and pairPreference ufuncs write their
+// metric to the first column of each row, and scorePair writes the CIEDE2000,
+// name difference, and pair preference scores to the first three columns
+// (skipping both name uniqueness scores). Unused columns are set to NaN.
+extern void double_ciede2000_ufunc(char **args, npy_intp *dimensions,
+    npy_intp* steps, void* data);
+extern void double_nameDifference_ufunc(char **args, npy_intp *dimensions,
+    npy_intp* steps, void* data);
+extern void double_pairPreference_ufunc(char **args, npy_intp *dimensions,
+    npy_intp* steps, void* data);
+extern void double_scorePair_ufunc(char **args, npy_intp *dimensions,
+    npy_intp* steps, void* data);
+
+// Computes the name uniqueness of each color in an n x 3 array of CIE Lab
+// colors, written to the first column of each row.
+extern void double_nameUniqueness_ufunc(char **args, npy_intp *dimensions,
+    npy_intp* steps, void* data);
+
+// Converts an n x 3 array of CIE Lab D65 colors to Illuminant C CIE LCh, the
+// space pair preference is defined in.
+extern void double_illuminantC_ufunc(char **args, npy_intp *dimensions,
+    npy_intp* steps, void* data);
+
+// A generalized ufunc with the signature (n,d),(m,d)->(n,d) that computes the
+// minimum CIEDE2000, name difference, and pair preference score of each of n
+// candidate CIE Lab colors to any of m colors (d must be 3), without
+// materializing the n x m pairs. Unlike the other ufuncs, it steps through its
+// arrays with their strides and therefore accepts non-contiguous input. The
+// metric of each column is passed through the data pointer, which lets
+// minScoresExceptNameDifference leave the name difference column as NaN for
+// callers that compute name difference as a matrix product instead.
+extern void double_minScores_gufunc(char **args, npy_intp *dimensions,
+    npy_intp* steps, void* data);
+
 // To minimize the likelihood of sampling from what is cross-culturally
 // considered an ``ugly'' region of color space, this function accepts an array
 // of CIE Lab colors that fall on intervals of 5 from the origin (i.e., are
@@ -1,8 +1,11 @@
 #ifndef COLORGORICAL_COLOR_NAMES_H
 #define COLORGORICAL_COLOR_NAMES_H
 
-extern int COLORGORICAL_NAMES_CCOUNT[8325];
-extern int COLORGORICAL_NAMES_TCOUNT[153];
-extern int COLORGORICAL_NAMES_T[1273725];
+#include <stdint.h>
+
+// Memory mapped by loadColorgoricalTables (see util/tables.h)
+extern const int16_t *COLORGORICAL_NAMES_CCOUNT; // 8325 colors
+extern const int32_t *COLORGORICAL_NAMES_TCOUNT; // 153 terms
+extern const int16_t *COLORGORICAL_NAMES_T; // 8325 colors * 153 terms
 
 #endif
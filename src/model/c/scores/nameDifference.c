@@ -4,6 +4,9 @@ double nameDifference(double L1, double a1, double b1, double L2, double a2, dou
   int ai = getColorIndex(L1, a1, b1);
   int bi = getColorIndex(L2, a2, b2);
 
+  // Only colors in the color space have color name counts
+  if(ai < 0 || bi < 0) return NAN;
+
   double z = sqrt(COLORGORICAL_NAMES_CCOUNT[ai]*COLORGORICAL_NAMES_CCOUNT[bi]);
   double bc = 0;
 
@@ -8,6 +8,9 @@ double nameUniqueness(double L, double a, double b) {
   double H = 0; // color term entropy, i.e. name uniqueness
   double p;
 
+  // Only colors in the color space have color name counts
+  if(ci < 0) return NAN;
+
   for(ti = 0; ti < termCount; ti++) {
     count = COLORGORICAL_NAMES_T[ci*termCount + ti];
     if(count == -1) {
@@ -10,6 +10,7 @@
 #include "../util/labToAchromaticPreference.h"
 #include "../util/labToCH.h"
 #include "../util/labToCoolness.h"
+#include "../util/labToIlluminantC.h"
 #include "colorNames/colorNames.h"
 
 // CIEDE2000 calculates the perceptual distance of two CIE Lab colors. This
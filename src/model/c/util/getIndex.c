@@ -1,3 +1,4 @@
+#include <math.h>
 #include "getIndex.h"
 
 // Assumes L,a,b will be a multiple of 5
@@ -12,6 +13,22 @@ int getLabIndex(int L, int a, int b) {
   return i;
 }
 
+static inline double clamp(double x, double low, double high) {
+  return x < low ? low : (x > high ? high : x);
+}
+
+int getClampedLabIndex(double L, double a, double b) {
+  return getLabIndex(clamp(L, 0, 100), clamp(a, -85, 100), clamp(b, -110, 95));
+}
+
+// Returns -1 for colors that are not in the 8,325-color space, including
+// colors outside of the lattice
 int getColorIndex(int L, int a, int b) {
+  if(!isLatticeLab(L, a, b)) return -1;
   return COLORGORICAL_CIS[getLabIndex(L,a,b)];
 }
+
+int isLatticeLab(double L, double a, double b) {
+  return L >= 0 && L <= 100 && a >= -85 && a <= 100 && b >= -110 && b <= 95 &&
+      fmod(L, 5.0) == 0 && fmod(a, 5.0) == 0 && fmod(b, 5.0) == 0;
+}
@@ -1,7 +1,10 @@
 #ifndef COLORGORICAL_GET_INDEX_H
 #define COLORGORICAL_GET_INDEX_H
 
-extern int COLORGORICAL_CIS[];
+#include <stdint.h>
+
+// 33516 entries; memory mapped by loadColorgoricalTables (see util/tables.h)
+extern const int16_t *COLORGORICAL_CIS;
 
 // Convenience function for indexing into a 3D Lab array arranged by CIE L, a, b
 // L = [0,100]; a = [-85, 100]; b = [-110, 95]
@@ -9,8 +12,15 @@ extern int COLORGORICAL_CIS[];
 // Assumes L,a,b will be a multiple of 5
 // Is dependent on data/allColors.csv positions
 extern int getLabIndex(int L, int a, int b);
+// getLabIndex of the lattice point nearest to L,a,b along any coordinate that
+// is outside of the bounds above, so colors outside of them index in bounds
+extern int getClampedLabIndex(double L, double a, double b);
 // Given L, a, b this retrieves the L,a,b location in a 8,325 array of L,a,b space
 //   This is typically only used in functions like the name difference score
+//   Returns -1 for colors that are not in the color space
 extern int getColorIndex(int L, int a, int b);
+// Whether L,a,b is a point of the lattice getLabIndex indexes, i.e., every
+// coordinate is a multiple of 5 within the bounds above
+extern int isLatticeLab(double L, double a, double b);
 
 #endif
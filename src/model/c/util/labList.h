@@ -1,7 +1,10 @@
 #ifndef COLORGORICAL_UTIL_LAB_H
 #define COLORGORICAL_UTIL_LAB_H
 
-extern int COLORGORICAL_LAB[24975]; // 8325 Lab colors * 3
-extern int COLORGORICAL_LAB_IS_VALID_RGB[8325]; // true/false for 8325 Lab
+#include <stdint.h>
+
+// Memory mapped by loadColorgoricalTables (see util/tables.h)
+extern const int8_t *COLORGORICAL_LAB; // 8325 Lab colors * 3
+extern const uint8_t *COLORGORICAL_LAB_IS_VALID_RGB; // true/false for 8325 Lab
 
 #endif
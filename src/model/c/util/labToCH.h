@@ -1,6 +1,8 @@
 #ifndef COLORGORICAL_UTIL_LAB_TO_CH_H
 #define COLORGORICAL_UTIL_LAB_TO_CH_H
 
-extern double COLORGORICAL_LAB_TO_CH[67032]; // 21 L values, 38 a values, 42 b values, {C,H}
+// 67032 entries: 21 L values, 38 a values, 42 b values, {C,H}; memory mapped
+// by loadColorgoricalTables (see util/tables.h)
+extern const float *COLORGORICAL_LAB_TO_CH;
 
 #endif
@@ -1,6 +1,7 @@
 #ifndef COLORGORICAL_LAB_TO_COOLNESS_H
 #define COLORGORICAL_LAB_TO_COOLNESS_H
 
-extern double COLORGORICAL_LAB_TO_COOLNESS[33516];
+// 33516 entries; memory mapped by loadColorgoricalTables (see util/tables.h)
+extern const float *COLORGORICAL_LAB_TO_COOLNESS;
 
 #endif
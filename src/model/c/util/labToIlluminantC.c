@@ -0,0 +1,82 @@
+#include <math.h>
+#include "getIndex.h"
+#include "labToIlluminantC.h"
+
+#ifndef M_PI
+#    define M_PI 3.14159265358979323846
+#endif
+
+double COLORGORICAL_LAB_TO_ILLUMINANT_C_LH[67032];
+
+
+// Calculate the scalar needed to convert an XYZ color to Lab
+static inline double XYZtoLab_f(double t) {
+  if(t > pow(6.0/29.0, 3)) {
+    return pow(t, 1.0/3.0);
+  } else {
+    return (1.0/3.0) * (29.0/6.0)*(29.0/6.0) * t + 4.0/29.0;
+  }
+}
+
+
+// Calculate the scalar needed to convert an Lab color to XYZ.
+static inline double LabToXYZ_f(double t) {
+  return t > 6.0/29.0 ? t*t*t : 3.0 * (6.0/29)*(6.0/29) * (t - 4.0/29.0);
+}
+
+
+void labToIlluminantCLCH(double L_old, double a_old, double b_old,
+    double *LCH) {
+  double ILLUMINANT_C_X = 98.074;
+  double ILLUMINANT_C_Y = 100.0;
+  double ILLUMINANT_C_Z = 118.232;
+
+  double ILLUMINANT_D65_X = 95.0470;
+  double ILLUMINANT_D65_Y = 100.0;
+  double ILLUMINANT_D65_Z = 108.8830;
+
+  // Derive X,Y,Z from Lab by inversing the transformation
+  double LabToXYZ_f_x_input = (1.0/116.0)*(L_old + 16) + (1.0/500.0)*a_old;
+  double LabToXYZ_f_y_input = (1.0/116.0)*(L_old + 16);
+  double LabToXYZ_f_z_input = (1./116)*(L_old + 16) - (1./200)*b_old;
+
+  double X = ILLUMINANT_D65_X * LabToXYZ_f(LabToXYZ_f_x_input);
+  double Y = ILLUMINANT_D65_Y * LabToXYZ_f(LabToXYZ_f_y_input);
+  double Z = ILLUMINANT_D65_Z * LabToXYZ_f(LabToXYZ_f_z_input);
+
+  double deconstructY = XYZtoLab_f(Y / ILLUMINANT_C_Y);
+  double L = 116 * deconstructY - 16;
+  double a = 500 * ( XYZtoLab_f(X / ILLUMINANT_C_X) - deconstructY );
+  double b = 200 * ( deconstructY - XYZtoLab_f(Z/ILLUMINANT_C_Z) );
+
+  // Convert Lab Illuminant C to LCH
+  double C = sqrt(a*a + b*b);
+  double H = atan2(b,a) * 180.0 / M_PI;
+  if(H < 0.0) H = H + 360.0;
+  if(H > 360.0) H = 360.0 - H;
+
+  LCH[0] = L;
+  LCH[1] = C;
+  LCH[2] = H;
+}
+
+
+void labToIlluminantCLH(double L, double a, double b, double *LH) {
+  double LCH[3];
+  labToIlluminantCLCH(L, a, b, LCH);
+  LH[0] = LCH[0];
+  LH[1] = LCH[2];
+}
+
+
+void initLabToIlluminantC(void) {
+  int L, a, b;
+  for(L = 0; L <= 100; L += 5) {
+    for(a = -85; a <= 100; a += 5) {
+      for(b = -110; b <= 95; b += 5) {
+        labToIlluminantCLH(L, a, b,
+            &COLORGORICAL_LAB_TO_ILLUMINANT_C_LH[getLabIndex(L, a, b) * 2]);
+      }
+    }
+  }
+}
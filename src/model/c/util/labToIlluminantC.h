@@ -0,0 +1,24 @@
+#ifndef COLORGORICAL_UTIL_LAB_TO_ILLUMINANT_C_H
+#define COLORGORICAL_UTIL_LAB_TO_ILLUMINANT_C_H
+
+// Illuminant C CIE LCh lightness and hue of every point of the CIE Lab D65
+// lattice, indexed by getLabIndex(L,a,b) * 2: 21 L values, 38 a values,
+// 42 b values, {L,H}. Filled by initLabToIlluminantC.
+extern double COLORGORICAL_LAB_TO_ILLUMINANT_C_LH[67032];
+
+// Converts a CIE Lab color characterized with Illuminant D65 to its Illuminant
+// C characterized CIE LCh equivalent, which is written to LCH. This conversion
+// is required since our model relies on a D65 characterization, but Schloss
+// and Palmer's pair preference function was defined in Illuminant C
+// characterized CIE Lab space.
+extern void labToIlluminantCLCH(double L, double a, double b, double *LCH);
+
+// Like labToIlluminantCLCH, but only writes the lightness and hue to LH[0]
+// and LH[1].
+extern void labToIlluminantCLH(double L, double a, double b, double *LH);
+
+// Fills COLORGORICAL_LAB_TO_ILLUMINANT_C_LH. Must be called once before any
+// scores are computed.
+extern void initLabToIlluminantC(void);
+
+#endif
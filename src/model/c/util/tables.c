@@ -0,0 +1,137 @@
+// dladdr is a GNU extension on glibc
+#define _GNU_SOURCE
+
+#include <dlfcn.h>
+#include <fcntl.h>
+#include <limits.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+
+#include "getIndex.h"
+#include "labList.h"
+#include "labToCH.h"
+#include "labToCoolness.h"
+#include "tables.h"
+#include "../scores/colorNames/colorNames.h"
+
+const float *COLORGORICAL_LAB_TO_CH = NULL;
+const float *COLORGORICAL_LAB_TO_COOLNESS = NULL;
+const int16_t *COLORGORICAL_CIS = NULL;
+const int8_t *COLORGORICAL_LAB = NULL;
+const uint8_t *COLORGORICAL_LAB_IS_VALID_RGB = NULL;
+const int16_t *COLORGORICAL_NAMES_CCOUNT = NULL;
+const int32_t *COLORGORICAL_NAMES_TCOUNT = NULL;
+const int16_t *COLORGORICAL_NAMES_T = NULL;
+
+// A table blob: its name, number of entries, entry size, and the pointer the
+// mapped table is assigned to. Must match TABLES in `buildTables.py`.
+typedef struct {
+  const char *name;
+  size_t count;
+  size_t size;
+  const void **table;
+} colorgoricalTable;
+
+static colorgoricalTable COLORGORICAL_TABLES[] = {
+  {"COLORGORICAL_LAB_TO_CH", 67032, sizeof(float),
+      (const void **) &COLORGORICAL_LAB_TO_CH},
+  {"COLORGORICAL_LAB_TO_COOLNESS", 33516, sizeof(float),
+      (const void **) &COLORGORICAL_LAB_TO_COOLNESS},
+  {"COLORGORICAL_CIS", 33516, sizeof(int16_t),
+      (const void **) &COLORGORICAL_CIS},
+  {"COLORGORICAL_LAB", 24975, sizeof(int8_t),
+      (const void **) &COLORGORICAL_LAB},
+  {"COLORGORICAL_LAB_IS_VALID_RGB", 8325, sizeof(uint8_t),
+      (const void **) &COLORGORICAL_LAB_IS_VALID_RGB},
+  {"COLORGORICAL_NAMES_CCOUNT", 8325, sizeof(int16_t),
+      (const void **) &COLORGORICAL_NAMES_CCOUNT},
+  {"COLORGORICAL_NAMES_TCOUNT", 153, sizeof(int32_t),
+      (const void **) &COLORGORICAL_NAMES_TCOUNT},
+  {"COLORGORICAL_NAMES_T", 1273725, sizeof(int16_t),
+      (const void **) &COLORGORICAL_NAMES_T}
+};
+
+static char tablesError[PATH_MAX + 128];
+
+
+// Finds the default table directory next to the extension's shared library.
+static const char *defaultTablesDirectory(char *directory) {
+  Dl_info info;
+  char *slash;
+
+  if(dladdr((void *) &loadColorgoricalTables, &info) == 0 ||
+      info.dli_fname == NULL) {
+    return NULL;
+  }
+
+  slash = strrchr(info.dli_fname, '/');
+  if(slash == NULL) {
+    snprintf(directory, PATH_MAX, "%s", COLORGORICAL_TABLES_DIR);
+  } else {
+    snprintf(directory, PATH_MAX, "%.*s/%s", (int) (slash - info.dli_fname),
+        info.dli_fname, COLORGORICAL_TABLES_DIR);
+  }
+  return directory;
+}
+
+
+// Maps one table blob, returning NULL on success or an error message.
+static const char *mapTable(const char *directory, colorgoricalTable *table) {
+  char path[PATH_MAX];
+  struct stat status;
+  void *mapped;
+  int fd;
+
+  if(snprintf(path, PATH_MAX, "%s/%s.bin", directory, table->name) >=
+      PATH_MAX) {
+    snprintf(tablesError, sizeof(tablesError), "The path of %s in %.*s is too "
+        "long.", table->name, PATH_MAX - 1, directory);
+    return tablesError;
+  }
+
+  fd = open(path, O_RDONLY);
+  if(fd < 0) {
+    snprintf(tablesError, sizeof(tablesError), "Cannot open %s; run "
+        "buildTables.py to generate Colorgorical's tables.", path);
+    return tablesError;
+  }
+
+  if(fstat(fd, &status) != 0 ||
+      (size_t) status.st_size != table->count * table->size) {
+    close(fd);
+    snprintf(tablesError, sizeof(tablesError), "%s has the wrong size; run "
+        "buildTables.py to regenerate Colorgorical's tables.", path);
+    return tablesError;
+  }
+
+  mapped = mmap(NULL, status.st_size, PROT_READ, MAP_SHARED, fd, 0);
+  close(fd);
+  if(mapped == MAP_FAILED) {
+    snprintf(tablesError, sizeof(tablesError), "Cannot map %s.", path);
+    return tablesError;
+  }
+
+  *table->table = mapped;
+  return NULL;
+}
+
+
+const char *loadColorgoricalTables(const char *directory) {
+  char defaultDirectory[PATH_MAX];
+  const char *error;
+  size_t i;
+
+  if(directory == NULL) directory = getenv(COLORGORICAL_TABLES_ENV);
+  if(directory == NULL) directory = defaultTablesDirectory(defaultDirectory);
+  if(directory == NULL) return "Cannot find Colorgorical's table directory.";
+
+  for(i = 0; i < sizeof(COLORGORICAL_TABLES)/sizeof(colorgoricalTable); i++) {
+    error = mapTable(directory, &COLORGORICAL_TABLES[i]);
+    if(error != NULL) return error;
+  }
+  return NULL;
+}
@@ -0,0 +1,22 @@
+#ifndef COLORGORICAL_UTIL_TABLES_H
+#define COLORGORICAL_UTIL_TABLES_H
+
+// Colorgorical's large lookup tables (e.g., COLORGORICAL_LAB_TO_CH) are not
+// compiled into the extension. `buildTables.py` converts the C array literals
+// in `c/tables` into compact binary blobs (float32 or small integer types,
+// native byte order), one `<table name>.bin` file per table, which are memory
+// mapped read-only when the module is imported. Forked processes therefore
+// share a single copy of the tables through the page cache.
+
+// Environment variable that overrides the directory the blobs are loaded from.
+#define COLORGORICAL_TABLES_ENV "COLORGORICAL_TABLES"
+
+// Default directory of the blobs, relative to the extension's shared library.
+#define COLORGORICAL_TABLES_DIR "tables"
+
+// Maps every table blob from directory, or, if directory is NULL, from
+// $COLORGORICAL_TABLES or the COLORGORICAL_TABLES_DIR next to the extension.
+// Returns NULL on success and an error message otherwise.
+extern const char *loadColorgoricalTables(const char *directory);
+
+#endif
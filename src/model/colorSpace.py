@@ -0,0 +1,148 @@
+"""Precomputed per-color data of the 8,325-color CIE Lab space.
+
+Parsing `data/allColors.csv` and scoring every color to derive its name
+uniqueness is slow enough to dominate model startup, so the parsed color space
+and all derived per-color arrays are written once as `.npy` files and memory
+mapped afterwards, which also lets server processes share them through the
+page cache. The files record the SHA-1 of the CSV they were built from and are
+rebuilt automatically whenever the CSV (or the format version) changes.
+"""
+import hashlib
+import json
+import os
+import numpy as np
+
+import numpyColorgorical as npc
+
+# Version of the on-disk format; bump whenever the arrays or their derivation
+# change.
+COLOR_SPACE_VERSION = 1
+
+COLOR_SPACE_METADATA = 'colorSpace.json'
+
+# The per-color arrays stored, each in its own `<name>.npy` file.
+COLOR_SPACE_ARRAYS = ('colorSpaces', 'nameUniquenesses', 'scorePenalties',
+    'isRGB', 'isUgly', 'illuminantC', 'nameTermVectors')
+
+
+def csvChecksum(csvPath):
+    """The SHA-1 hex digest of a color space CSV."""
+    with open(csvPath, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def computeColorSpace(csvPath):
+    """Parse a color space CSV and derive its per-color arrays.
+
+    Args:
+        csvPath (str): the path of the color space CSV, whose rows are colors
+            and whose columns are CIE Lab, CIE HCL, and RGB coordinates.
+
+    Returns:
+        arrays (dict): the arrays in COLOR_SPACE_ARRAYS keyed by name.
+    """
+    colorSpaces = np.loadtxt(open(csvPath, 'rb'), delimiter=',')
+    labs = np.ascontiguousarray(colorSpaces[:,:3])
+
+    isRGB = np.all(np.logical_and(colorSpaces[:,[6,7,8]] >= 0,
+        colorSpaces[:,[6,7,8]] <= 255), axis=1)
+
+    # ``ugly'' colors are never sampled
+    # TODO push this to the scorePenalty C function as a 0 weighting
+    hues = colorSpaces[:,3]
+    with np.errstate(invalid='ignore'):
+        isUgly = np.all([hues >= 85, hues <= 114, labs[:,0] <= 75,
+            labs[:,0] >= 35], axis=0)
+
+    # Square roots of each color's color-term probabilities, such that the
+    # name difference of two colors is sqrt(1 - their dot product)
+    termCounts, colorCounts = npc.colorNameCounts()
+    nameTermVectors = np.sqrt(np.maximum(termCounts, 0) /
+        colorCounts[:,np.newaxis].astype(np.float64))
+
+    return dict(
+        colorSpaces=colorSpaces,
+        nameUniquenesses=npc.nameUniqueness(labs)[:,0],
+        scorePenalties=npc.scorePenalty(labs)[:,0],
+        isRGB=isRGB,
+        isUgly=isUgly,
+        illuminantC=npc.illuminantC(labs),
+        nameTermVectors=nameTermVectors
+    )
+
+
+def writeColorSpace(arrays, csvPath, outputPath):
+    """Write the per-color arrays of a color space CSV to disk.
+
+    Every file is written under a temporary name and renamed into place, and
+    the metadata is written last, so that concurrently starting processes
+    never load a partially written color space.
+
+    Args:
+        arrays (dict): the arrays computed by `computeColorSpace`.
+        csvPath (str): the path of the color space CSV.
+        outputPath (str): the directory to write the arrays to.
+    """
+    if not os.path.isdir(outputPath):
+        os.makedirs(outputPath)
+
+    def writeAtomically(fileName, write):
+        path = os.path.join(outputPath, fileName)
+        temporaryPath = path + '.' + str(os.getpid()) + '.tmp'
+        with open(temporaryPath, 'wb') as f:
+            write(f)
+        os.rename(temporaryPath, path)
+
+    for name in COLOR_SPACE_ARRAYS:
+        writeAtomically(name + '.npy', lambda f: np.save(f, arrays[name]))
+
+    metadata = dict(
+        version=COLOR_SPACE_VERSION,
+        csvChecksum=csvChecksum(csvPath),
+        numColors=arrays["colorSpaces"].shape[0]
+    )
+    writeAtomically(COLOR_SPACE_METADATA,
+        lambda f: json.dump(metadata, f, indent=2))
+
+
+def colorSpaceIsCurrent(path, csvPath):
+    """Whether a color space built in path is current with the CSV."""
+    metadataPath = os.path.join(path, COLOR_SPACE_METADATA)
+    if not os.path.isfile(metadataPath):
+        return False
+
+    with open(metadataPath, 'rb') as f:
+        metadata = json.load(f)
+
+    return metadata.get("version") == COLOR_SPACE_VERSION and \
+        metadata.get("csvChecksum") == csvChecksum(csvPath)
+
+
+def loadColorSpace(path, csvPath):
+    """Load the per-color arrays of a color space, building them if needed.
+
+    Args:
+        path (str): the directory of the built color space.
+        csvPath (str): the path of the color space CSV it is built from.
+
+    Returns:
+        arrays (dict): the read-only arrays in COLOR_SPACE_ARRAYS keyed by name,
+            memory mapped whenever the color space could be written to disk.
+    """
+    if not colorSpaceIsCurrent(path, csvPath):
+        arrays = computeColorSpace(csvPath)
+        try:
+            writeColorSpace(arrays, csvPath, path)
+        except (IOError, OSError):
+            # Read-only installs still work; they just compute every time
+            for array in arrays.values():
+                array.setflags(write=False)
+            return arrays
+
+    # Plain ndarray views of the maps, so that copies gathered from them are
+    # ordinary (writable) arrays rather than read-only np.memmap instances
+    return dict([
+        (name, np.asarray(np.load(os.path.join(path, name + '.npy'),
+            mmap_mode='r')))
+        for name in COLOR_SPACE_ARRAYS
+    ])
@@ -0,0 +1,152 @@
+"""Precomputed bitset index of the filters applied to the color space.
+
+Palettes and starting colors are sampled from the colors that pass the user's
+hue and lightness filters and a few static masks (e.g., whether a color is in
+the sRGB gamut). Rather than comparing all 8,325 colors against every filter
+on every request, the index packs the colors of each hue degree, each lightness
+level, and each static mask into bitsets once, so any filter combination is a
+handful of bitwise ORs and ANDs over ~1 KB bitsets.
+
+The hue bitsets are kept as a sparse table, whose level j ORs the bitsets of
+2^j consecutive degrees, so the colors of any run of whole degrees are the OR
+of just two of its rows.
+"""
+import numpy as np
+
+# Hue buckets of one degree each; hues of 360 (if any) fall in the last one.
+HUE_BUCKETS = 360
+
+
+class FilterIndex():
+    """Bitsets of the colors in each hue degree, lightness level, and mask.
+
+    Attributes:
+        numColors: the number of colors in the color space.
+        hues: the hue of each color.
+        hueBits: a sparse table of packed bitsets, such that hueBits[j][d]
+            is the bitset of the colors whose hue is in degrees [d, d + 2^j).
+        hueMembers: the color indexes of each hue bucket, used to filter the
+            buckets that a hue range only partially covers.
+        hueMin: the lowest hue of each hue bucket (infinity if empty).
+        hueMax: the highest hue of each hue bucket (-infinity if empty).
+        lightnesses: the distinct lightness levels of the color space.
+        lightnessBits: a (number of levels) x b array of packed bitsets of the
+            colors at each lightness level.
+        maskBits: packed bitsets of static masks keyed by name.
+    """
+    def __init__(self, hues, lightnesses, masks):
+        """Builds the bitsets of a color space.
+
+        Args:
+            hues (np.ndarray): the hue of each color in [0,360], or NaN for
+                achromatic colors, which no hue range includes.
+            lightnesses (np.ndarray): the lightness of each color, which must
+                only take a few distinct values (e.g., every 5 units).
+            masks (dict): boolean arrays of static masks keyed by name.
+        """
+        self.numColors = hues.shape[0]
+        self.hues = np.asarray(hues, dtype=np.float64)
+
+        hasHue = np.logical_not(np.isnan(self.hues))
+        buckets = np.full(self.numColors, -1, dtype=np.int64)
+        buckets[hasHue] = np.clip(np.floor(self.hues[hasHue]).astype(np.int64),
+            0, HUE_BUCKETS - 1)
+        self.hueMembers = [np.flatnonzero(buckets == bucket)
+            for bucket in xrange(HUE_BUCKETS)]
+        self.hueMin = np.array([np.min(self.hues[m]) if m.size > 0 else np.inf
+            for m in self.hueMembers])
+        self.hueMax = np.array([np.max(self.hues[m]) if m.size > 0 else -np.inf
+            for m in self.hueMembers])
+
+        self.hueBits = [np.array([self.pack(buckets == bucket)
+            for bucket in xrange(HUE_BUCKETS)])]
+        while 2 ** len(self.hueBits) <= HUE_BUCKETS:
+            previous = self.hueBits[-1]
+            half = 2 ** (len(self.hueBits) - 1)
+            self.hueBits.append(previous[:-half] | previous[half:])
+
+        self.lightnesses = np.unique(lightnesses)
+        self.lightnessBits = np.array([self.pack(lightnesses == lightness)
+            for lightness in self.lightnesses])
+
+        self.maskBits = dict([(name, self.pack(mask))
+            for name, mask in masks.items()])
+
+    def pack(self, mask):
+        """Pack a boolean mask over the color space into a bitset."""
+        return np.packbits(np.asarray(mask, dtype=bool))
+
+    def unpack(self, bits):
+        """Unpack a bitset into a boolean mask over the color space."""
+        return np.unpackbits(bits)[:self.numColors].view(bool)
+
+    def bucketRangeBits(self, first, last):
+        """Get the bitset of the colors in hue buckets first to last."""
+        level = int(np.log2(last - first + 1))
+        return self.hueBits[level][first] | \
+            self.hueBits[level][last - 2 ** level + 1]
+
+    def hueRangeBits(self, hueRanges):
+        """Get the bitset of the colors within any of the hue ranges.
+
+        Args:
+            hueRanges (np.ndarray): an n x 2 array of inclusive hue ranges in
+                [0,360], e.g., as normalized by `convert.convertHueRanges`.
+        """
+        bits = np.zeros(self.hueBits[0].shape[1], dtype=np.uint8)
+        for low, high in hueRanges:
+            if not low <= high:
+                continue
+            first = min(max(int(np.floor(low)), 0), HUE_BUCKETS - 1)
+            last = min(max(int(np.floor(high)), 0), HUE_BUCKETS - 1)
+
+            # The first and last buckets are usually fully covered (e.g., by
+            # whole degree ranges); otherwise they are filtered color by color
+            covered = lambda bucket: low <= self.hueMin[bucket] and \
+                self.hueMax[bucket] <= high
+            partial = [bucket for bucket in set([first, last])
+                if not covered(bucket)]
+            start = first if covered(first) else first + 1
+            end = last if covered(last) else last - 1
+            if start <= end:
+                bits |= self.bucketRangeBits(start, end)
+
+            for bucket in partial:
+                members = self.hueMembers[bucket]
+                inRange = members[np.logical_and(self.hues[members] >= low,
+                    self.hues[members] <= high)]
+                np.bitwise_or.at(bits, inRange >> 3,
+                    (128 >> (inRange & 7)).astype(np.uint8))
+
+        return bits
+
+    def lightnessRangeBits(self, minLightness, maxLightness):
+        """Get the bitset of the colors with a lightness in the range."""
+        inRange = np.logical_and(self.lightnesses >= minLightness,
+            self.lightnesses <= maxLightness)
+        if not np.any(inRange):
+            return np.zeros(self.lightnessBits.shape[1], dtype=np.uint8)
+        return np.bitwise_or.reduce(self.lightnessBits[inRange])
+
+    def select(self, hueRanges=[], lightnessRange=None, masks=[]):
+        """Get the indexes of the colors that pass all filters.
+
+        Args:
+            hueRanges (np.ndarray): inclusive hue ranges to keep colors within
+                any of, or an empty list to keep every hue.
+            lightnessRange (tuple): the inclusive minimum and maximum lightness
+                of colors to keep, or None to keep every lightness.
+            masks (list): the names of static masks that colors must pass.
+
+        Returns:
+            colorIdx (np.ndarray): the sorted color indexes that pass.
+        """
+        bits = np.full(self.hueBits[0].shape[1], 255, dtype=np.uint8)
+        if np.size(hueRanges) > 0:
+            bits &= self.hueRangeBits(hueRanges)
+        if lightnessRange is not None:
+            bits &= self.lightnessRangeBits(*lightnessRange)
+        for name in masks:
+            bits &= self.maskBits[name]
+
+        return np.flatnonzero(self.unpack(bits))
@@ -1,13 +1,18 @@
 """The Colorgorical model class for both server and console variants."""
+import json
 import os
+import time
 import numpy as np
-from sklearn.utils.extmath import cartesian
-
-from itertools import combinations, chain
-from scipy.misc import comb
 
 import numpyColorgorical as npc
-
+import colorSpace
+import filterIndex
+import neighborIndex
+import pairScores
+import parallel
+import scoring
+
+from util import cache
 from util import jnd
 from util import convert
 
@@ -22,6 +27,35 @@ CIE_LAB_STARTING_SUBSPACE_INTERVALS = dict(
             30.0, 45.0, 60.0, 75.0, 90.0])
 )
 
+# The CIE Lab lattice that contains the 8,325-color space: L = [0,100];
+# a = [-85,100]; b = [-110,95]. Must match `getLabIndex` in `c/util/getIndex.c`.
+CIE_LAB_LATTICE_ORIGIN = np.array([0, -85, -110])
+CIE_LAB_LATTICE_SHAPE = (21, 38, 42)
+CIE_LAB_LATTICE_STEP = 5
+
+# Bounds of the CIEDE2000 and pair preference scores of all color pairs in the
+# 8,325-color space, which are used to normalize both scores to [0,1].
+CIEDE2000_BOUNDS = (1.02043527056, 122.48163103)
+PAIR_PREFERENCE_BOUNDS = (-101.423, 107.909)
+
+# Maximum number of color pairs to score at once when scoring candidates.
+PAIRS_PER_BLOCK = 2**18
+
+# The 8,325-color space and the default location of its precomputed per-color
+# arrays (see `colorSpace`), which are rebuilt whenever the CSV changes.
+COLOR_SPACE_CSV_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)),
+    '../data/allColors.csv')
+COLOR_SPACE_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)),
+    '../data/colorSpace')
+
+# Default location of the precomputed pair score table (see `pairScores`).
+PAIR_SCORES_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)),
+    '../data/pairScores')
+
+# Default location of the precomputed starting colors (see `precompute.py`).
+STARTING_COLORS_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)),
+    '../data/startingColors.npz')
+
 
 class Model():
     """Colorgorical's model for creating color palettes.
@@ -39,14 +73,171 @@ class Model():
             (i.e., LCH) equivalents. The remaining columns are RGB equivalents.
             The CSV was generated with D3 v3.4.11. The original CIE Lab space is
             defined in http://dx.doi.org/10.1145/2207676.2208547.
+        labs: the contiguous CIE Lab D65 coordinates of colorSpaces.
+        nameUniquenesses: the name uniqueness score of each color.
+        scorePenalties: the ``ugly'' color penalty multiplier of each color.
+        isRGB: whether each color is within the RGB gamut.
+        isUgly: whether each color is too ``ugly'' to ever be sampled.
+        illuminantC: the Illuminant C CIE LCh equivalent of each color, which
+            pair preference is defined in.
+        nameTermVectors: an 8,325 x 153 array with the square roots of each
+            color's color-term probabilities (Heer and Stone, 2012), such that
+            the name difference of two colors is sqrt(1 - the dot product of
+            their vectors).
+        filterIndex: a `filterIndex.FilterIndex` of the hue, lightness,
+            sRGB gamut (`isRGB`), not ugly (`isNotUgly`), and starting color
+            subspace (`isStartingSubspace`) filters of the color space.
+        latticeCoordinates: the CIE Lab lattice coordinates of each color.
+        latticeIndex: maps each point of the CIE Lab lattice to the row of its
+            color in colorSpaces (i.e., its color index), or -1 if the point is
+            not part of the color space.
+        pairScores: a memory-mapped `pairScores.PairScoreTable` of precomputed
+            pair scores, or None if no table has been built.
+        startingColorTable: precomputed starting colors keyed by
+            `getStartingColorKey`, which are never evicted.
+        startingColorCache: an LRU cache of starting colors computed on demand,
+            keyed by `getStartingColorKey`.
+        palettePool: a `parallel.PalettePool` that makes candidate palettes in
+            worker processes, or None if palettes are made in this process.
+        scorer: a `scoring.Scorer` that splits large scoring inputs over
+            threads.
     """
     def __init__(self, **kwargs):
-        """Colorgorical model initializer."""
-        filePrefix = os.path.dirname(os.path.realpath(__file__))
-        colorspacePath = os.path.join(filePrefix, '../data/allColors.csv')
-        self.colorSpaces = np.loadtxt(open(colorspacePath, 'rb'), delimiter=',')
+        """Colorgorical model initializer.
+
+        Args:
+            colorSpacePath (str): optional directory of the precomputed
+                per-color arrays (see `colorSpace`), which are built there if
+                missing or out of date. Defaults to COLOR_SPACE_PATH.
+            pairScorePath (str): optional directory of a pair score table built
+                with `pairScores.buildPairScores`. Defaults to PAIR_SCORES_PATH.
+            startingColorsPath (str): optional path of starting colors
+                precomputed with `precompute.precomputeStartingColors`. Defaults
+                to STARTING_COLORS_PATH.
+            startingColorCacheSize (int): the number of starting color sets to
+                keep cached for filter settings that were not precomputed.
+            scoreThreads (int): the number of threads to score colors with.
+        """
+        self.scorer = scoring.Scorer(kwargs.get("scoreThreads", 1))
+
+        arrays = colorSpace.loadColorSpace(
+            kwargs.get("colorSpacePath", COLOR_SPACE_PATH),
+            COLOR_SPACE_CSV_PATH)
+        self.colorSpaces = arrays["colorSpaces"]
+        self.nameUniquenesses = arrays["nameUniquenesses"]
+        self.scorePenalties = arrays["scorePenalties"]
+        self.isRGB = arrays["isRGB"]
+        self.isUgly = arrays["isUgly"]
+        self.illuminantC = arrays["illuminantC"]
+        self.nameTermVectors = arrays["nameTermVectors"]
+
+        self.labs = np.ascontiguousarray(self.colorSpaces[:,:3])
+        self.labs.setflags(write=False)
+
+        isStartingSubspace = np.all([
+            np.in1d(self.labs[:,i], CIE_LAB_STARTING_SUBSPACE_INTERVALS[axis])
+            for i, axis in enumerate(["L", "a", "b"])], axis=0)
+        self.filterIndex = filterIndex.FilterIndex(self.colorSpaces[:,3],
+            self.labs[:,0], dict(
+                isRGB=self.isRGB,
+                isNotUgly=np.logical_not(self.isUgly),
+                isStartingSubspace=isStartingSubspace
+            ))
+
+        self.latticeCoordinates = self.getLatticeCoordinates(self.labs)
+        self.latticeIndex = -np.ones(CIE_LAB_LATTICE_SHAPE, dtype=np.int32)
+        self.latticeIndex[tuple(self.latticeCoordinates.T)] = \
+            np.arange(self.colorSpaces.shape[0])
+
+        pairScorePath = kwargs.get("pairScorePath", PAIR_SCORES_PATH)
+        self.pairScores = None
+        if pairScores.pairScoresExist(pairScorePath):
+            self.pairScores = pairScores.PairScoreTable(pairScorePath,
+                self.labs)
+
+        self.startingColorTable = {}
+        startingColorsPath = kwargs.get("startingColorsPath",
+            STARTING_COLORS_PATH)
+        if os.path.isfile(startingColorsPath):
+            self.loadStartingColors(startingColorsPath)
+        self.startingColorCache = cache.LRUCache(
+            kwargs.get("startingColorCacheSize", 128))
+
+        self.palettePool = None
+
+
+    def startPalettePool(self, processes=None):
+        """Make candidate palettes in a persistent pool of worker processes.
+
+        Args:
+            processes (int): the number of workers. Defaults to the CPU count.
+        """
+        if self.palettePool is None:
+            self.palettePool = parallel.PalettePool(self, processes)
+
+
+    def stopPalettePool(self):
+        """Stop the worker processes started by `startPalettePool`."""
+        if self.palettePool is not None:
+            self.palettePool.close()
+            self.palettePool = None
+
+
+    def getLatticeCoordinates(self, labs):
+        """Convert CIE Lab colors into integer CIE Lab lattice coordinates."""
+        labs = np.asarray(labs, dtype=np.float64).reshape((-1, 3))
+        coords = (labs - CIE_LAB_LATTICE_ORIGIN) / CIE_LAB_LATTICE_STEP
+        return np.round(coords).astype(int)
 
-        self.nameUniquenesses = npc.score(np.hstack((self.colorSpaces[:,:3],self.colorSpaces[:,:3])))[:,3]
+
+    def getColorIndexes(self, labs):
+        """Get the color index of CIE Lab colors.
+
+        Args:
+            labs (np.ndarray): an n x 3 array of CIE Lab D65 colors.
+
+        Returns:
+            colorIndexes (np.ndarray): the row of each color in colorSpaces, or
+                -1 for colors that are not members of the color space.
+        """
+        labs = np.asarray(labs, dtype=np.float64).reshape((-1, 3))
+        coords = self.getLatticeCoordinates(labs)
+
+        onLattice = np.all(coords * CIE_LAB_LATTICE_STEP +
+            CIE_LAB_LATTICE_ORIGIN == labs, axis=1)
+        inBounds = np.all(np.logical_and(coords >= 0,
+            coords < CIE_LAB_LATTICE_SHAPE), axis=1)
+        isValid = np.logical_and(onLattice, inBounds)
+
+        colorIndexes = -np.ones(labs.shape[0], dtype=int)
+        colorIndexes[isValid] = self.latticeIndex[tuple(coords[isValid].T)]
+        return colorIndexes
+
+
+    def getStartingColorKey(self, hueFilters=[], lightnessRange=[25,85],
+        onlyUseRGB=True):
+        """Normalize starting color filter settings into a hashable key.
+
+        Filter settings that select the same starting colors map to the same
+        key. See `getStartingColors` for a description of the arguments.
+
+        Returns:
+            key (tuple): the normalized hue filters, minimum lightness, maximum
+                lightness, and whether colors are restricted to RGB.
+        """
+        hueFilters = convert.convertHueRanges(np.array(hueFilters))
+        hueFilters = tuple(tuple(float(h) for h in r) for r in hueFilters)
+
+        if lightnessRange[0] <= 10:
+            minLightness = 0.0
+        else:
+            minLightness = lightnessRange[0] + 0.01
+        if lightnessRange[1] <= 15:
+            maxLightness = 15.0
+        else:
+            maxLightness = float(lightnessRange[1])
+
+        return (hueFilters, minLightness, maxLightness, bool(onlyUseRGB))
 
 
     def getStartingColors(self, hueFilters=[], lightnessRange=[25,85],
@@ -59,6 +250,10 @@ class Model():
         subspace specifies an every-15 interval along L, a, and b axis starting
         at the origin.
 
+        Starting colors only depend on the filter settings, so they are looked
+        up from the precomputed table or the LRU cache and only computed with
+        `computeStartingColors` when neither has them.
+
         Args:
             hueFilters (np.array): an n by 2 nd.array specifying lower and upper
                 hue filter bounds that fall within [0,360) degrees.
@@ -67,61 +262,47 @@ class Model():
             onlyUseRGB (bool): whether color space should be restricted to RGB.
 
         Returns:
-            startingColors (np.array): an n x 3 array of n highly preferable CIE
-                Lab D65 starting colors.
+            startingColors (np.array): a read-only n x 3 array of n highly
+                preferable CIE Lab D65 starting colors.
         """
-        hueFilters = np.array(hueFilters)
+        key = self.getStartingColorKey(hueFilters=hueFilters,
+            lightnessRange=lightnessRange, onlyUseRGB=onlyUseRGB)
 
-        lIntervals = CIE_LAB_STARTING_SUBSPACE_INTERVALS["L"]
-        aIntervals = CIE_LAB_STARTING_SUBSPACE_INTERVALS["a"]
-        bIntervals = CIE_LAB_STARTING_SUBSPACE_INTERVALS["b"]
+        startingColors = self.startingColorTable.get(key)
+        if startingColors is None:
+            startingColors = self.startingColorCache.get(key)
+        if startingColors is None:
+            startingColors = self.computeStartingColors(key)
+            startingColors.setflags(write=False)
+            self.startingColorCache.put(key, startingColors)
 
-        isInterval = np.zeros((self.colorSpaces.shape[0], 3))
-        isInterval[:,0] = np.in1d(self.colorSpaces[:,0], lIntervals)
-        isInterval[:,1] = np.in1d(self.colorSpaces[:,1], aIntervals)
-        isInterval[:,2] = np.in1d(self.colorSpaces[:,2], bIntervals)
-        isIntervalMask = np.all(isInterval, axis=1)
-
-        startColors = self.colorSpaces[isIntervalMask]
+        return startingColors
 
-        isRGB = np.logical_and(startColors[:,[6,7,8]] >= 0, startColors[:,[6,7,8]] <= 255)
-        isRGB = np.all(isRGB, axis=1)
 
-        if lightnessRange[0] <= 10:
-            minLightness = 0
-        else:
-            minLightness = lightnessRange[0] + 0.01
-        if lightnessRange[1] <= 15:
-            maxLightness = 15
-        else:
-            maxLightness = lightnessRange[1]
+    def computeStartingColors(self, key):
+        """Compute the starting colors for a normalized filter setting key.
 
-        inLightness = np.logical_not(np.logical_or(startColors[:,0] <
-            minLightness, startColors[:,0] > maxLightness))
+        Args:
+            key (tuple): filter settings normalized by `getStartingColorKey`.
 
-        startColors = startColors[np.logical_and(isRGB, inLightness)]
+        Returns:
+            startingColors (np.array): an n x 3 array of n highly preferable CIE
+                Lab D65 starting colors.
+        """
+        hueFilters, minLightness, maxLightness, onlyUseRGB = key
 
-        if hueFilters.size > 0:
-            hueFilters = convert.convertHueRanges(hueFilters)
-            okHue = [np.logical_and(startColors[:,3] >= low,
-                    startColors[:,3] <= high) for low,high in hueFilters]
-            okHue = np.any(np.array(okHue), axis=0)
-            startColors = startColors[okHue]
+        startColors = self.colorSpaces[self.filterIndex.select(
+            np.array(hueFilters), (minLightness, maxLightness),
+            ["isStartingSubspace", "isRGB"])]
 
         # With the remaining subspace, enumerate all unique color pairs.
-        # For efficiency, unique pairs are calculated via one of the triangles
-        # of the cartesian product of all remaining colors.
         labs = startColors[:,:3]
-        color_col_products = [cartesian((labs[:,i],labs[:,i]))
-                                for i in xrange(labs.shape[1])]
-        productSize = (color_col_products[0].shape[0],2*len(color_col_products))
-        color_product = np.zeros(productSize)
-        for i, d in enumerate(color_col_products):
-            color_product[:,i] = d[:,0]
-            color_product[:,i+len(color_col_products)] = d[:,0]
         idxs = np.transpose(np.array(np.triu_indices(len(labs),1)))
         colorPairs = np.ascontiguousarray(labs[idxs,].reshape((-1, 6)))
-        colorPairPreferenceScores = npc.score(colorPairs)[:,2]
+        if colorPairs.shape[0] == 0: # too few colors to compare preference
+            return np.array(labs)
+        colorPairPreferenceScores = self.scorer.score(colorPairs,
+            npc.pairPreference)[:,0]
 
         # Penalize preference scores for colors that are ``ugly''.
         labs1 = np.ascontiguousarray(colorPairs[:,:3])
@@ -151,6 +332,203 @@ class Model():
         return startingColors
 
 
+    def loadStartingColors(self, path):
+        """Load starting colors precomputed by `precompute.py` into the table.
+
+        Args:
+            path (str): the path of the precomputed `.npz` file.
+        """
+        data = np.load(path)
+        keys = json.loads(str(data["keys"]))
+        offsets = data["offsets"]
+        colors = data["colors"]
+        colors.setflags(write=False)
+
+        for i, key in enumerate(keys):
+            hueFilters, minLightness, maxLightness, onlyUseRGB = key
+            hueFilters = tuple(tuple(r) for r in hueFilters)
+            key = (hueFilters, minLightness, maxLightness, onlyUseRGB)
+            self.startingColorTable[key] = colors[offsets[i]:offsets[i+1]]
+
+
+    def scorePairs(self, labs1, labs2, idx1=None, idx2=None):
+        """Score pairs of colors.
+
+        Scores are looked up in the precomputed pair score table when it is
+        available and all colors are members of the color space.
+
+        Args:
+            labs1 (np.ndarray): an n x 3 array of CIE Lab D65 colors.
+            labs2 (np.ndarray): an n x 3 array of CIE Lab D65 colors.
+            idx1 (np.ndarray): optional color indexes of labs1.
+            idx2 (np.ndarray): optional color indexes of labs2.
+
+        Returns:
+            scores (np.ndarray): an n x 3 array with the CIEDE2000, name
+                difference, and pair preference score of each pair.
+        """
+        if self.pairScores is not None:
+            if idx1 is None:
+                idx1 = self.getColorIndexes(labs1)
+            if idx2 is None:
+                idx2 = self.getColorIndexes(labs2)
+            if np.all(idx1 >= 0) and np.all(idx2 >= 0):
+                return self.pairScores.score(idx1, idx2)
+
+        return self.scorer.score(np.hstack((labs1, labs2)),
+            npc.scorePair)[:,0:3]
+
+
+    def scoreCandidates(self, candidates, colors, candidateIdx=None,
+        isAlive=None, out=None):
+        """Score candidate colors against sets of colors.
+
+        Args:
+            candidates (np.ndarray): an n x 3 array of CIE Lab D65 colors.
+            colors (np.ndarray): a k x 3 array of CIE Lab D65 colors to score
+                each candidate against, or a b x k x 3 array of b such sets.
+            candidateIdx (np.ndarray): optional color indexes of candidates.
+            isAlive (np.ndarray): an optional n (or b x n) boolean mask of the
+                candidates to score (against each set). Others score infinity.
+            out (np.ndarray): optional running minimum scores shaped like the
+                result, which are updated in place with the new scores.
+
+        Returns:
+            minScores (np.ndarray): an n x 3 (or b x n x 3) array with the
+                minimum CIEDE2000, name difference, and pair preference score of
+                each candidate to any of the colors (in each set).
+        """
+        colors = np.asarray(colors, dtype=np.float64)
+        batchShape = colors.shape[:-2]
+        k = colors.shape[-2]
+        colors = colors.reshape((-1, k, 3))
+        n = candidates.shape[0]
+
+        if candidateIdx is None:
+            candidateIdx = self.getColorIndexes(candidates)
+        colorIdx = self.getColorIndexes(colors).reshape((-1, k))
+        onLattice = np.all(candidateIdx >= 0) and np.all(colorIdx >= 0)
+
+        if isAlive is None:
+            isAlive = np.ones((colors.shape[0], n), dtype=bool)
+        isAlive = np.asarray(isAlive).reshape((colors.shape[0], n))
+
+        if out is None:
+            minScores = np.empty((colors.shape[0], n, 3))
+            minScores.fill(np.inf)
+        else:
+            minScores = out.reshape((colors.shape[0], n, 3))
+
+        if k == 0:
+            return minScores.reshape(batchShape + (n, 3))
+
+        # Only score the (set, candidate) pairs that are alive, in blocks
+        setIdx, aliveIdx = np.nonzero(isAlive)
+
+        # Without a pair score table, score each distinct color of the sets
+        # once, against the candidates alive in any set that has it, since
+        # palettes grown together often share colors (e.g., their first). The
+        # pairs are scored with one `minScores` call per block, and name
+        # difference is looked up in a single matrix product of the candidates
+        # and the distinct colors. Colors outside of the color space have no
+        # names, so they do not constrain name difference (which is at most 1).
+        if self.pairScores is None or not onLattice:
+            # Colors outside of the color space are told apart by position
+            keys = colorIdx.ravel()
+            keys = np.where(keys >= 0, keys, -1 - np.arange(keys.shape[0]))
+            keys, first, colorPos = np.unique(keys, return_index=True,
+                return_inverse=True)
+            colorPos = colorPos.reshape(colorIdx.shape)
+            distinctColors = colors.reshape((-1, 3))[first]
+
+            isNeeded = np.zeros((keys.shape[0], n), dtype=bool)
+            for ci in xrange(k):
+                order = np.argsort(colorPos[:,ci], kind='mergesort')
+                pos, starts = np.unique(colorPos[order, ci], return_index=True)
+                isNeeded[pos] |= np.logical_or.reduceat(isAlive[order], starts,
+                    axis=0)
+
+            candidatesAreMembers = np.all(candidateIdx >= 0)
+            if candidatesAreMembers:
+                # Keys of colors outside of the color space sort first
+                numOthers = np.count_nonzero(keys < 0)
+                nameDifferences = self.nameDifferences(candidateIdx,
+                    keys[numOthers:])
+
+            distinctScores = np.empty((keys.shape[0], n, 3))
+            distinctIdx, neededIdx = np.nonzero(isNeeded)
+            for start in xrange(0, distinctIdx.shape[0], PAIRS_PER_BLOCK):
+                di = distinctIdx[start:start + PAIRS_PER_BLOCK]
+                ai = neededIdx[start:start + PAIRS_PER_BLOCK]
+                pairs = (candidates[ai][:,np.newaxis,:],
+                    distinctColors[di][:,np.newaxis,:])
+                if candidatesAreMembers:
+                    scores = npc.minScoresExceptNameDifference(*pairs)[:,0,:]
+                    isMember = di >= numOthers
+                    scores[:,1] = 1.0
+                    scores[isMember,1] = nameDifferences[ai[isMember],
+                        di[isMember] - numOthers]
+                else:
+                    scores = npc.minScores(*pairs)[:,0,:]
+                distinctScores[di, ai] = scores
+
+            scores = distinctScores[colorPos[setIdx, 0], aliveIdx]
+            for ci in xrange(1, k):
+                scores = np.minimum(scores,
+                    distinctScores[colorPos[setIdx, ci], aliveIdx])
+            minScores[setIdx, aliveIdx] = np.minimum(
+                minScores[setIdx, aliveIdx], scores)
+            return minScores.reshape(batchShape + (n, 3))
+
+        # Otherwise look each color of the sets up in the pair score table
+        for start in xrange(0, setIdx.shape[0], PAIRS_PER_BLOCK):
+            si = setIdx[start:start + PAIRS_PER_BLOCK]
+            ai = aliveIdx[start:start + PAIRS_PER_BLOCK]
+            for ci in xrange(k):
+                scores = self.pairScores.score(candidateIdx[ai],
+                    colorIdx[si, ci])
+                minScores[si, ai] = np.minimum(minScores[si, ai], scores)
+
+        return minScores.reshape(batchShape + (n, 3))
+
+
+    def nameDifferences(self, idx1, idx2):
+        """Get the name difference of every pair of two sets of colors.
+
+        Name difference is the Hellinger distance between the color-term
+        distributions of two colors, so it is computed for all pairs with a
+        single matrix product of the colors' name term vectors.
+
+        Args:
+            idx1 (np.ndarray): n color indexes.
+            idx2 (np.ndarray): m color indexes.
+
+        Returns:
+            nameDifferences (np.ndarray): an n x m array with the name
+                difference of each pair.
+        """
+        bc = np.dot(self.nameTermVectors[idx1], self.nameTermVectors[idx2].T)
+        return np.sqrt(np.maximum(1 - bc, 0))
+
+
+    def lowestPairPreferences(self, palettes):
+        """Get the lowest pair preference among the color pairs of palettes.
+
+        Args:
+            palettes (np.ndarray): an m x k x 3 array of m palettes with k CIE
+                Lab D65 colors each.
+
+        Returns:
+            lowestPreferences (np.ndarray): the lowest pair preference score of
+                each palette.
+        """
+        palettes = np.asarray(palettes, dtype=np.float64)
+        i, j = np.triu_indices(palettes.shape[1], 1)
+        scores = self.scorePairs(palettes[:,i].reshape((-1, 3)),
+            palettes[:,j].reshape((-1, 3)))
+        return scores[:,2].reshape((palettes.shape[0], -1)).min(axis=1)
+
+
     def make(self, palSize, hueFilters=[], lightnessRange=[25,85],
         onlyUseRGB=True, noticeableDifferenceAngle=1.0/3.0, startPalette=[],
         weights={"ciede2000":1,"nameDifference":1,"nameUniqueness":0,
@@ -181,8 +559,42 @@ class Model():
         Returns:
             palette (np.ndarray): an array of CIE Lab D65 colors.
         """
+        return self.makePalettes(palSize, 1, hueFilters=hueFilters,
+            lightnessRange=lightnessRange, onlyUseRGB=onlyUseRGB,
+            noticeableDifferenceAngle=noticeableDifferenceAngle,
+            startPalette=startPalette, weights=weights)[0]
+
+
+    def makePalettes(self, palSize, numPalettes, hueFilters=[],
+        lightnessRange=[25,85], onlyUseRGB=True,
+        noticeableDifferenceAngle=1.0/3.0, startPalette=[],
+        weights={"ciede2000":1,"nameDifference":1,"nameUniqueness":0,
+        "pairPreference":1}, randomState=None, abandonBelow=None):
+        """Make numPalettes palettes of palSize colors by sampling with weights.
+
+        All palettes are grown together: they share the filtered candidate
+        space, its penalties, and its name uniqueness scores, and every
+        iteration scores and samples the next color of all palettes with a
+        single stacked NumPy computation. See `make` for a description of the
+        other arguments.
+
+        Args:
+            randomState (np.random.RandomState): the random stream to sample
+                colors from. Defaults to the global `np.random` state.
+            abandonBelow (float): optional pair preference score to beat.
+                Palettes stop growing once a pair of their colors scores below
+                it, since their lowest pair preference can only fall further.
+                Each palette draws from the random stream whether or not it is
+                still growing, so the other palettes do not change.
+
+        Returns:
+            palettes (list): numPalettes arrays of CIE Lab D65 colors. Palettes
+                that ran out of candidates or were abandoned have fewer than
+                palSize colors.
+        """
 
         assert isinstance(palSize, ( int, long )) and palSize > 0
+        assert isinstance(numPalettes, ( int, long )) and numPalettes > 0
         assert "ciede2000" in weights and "nameDifference" in weights and\
             "nameUniqueness" in weights and "pairPreference" in weights
         assert np.sum([weights[w] >= 0.0 and weights[w] <= 1.0
@@ -195,168 +607,228 @@ class Model():
 
         ndL, ndA, ndB = [d*3 for d in jnd.cieLabJND(noticeableDifferenceAngle)]
 
+        if randomState is None:
+            randomState = np.random
+
         if len(startPalette) > 0:
-            palette = startPalette
+            palettes = [list(startPalette) for i in xrange(numPalettes)]
         else:
             possibleStartColors = self.getStartingColors(hueFilters=hueFilters,
                 lightnessRange=lightnessRange, onlyUseRGB=onlyUseRGB)
-            startColorIdx = np.random.choice(possibleStartColors.shape[0])
-            palette = [possibleStartColors[startColorIdx]]
-
-        if len(palette) >= palSize:
-            return palette
-
-        colorSpaces = self.colorSpaces
-        nus = self.nameUniquenesses
-
-        if hueFilters.size > 0:
-            okHue = [np.logical_and(colorSpaces[:,3] >= low,
-                    colorSpaces[:,3] <= high) for low,high in hueFilters]
-            okHue = np.any(np.array(okHue), axis=0)
-            colorSpaces = colorSpaces[okHue]
-            nus = nus[okHue]
-
-        isRGB = np.logical_and(colorSpaces[:,[6,7,8]] >= 0, colorSpaces[:,[6,7,8]] <= 255)
-        isRGB = np.all(isRGB, axis=1)
-
-        minLightness = lightnessRange[0] + 0.01
-        maxLightness = lightnessRange[1]
-        inLightness = np.logical_not(np.logical_or(colorSpaces[:,0] <
-            minLightness, colorSpaces[:,0] > maxLightness))
-
-        rgbAndLightnessMask = np.logical_and(isRGB, inLightness)
-        colorSpaces = colorSpaces[rgbAndLightnessMask]
-        nus = nus[rgbAndLightnessMask]
-
-        # filter ``ugly'' colors
-        # TODO push this to the scorePenalty C function as a 0 weighting
-        isUgly = np.zeros((colorSpaces.shape[0], 4))
-        isUgly[:,0] = colorSpaces[:,3] >= 85
-        isUgly[:,1] = colorSpaces[:,3] <= 114
-        isUgly[:,2] = colorSpaces[:,0] <= 75
-        isUgly[:,3] = colorSpaces[:,0] >= 35
-        isUglyMask = np.logical_not(np.all(isUgly, axis=1))
-
-        colorSpaces = colorSpaces[isUglyMask]
-        nus = nus[isUglyMask]
-
-        # remove any colors that aren't noticeably different from start palette
-        for color in palette:
-            diffs = np.absolute(colorSpaces[:,0:3] - color)
-            isND = np.logical_or(diffs[:,0] >= ndL,
-                    np.logical_or(diffs[:,1] >= ndA, diffs[:,2] >= ndB))
-            colorSpaces = colorSpaces[isND]
-            nus = nus[isND]
-
-        if colorSpaces.shape[0] == 0:
-            print 'Ran out of candidates.'
-            return np.array(palette)
-
-        lab = colorSpaces[:,0:3]
-        lch = colorSpaces[:,[0,4,3]]
-        rgb = colorSpaces[:,6:]
-
-        candidates = lab
-        scorePenalty = npc.scorePenalty(np.ascontiguousarray(candidates))[:,0]
+            startColorIdx = randomState.choice(possibleStartColors.shape[0],
+                numPalettes)
+            palettes = [[possibleStartColors[i]] for i in startColorIdx]
+
+        startPalSize = len(palettes[0])
+        if startPalSize >= palSize:
+            return [np.array(p) for p in palettes]
+
+        # Filter the color space into a compact vector of candidate color
+        # indexes; per-color attributes are gathered from the model's shared
+        # read-only arrays rather than copied from colorSpaces
+        colorIdx = self.filterIndex.select(hueFilters,
+            (lightnessRange[0] + 0.01, lightnessRange[1]),
+            ["isRGB", "isNotUgly"]).astype(np.int16)
+        candidates = self.labs[colorIdx]
+        scorePenalty = self.scorePenalties[colorIdx]
 
         # apply the name uniqueness weight to all NU values
-        nus *= weights["nameUniqueness"]
-        nus = nus.reshape( (nus.shape[0], 1) ) # reshape for join
+        nus = self.nameUniquenesses[colorIdx] * weights["nameUniqueness"]
+
+        # Each palette keeps its own set of candidates that are still noticeably
+        # different from all of its colors.
+        def isNoticeablyDifferent(colors):
+            """Mask candidates noticeably different from one color per row."""
+            colors = np.asarray(colors).reshape((-1, 3))
+            return np.logical_or(
+                np.absolute(candidates[:,0] - colors[:,0:1]) >= ndL,
+                np.logical_or(
+                    np.absolute(candidates[:,1] - colors[:,1:2]) >= ndA,
+                    np.absolute(candidates[:,2] - colors[:,2:3]) >= ndB))
+
+        # Candidates that are not noticeably different from a lattice color
+        # are found from the cells around it, independent of how many
+        # candidates there are
+        neighbors = neighborIndex.NeighborIndex(
+            self.latticeCoordinates[colorIdx], CIE_LAB_LATTICE_SHAPE,
+            CIE_LAB_LATTICE_STEP, (ndL, ndA, ndB))
+
+        def pruneNeighbors(rowIdx, cells):
+            """Kill the candidates near one lattice cell per palette row."""
+            rows, positions = neighbors.getNeighbors(cells)
+            isAlive[rowIdx[rows], positions] = False
+
+        isAlive = np.ones((numPalettes, candidates.shape[0]), dtype=bool)
+        for ci in xrange(startPalSize):
+            colors = np.array([p[ci] for p in palettes], dtype=np.float64)
+            startIdx = self.getColorIndexes(colors)
+            isMember = startIdx >= 0
+            pruneNeighbors(np.flatnonzero(isMember),
+                neighbors.getCells(self.latticeCoordinates[startIdx[isMember]]))
+
+            # Start colors outside of the color space are compared to every
+            # candidate
+            isOther = np.logical_not(isMember)
+            if np.any(isOther):
+                isAlive[isOther] &= isNoticeablyDifferent(colors[isOther])
+
+        isGrowing = np.any(isAlive, axis=1)
+        if not np.any(isGrowing):
+            print 'Ran out of candidates.'
+            return [np.array(p) for p in palettes]
+
+        # The lowest pair preference of each palette so far
+        lowestPreferences = np.empty(numPalettes)
+        lowestPreferences.fill(np.inf)
+        if abandonBelow is not None and startPalSize > 1:
+            lowestPreferences[:] = self.lowestPairPreferences(
+                np.array(palettes))
+            isGrowing[lowestPreferences < abandonBelow] = False
+            if not np.any(isGrowing):
+                return [np.array(p) for p in palettes]
+
+        # Running minimum CIEDE2000, name difference, and pair preference
+        # scores between each palette's candidates and every color already in
+        # the palette. Candidates are scored against the starting palette once;
+        # afterwards each iteration only scores them against the newly picked
+        # colors. A shared start palette only needs to be scored once.
+        if len(startPalette) > 0:
+            minScores = np.empty((numPalettes, candidates.shape[0], 3))
+            minScores[:] = self.scoreCandidates(candidates,
+                np.array(startPalette), colorIdx, np.any(isAlive, axis=0))
+        else:
+            minScores = self.scoreCandidates(candidates,
+                np.array(palettes), colorIdx, isAlive)
+
+        # The following distance bounds are precomputed from the 8325 colors in
+        # the dataset to normalize CIEDE2000 and Pair Preference to [0,1] to
+        # match the Name Difference and Name Uniqueness scores. Normalization
+        # and weighting are folded into a single dot product.
+        lows = np.array([CIEDE2000_BOUNDS[0], 0.0, PAIR_PREFERENCE_BOUNDS[0]])
+        highs = np.array([CIEDE2000_BOUNDS[1], 1.0, PAIR_PREFERENCE_BOUNDS[1]])
+        scoreWeights = np.array([weights["ciede2000"],
+            weights["nameDifference"], weights["pairPreference"]])
+        scoreWeights = scoreWeights / (highs - lows)
+        nus = nus - np.dot(lows, scoreWeights)
 
-        startPalSize = len(palette)
-        # TODO memoize loop s.t. previous results don't need to be recomputed
         for pi in xrange(palSize - startPalSize):
-            # create combinations of candidates + palette colors
-            # Each tile stores a candidate color paired with a palette color
-            tiled = np.tile(candidates, (pi+startPalSize, 1))
-            tiled = np.hstack(( tiled,
-                np.zeros(tiled.shape[0]*3).reshape(tiled.shape[0], 3) ))
-
-            for i, p in enumerate(palette):
-                tiled[:,3:] = p
-
-            # stack the tiles to into the score ufunc format (2 Lab colors/row)
-            scores = npc.score( np.ascontiguousarray(tiled) )[:,0:3]
-
-            # reshape the 2 Lab colors/row so that each row is instead a
-            # potential candidate and the columns are its scores to all of the
-            # already-picked palette colors
-            scores = np.hstack(np.split(scores,pi+startPalSize))
-
-            # Take the minimum value for each candidate score
-            des = scores[:,0::3].min(axis=1)
-            nds = scores[:,1::3].min(axis=1)
-            pps = scores[:,2::3].min(axis=1)
-
-            # Normalize CIEDE2000 and Pair Preference to [0,1] to match the Name
-            # Difference and Name Uniqueness scores
-            # The following distance bounds are precomputed from the 8325 colors in the dataset
-            maxDistance = 122.48163103
-            minDistance = 1.02043527056
-            des = (des - minDistance) / (maxDistance - minDistance)
-
-            maxPreference = 107.909
-            minPreference = -101.423
-            pps = (pps - minPreference) / (maxPreference - minPreference)
-
-            # apply weights to the palette scores
-            des *= weights["ciede2000"]
-            nds *= weights["nameDifference"]
-            pps *= weights["pairPreference"]
-
-            # reshape scores for stacking
-            des = des.reshape( (des.shape[0], 1) )
-            nds = nds.reshape( (nds.shape[0], 1) )
-            pps = pps.reshape( (pps.shape[0], 1) )
-
-            scores = np.hstack( (des, nds, pps, nus) )
-            scores = np.sum(scores, axis=1)
-            # apply the ugly-color penalty function
+            growing = np.flatnonzero(isGrowing)
+            # Index with a slice when possible to work on views, not copies
+            if growing.shape[0] == numPalettes:
+                rows = slice(None)
+            else:
+                rows = growing
+
+            # weight the palette scores, then apply the ugly-color penalty
+            scores = np.dot(minScores[rows], scoreWeights) + nus
             scores *= scorePenalty
+            scores[np.logical_not(isAlive[rows])] = np.nan
 
             # sample a color above the score threshold limit
-            threshold = np.max(scores) - 0.75*np.std(scores)
-            choices = candidates[ scores > threshold, :]
+            with np.errstate(invalid='ignore'):
+                threshold = np.nanmax(scores, axis=1) - \
+                    0.75*np.nanstd(scores, axis=1)
+                isChoice = scores > threshold[:,np.newaxis]
 
             # If the thresholding yielded no candidates, don't perform it
             # This typically happens with low (i.e., 1) color candidate sets
-            if choices.shape[0] == 0:
-                choices = candidates
-
-            choice = choices[np.random.choice(choices.shape[0])]
-
-            palette = palette + [choice]
+            noChoice = np.logical_not(np.any(isChoice, axis=1))
+            isChoice[noChoice] = isAlive[rows][noChoice]
+
+            # Pick uniformly among each palette's choices with one draw per
+            # palette, so the random stream does not depend on how many
+            # candidates are left or which palettes are still growing
+            numChoices = np.cumsum(isChoice, axis=1)
+            draws = randomState.random_sample(numPalettes)[growing]
+            picks = (draws * numChoices[:,-1]).astype(int)
+            choiceIdx = np.argmax(numChoices > picks[:,np.newaxis], axis=1)
+            choices = candidates[choiceIdx]
+
+            for gi, choice in zip(growing, choices):
+                palettes[gi] = palettes[gi] + [choice]
+
+            if abandonBelow is not None:
+                lowestPreferences[growing] = np.minimum(
+                    lowestPreferences[growing],
+                    minScores[rows][np.arange(growing.shape[0]), choiceIdx, 2])
 
             # Prune choice and not noticeably different colors from sample space
-            diffs = np.absolute(candidates-choice)
-            isND = np.logical_or(diffs[:,0] >= ndL, np.logical_or(diffs[:,1] >=
-                ndA, diffs[:,2] >= ndB))
-
-            candidates = candidates[isND]
-            nus = nus[isND]
-            scorePenalty = scorePenalty[isND]
+            pruneNeighbors(growing, neighbors.cells[choiceIdx])
 
-            if candidates.shape[0] == 0:
+            ranOut = np.logical_not(np.any(isAlive[rows], axis=1))
+            if np.any(ranOut):
                 print 'Ran out when picking color #'+str(pi)
+                isGrowing[growing[ranOut]] = False
+
+            # Abandon palettes that can no longer beat abandonBelow
+            if abandonBelow is not None:
+                isHopeless = lowestPreferences[growing] < abandonBelow
+                if np.any(isHopeless):
+                    isGrowing[growing[isHopeless]] = False
+                    isAlive[growing[isHopeless]] = False
+
+            if not np.any(isGrowing) or pi == palSize - startPalSize - 1:
                 break
 
-        return np.array(palette)
+            # Compact the candidates in place to those alive in any palette, so
+            # later iterations only touch live candidates
+            isLive = np.any(isAlive, axis=0)
+            n = np.count_nonzero(isLive)
+            if n < colorIdx.shape[0]:
+                colorIdx[:n] = colorIdx[isLive]
+                candidates[:n] = candidates[isLive]
+                scorePenalty[:n] = scorePenalty[isLive]
+                nus[:n] = nus[isLive]
+                isAlive[:,:n] = isAlive[:,isLive]
+                minScores[:,:n] = minScores[:,isLive]
+                neighbors.compact(isLive)
+                colorIdx = colorIdx[:n]
+                candidates = candidates[:n]
+                scorePenalty = scorePenalty[:n]
+                nus = nus[:n]
+                isAlive = isAlive[:,:n]
+                minScores = minScores[:,:n]
+
+            # Palettes that ran out have no live candidates left to score
+            if isinstance(rows, slice):
+                self.scoreCandidates(candidates, choices[:,np.newaxis,:],
+                    colorIdx, isAlive, out=minScores)
+            else:
+                minScores[rows] = self.scoreCandidates(candidates,
+                    choices[:,np.newaxis,:], colorIdx, isAlive[rows],
+                    out=minScores[rows])
+
+        return [np.array(p) for p in palettes]
 
 
     def makePreferablePalette(self, palSize, numPalettes, hueFilters=[],
         lightnessRange=[25,85], onlyUseRGB=True,
         noticeableDifferenceAngle=1.0/3.0, startPalette=[],
         weights={"ciede2000":1,"nameDifference":1,"nameUniqueness":0,
-        "pairPreference":1}):
+        "pairPreference":1}, seed=None, timeBudget=None, returnStats=False):
         """Make a preferable palette by making many to return most preferable.
 
         This function makes `numPalettes` palettes, calculates the lowest pair
         preference score in each, and then returns the palette with the highest
         low-preference score.
 
+        The palettes are made in tasks with independent random streams (see
+        `parallel`). Without the palette pool, all palettes are grown together
+        in a single task. The pool runs small tasks, a task per worker at a
+        time, such that a seed always yields the same palette regardless of
+        the number of worker processes, and palettes that fall behind the best
+        complete palette of the earlier tasks are abandoned unfinished (see
+        `runPaletteTasks`).
+
+        With a time budget, rounds of tasks stop when another round would
+        overrun the budget, and the palette is picked from the candidates made
+        so far (always at least one task's). Without the palette pool, each
+        task then has twice as many palettes as the last.
+
         Args:
             palSize (int): the number of colors to sample for the palette.
             numPalettes (int): the number of palettes to sample preference from.
+                With a time budget, this is the most palettes to make.
             hueFilters (list): a two-dimensional list, such that each element of
                 hue filters is a two-element list that contains the lower and
                 upper hue angle boundary for each hue angle region to include
@@ -376,49 +848,121 @@ class Model():
                 scores such that the total weight always sums to 1. The weight
                 names are `ciede2000`, `nameDifference`, `nameUniqueness`, and
                 `pairPreference`.
+            seed (int): optional seed to make the palette reproducible.
+            timeBudget (float): optional number of seconds to make candidate
+                palettes for.
+            returnStats (bool): whether to also return stats of how the
+                palette was made.
         Returns:
             palette (np.ndarray): an array of CIE Lab D65 colors.
+            stats (dict): if returnStats, the number of `candidates` palettes
+                made, the `seconds` it took, and whether the time budget cut it
+                short (`timedOut`).
         """
-        def lowestPreference(palette):
-            """Get the lowest pair preference given all palette color pairs."""
-            idxs = np.transpose(np.array(np.triu_indices(len(palette),1)))
-            pairs = np.array([(palette[i, :], palette[j,:]) for i,j in idxs])
-            pairs = pairs.reshape((-1, 6))
-            scores = npc.score(pairs)
-            return np.amin(scores[:,2])
-
-
-        palettes = [
-            self.make(palSize, hueFilters=hueFilters, lightnessRange=lightnessRange,
-                onlyUseRGB=onlyUseRGB,
-                noticeableDifferenceAngle=noticeableDifferenceAngle,
-                startPalette=startPalette, weights=weights)
-            for i in xrange(numPalettes)
-        ]
+        startTime = time.time()
+        kwargs = dict(hueFilters=hueFilters, lightnessRange=lightnessRange,
+            onlyUseRGB=onlyUseRGB,
+            noticeableDifferenceAngle=noticeableDifferenceAngle,
+            startPalette=startPalette, weights=weights)
+
+        if seed is None:
+            seed = np.random.randint(2**31 - 1)
+        if self.palettePool is not None:
+            tasks = parallel.makeTasks(palSize, numPalettes, seed, kwargs)
+        elif timeBudget is None:
+            tasks = parallel.makeTasks(palSize, numPalettes, seed, kwargs,
+                palettesPerTask=numPalettes)
+        else:
+            tasks = parallel.makeTasks(palSize, numPalettes, seed, kwargs,
+                growth=2)
+        randomState = np.random.RandomState([seed, len(tasks)])
+
+        deadline = None if timeBudget is None else startTime + timeBudget
+        results = self.runPaletteTasks(tasks, palSize, deadline)
+        timedOut = len(results) < len(tasks)
+        palettes = [p for taskPalettes in results for p in taskPalettes]
+        numCandidates = len(palettes)
 
         # Return a random palette if there is only one color, given that the
         # first color is always from a highly preferable subset
         if palSize == 1:
-            return palettes[np.random.randint(numPalettes)]
-
-        # discard any palettes who are not equal to the desired palette size
-        # this can happen when making very large palettes or when the user has
-        # defined a very narrow color space to sample from.
-        # If no palette matches the desired palette size, limit the palettes to
-        # those of the largest size.
-        bigEnoughPalettes = filter(lambda r: len(r) == palSize, palettes)
-        if len(bigEnoughPalettes) > 0:
-            palettes = np.array(bigEnoughPalettes)
+            palette = palettes[randomState.randint(len(palettes))]
         else:
-            lens = np.array([len(p) for p in palettes])
-            maxLen = np.amax(lens)
-            maxLenMask = np.in1d(lens.ravel(), maxLen).reshape(lens.shape)
-            palettes = [p for i,p in enumerate(palettes) if maxLenMask[i]]
+            # discard any palettes who are not equal to the desired palette
+            # size this can happen when making very large palettes or when the
+            # user has defined a very narrow color space to sample from.
+            # If no palette matches the desired palette size, limit the
+            # palettes to those of the largest size.
+            maxLen = max(len(p) for p in palettes)
+            if maxLen == 1:
+                palette = palettes[0]
+            else:
+                palettes = np.array([p for p in palettes if len(p) == maxLen])
+                minPrefs = self.lowestPairPreferences(palettes)
+                palette = palettes[np.argmax(minPrefs)]
+
+        if returnStats:
+            return palette, dict(candidates=numCandidates, timedOut=timedOut,
+                seconds=time.time() - startTime)
+        return palette
 
-        minPrefs = [lowestPreference(p) for p in palettes]
-        palette = palettes[np.argmax(minPrefs)]
 
-        return palette
+    def runPaletteTasks(self, tasks, palSize, deadline=None):
+        """Run candidate palette tasks in rounds, abandoning losing palettes.
+
+        Each round runs one task per worker (or a single task without the
+        palette pool). Palettes of later rounds are abandoned as soon as their
+        lowest pair preference falls below that of the best complete palette
+        so far, as they could never be the most preferable. With a deadline,
+        rounds stop once the next one, if it takes as long per palette as the
+        last, would end after the deadline.
+
+        Args:
+            tasks (list): tasks made by `parallel.makeTasks`.
+            palSize (int): the number of colors of a complete palette.
+            deadline (float): optional time (as returned by `time.time`) by
+                which to stop running tasks.
+
+        Returns:
+            results (list): the palettes of the tasks that ran, in order.
+        """
+        if self.palettePool is not None:
+            roundSize = self.palettePool.processes
+        else:
+            roundSize = 1
+
+        results = []
+        bestPreference = None
+        for start in xrange(0, len(tasks), roundSize):
+            roundStart = time.time()
+            roundTasks = tasks[start:start + roundSize]
+            if bestPreference is not None:
+                roundTasks = [parallel.boundTask(task, bestPreference)
+                    for task in roundTasks]
+            if self.palettePool is not None:
+                roundResults = self.palettePool.run(roundTasks)
+            else:
+                roundResults = [parallel.runTask(self, task)
+                    for task in roundTasks]
+            results.extend(roundResults)
+
+            complete = [p for taskPalettes in roundResults
+                for p in taskPalettes if len(p) == palSize]
+            if palSize > 1 and len(complete) > 0:
+                preference = np.max(self.lowestPairPreferences(
+                    np.array(complete)))
+                if bestPreference is None or preference > bestPreference:
+                    bestPreference = preference
+
+            roundEnd = time.time()
+            nextTasks = tasks[start + roundSize:start + 2 * roundSize]
+            if deadline is not None and len(nextTasks) > 0:
+                # Tasks are (palSize, numPalettes, seed, taskIndex, kwargs)
+                scale = float(sum(task[1] for task in nextTasks)) / \
+                    sum(task[1] for task in roundTasks)
+                if roundEnd + scale * (roundEnd - roundStart) > deadline:
+                    break
+        return results
 
 
     def scorePalette(self, palette, weights={"ciede2000":1,"nameDifference":1,\
@@ -431,26 +975,18 @@ class Model():
             return 0
 
         # get all pair combinations of the palette
-        def comb_index(n, k):
-            count = comb(n, k, exact=True)
-            index = np.fromiter(chain.from_iterable(combinations(range(n), k)),
-                                int, count=count*k)
-            return index.reshape(-1, k)
-        pairIndexes = comb_index(palette.shape[0], 2)
-        labPairs = np.zeros(pairIndexes.shape[0]*6).reshape(pairIndexes.shape[0], 6)
-        # populate the labPairs index
-        for i, pair in enumerate(pairIndexes):
-            labPairs[i, 0:3] = palette[pair[0]]
-            labPairs[i, 3:] = palette[pair[1]]
-
-        scores = npc.score(labPairs)
+        pairIndexes = np.transpose(np.triu_indices(palette.shape[0], 1))
+        labPairs = np.hstack((palette[pairIndexes[:,0]],
+            palette[pairIndexes[:,1]])).astype(np.float64)
+
+        scores = self.scorer.score(labPairs)
         de = np.min(scores[:,0]) * weights["ciede2000"]
         nd = np.min(scores[:,1]) * weights["nameDifference"]
         pp = np.min(scores[:,2]) * weights["pairPreference"]
         nu = np.min(scores[:,[3,4]]) * weights["nameUniqueness"]
 
-        nuPair = np.hstack((palette.reshape((-1,3)), palette.reshape((-1,3))))
-        nuScores = npc.score(nuPair)[:,3]
+        nuScores = self.scorer.score(palette.reshape((-1,3)),
+            npc.nameUniqueness)[:,0]
 
         return dict(
             pairIndexes=pairIndexes.tolist(),
@@ -464,3 +1000,66 @@ class Model():
             ),
             nuScores = nuScores
         )
+
+
+    def scorePalettes(self, palettes, weights={"ciede2000":1,
+        "nameDifference":1, "nameUniqueness":0, "pairPreference":1}):
+        """Score a batch of palettes, which may differ in size.
+
+        The color pairs of every palette are gathered and scored together with
+        `scorePairs` (i.e., looked up in the pair score table when possible),
+        and each palette's minimum scores are segmented reductions over its run
+        of pairs, so the cost per palette is a few array elements rather than
+        a `scorePalette` call.
+
+        Args:
+            palettes (list): m palettes, each a list (or n x 3 array) of CIE
+                Lab D65 colors.
+            weights (dict): weights of the four palette scores, as in
+                `scorePalette`.
+
+        Returns:
+            minScores (dict): length m arrays of the weighted minimum scores of
+                each palette, keyed like the `minScores` of `scorePalette`
+                (`de`, `nd`, `pp`, and `nu`). Pair scores of palettes with
+                fewer than two colors, and all scores of empty palettes, are
+                NaN.
+        """
+        m = len(palettes)
+        sizes = np.array([len(p) for p in palettes], dtype=np.int64)
+        minScores = dict([(name, np.full(m, np.nan))
+            for name in ["de", "nd", "pp", "nu"]])
+        if m == 0 or np.sum(sizes) == 0:
+            return minScores
+
+        colors = np.vstack([np.asarray(p, dtype=np.float64).reshape((-1, 3))
+            for p in palettes])
+        colorOffsets = np.cumsum(sizes) - sizes
+
+        # Pairs ordered by their second color (i.e., (0,1), (0,2), (1,2), (0,3),
+        # ...) such that the pairs of n colors are the first n(n-1)/2 pairs of
+        # any larger palette; the r-th pair of every palette is then pairs[r]
+        numPairs = sizes * (sizes - 1) // 2
+        pairOffsets = np.cumsum(numPairs) - numPairs
+        second, first = np.tril_indices(max(np.max(sizes), 2), -1)
+        pairPalette = np.repeat(np.arange(m), numPairs)
+        pairRank = np.arange(np.sum(numPairs)) - \
+            np.repeat(pairOffsets, numPairs)
+        idx1 = colorOffsets[pairPalette] + first[pairRank]
+        idx2 = colorOffsets[pairPalette] + second[pairRank]
+
+        hasPairs = numPairs > 0
+        if np.any(hasPairs):
+            scores = self.scorePairs(colors[idx1], colors[idx2])
+            paletteMins = np.minimum.reduceat(scores, pairOffsets[hasPairs],
+                axis=0)
+            for col, (name, weight) in enumerate([("de", "ciede2000"),
+                    ("nd", "nameDifference"), ("pp", "pairPreference")]):
+                minScores[name][hasPairs] = paletteMins[:,col] * weights[weight]
+
+        hasColors = sizes > 0
+        nameUniquenesses = self.scorer.score(colors, npc.nameUniqueness)[:,0]
+        minScores["nu"][hasColors] = np.minimum.reduceat(nameUniquenesses,
+            colorOffsets[hasColors]) * weights["nameUniqueness"]
+
+        return minScores
@@ -0,0 +1,94 @@
+"""Lattice index of candidate colors for noticeable difference pruning.
+
+Every color of the color space is a point of a regular CIE Lab lattice, and
+the candidates that are not noticeably different from a color (see `jnd`) lie
+in a small box of lattice cells around it. The index stores the position of
+each candidate in a copy of the lattice, padded by the reach of the box, so the
+candidates near a color are found by gathering a fixed list of cell offsets
+rather than by comparing the color against every candidate.
+"""
+import numpy as np
+
+
+class NeighborIndex():
+    """Positions of candidate colors on a padded CIE Lab lattice.
+
+    Attributes:
+        offsets: a k x 3 array of the lattice offsets of the cells within the
+            noticeable difference box of a lattice point.
+        reach: the largest offset along each lattice axis, which the lattice is
+            padded by on both sides.
+        shape: the shape of the padded lattice.
+        neighborOffsets: the offsets as flat padded lattice offsets.
+        cells: the flat padded lattice cell of each candidate.
+        positions: the position of the candidate in each flat padded lattice
+            cell, or -1 if the cell has no candidate.
+    """
+    def __init__(self, latticeCoords, latticeShape, latticeStep, intervals):
+        """Places candidates on the padded lattice.
+
+        Args:
+            latticeCoords (np.ndarray): the n x 3 integer lattice coordinates of
+                the candidates.
+            latticeShape (tuple): the number of lattice points along each axis.
+            latticeStep (float): the distance between adjacent lattice points.
+            intervals (tuple): the CIE L, a, and b distances from a color within
+                which candidates are not noticeably different from it.
+        """
+        self.offsets = getNeighborOffsets(latticeShape, latticeStep, intervals)
+        self.reach = np.max(self.offsets, axis=0, initial=0)
+        self.shape = tuple(np.array(latticeShape) + 2 * self.reach)
+
+        strides = np.array([self.shape[1] * self.shape[2], self.shape[2], 1])
+        self.neighborOffsets = np.dot(self.offsets, strides)
+
+        self.cells = self.getCells(latticeCoords)
+        self.positions = -np.ones(np.prod(self.shape), dtype=np.intp)
+        self.positions[self.cells] = np.arange(self.cells.shape[0])
+
+    def getCells(self, latticeCoords):
+        """Get the flat padded lattice cells of in-bounds lattice points."""
+        return np.ravel_multi_index((latticeCoords + self.reach).T, self.shape)
+
+    def getNeighbors(self, cells):
+        """Find the candidates that are not noticeably different from colors.
+
+        Args:
+            cells (np.ndarray): the flat padded lattice cells of m colors.
+
+        Returns:
+            rows (np.ndarray): which of the colors each neighbor is near.
+            positions (np.ndarray): the candidate position of each neighbor.
+        """
+        positions = self.positions[cells[:,np.newaxis] + self.neighborOffsets]
+        rows, columns = np.nonzero(positions >= 0)
+        return rows, positions[rows, columns]
+
+    def compact(self, isLive):
+        """Keep the live candidates in order, like `candidates[isLive]`."""
+        self.positions[self.cells[np.logical_not(isLive)]] = -1
+        self.cells = self.cells[isLive]
+        self.positions[self.cells] = np.arange(self.cells.shape[0])
+
+
+def getNeighborOffsets(latticeShape, latticeStep, intervals):
+    """Get the lattice offsets within the noticeable difference box of a point.
+
+    Offsets are limited to the extent of the lattice, which is all that two of
+    its points can differ by.
+
+    Args:
+        latticeShape (tuple): the number of lattice points along each axis.
+        latticeStep (float): the distance between adjacent lattice points.
+        intervals (tuple): the CIE L, a, and b distances from a point within
+            which points are not noticeably different from it.
+
+    Returns:
+        offsets (np.ndarray): a k x 3 array of integer lattice offsets.
+    """
+    axes = []
+    for size, interval in zip(latticeShape, intervals):
+        steps = np.arange(-(size - 1), size)
+        axes.append(steps[np.absolute(steps * float(latticeStep)) < interval])
+    grids = np.meshgrid(*axes, indexing='ij')
+    return np.stack([grid.ravel() for grid in grids], axis=1)
@@ -0,0 +1,217 @@
+"""Precomputed pairwise scores for the 8,325-color CIE Lab space.
+
+CIEDE2000, name difference, and pair preference are pure functions of two
+colors. Because Colorgorical only samples colors from the fixed 5-unit CIE Lab
+lattice, every score it will ever need can be computed once, written to disk,
+and looked up by color index afterwards.
+
+Each score is stored as the upper triangle (diagonal included) of the 8,325 x
+8,325 pair matrix in its own `.npy` file, which allows the files to be memory
+mapped and shared between server processes through the page cache. Pair
+preference is not symmetric for pairs of two achromatic colors, so those few
+pairs are always rescored rather than read from the triangle.
+"""
+import json
+import os
+import numpy as np
+
+import numpyColorgorical as npc
+import scoring
+
+# Version of the on-disk format; bump whenever the layout changes.
+PAIR_SCORES_VERSION = 1
+
+PAIR_SCORES_METADATA = 'pairScores.json'
+
+# The metrics stored in the table, in the column order of `npc.scorePair`.
+PAIR_SCORE_METRICS = ('ciede2000', 'nameDifference', 'pairPreference')
+
+# Storage types supported by `buildPairScores`. `uint16` stores scores
+# quantized linearly between the bounds in PAIR_SCORE_QUANTIZATION_BOUNDS.
+PAIR_SCORE_TYPES = ('float32', 'float16', 'uint16')
+
+PAIR_SCORE_QUANTIZATION_BOUNDS = dict(
+    ciede2000=(0.0, 125.0),
+    nameDifference=(0.0, 1.0),
+    pairPreference=(-110.0, 110.0)
+)
+
+
+def triangleSize(n):
+    """The number of pairs in the upper triangle (with diagonal) of n colors."""
+    return n * (n + 1) // 2
+
+
+def triangleIndex(idx1, idx2, n):
+    """Convert color index pairs into upper triangle offsets.
+
+    Args:
+        idx1 (np.ndarray): color indexes of the first color in each pair.
+        idx2 (np.ndarray): color indexes of the second color in each pair.
+        n (int): the number of colors in the color space.
+
+    Returns:
+        offsets (np.ndarray): the position of each pair in the triangle.
+    """
+    idx1 = np.asarray(idx1, dtype=np.int64)
+    idx2 = np.asarray(idx2, dtype=np.int64)
+    i = np.minimum(idx1, idx2)
+    j = np.maximum(idx1, idx2)
+    return i * n - (i * (i - 1)) // 2 + (j - i)
+
+
+def buildPairScores(labs, outputPath, storageType='float32',
+    pairsPerBlock=2**20, threads=1):
+    """Score every pair of colors in a color space and write them to disk.
+
+    Args:
+        labs (np.ndarray): an n x 3 array of CIE Lab D65 colors, such that the
+            row of each color is its color index.
+        outputPath (str): the directory to write the score files to.
+        storageType (str): one of PAIR_SCORE_TYPES.
+        pairsPerBlock (int): roughly how many pairs to score per
+            `npc.scorePair` call, which bounds the memory used while building.
+        threads (int): the number of threads to score pairs with.
+    """
+    assert storageType in PAIR_SCORE_TYPES
+
+    labs = np.ascontiguousarray(labs, dtype=np.float64)
+    n = labs.shape[0]
+    scorer = scoring.Scorer(threads)
+    size = triangleSize(n)
+
+    if not os.path.isdir(outputPath):
+        os.makedirs(outputPath)
+
+    metrics = {}
+    outputs = []
+    for metric in PAIR_SCORE_METRICS:
+        fileName = metric + '.npy'
+        outputs.append(np.lib.format.open_memmap(
+            os.path.join(outputPath, fileName), mode='w+',
+            dtype=np.dtype(storageType), shape=(size,)))
+
+        low, high = PAIR_SCORE_QUANTIZATION_BOUNDS[metric]
+        if storageType == 'uint16':
+            scale = (high - low) / 65535.0
+            offset = low
+        else:
+            scale = 1.0
+            offset = 0.0
+        metrics[metric] = dict(file=fileName, scale=scale, offset=offset)
+
+    # Score whole rows of the triangle together to keep ufunc calls large
+    i = 0
+    while i < n:
+        rows = [i]
+        rowPairs = n - i
+        while rows[-1] + 1 < n and rowPairs + n - rows[-1] - 1 <= pairsPerBlock:
+            rows.append(rows[-1] + 1)
+            rowPairs += n - rows[-1]
+
+        first = np.concatenate([np.repeat(r, n - r) for r in rows])
+        second = np.concatenate([np.arange(r, n) for r in rows])
+        pairs = np.hstack((labs[first], labs[second]))
+        scores = scorer.score(pairs, npc.scorePair)
+
+        start = triangleIndex(rows[0], rows[0], n)
+        for col, metric in enumerate(PAIR_SCORE_METRICS):
+            output = outputs[col]
+            values = scores[:,col]
+            if storageType == 'uint16':
+                bounds = PAIR_SCORE_QUANTIZATION_BOUNDS[metric]
+                values = np.clip(values, *bounds)
+                values = np.round((values - metrics[metric]["offset"]) /
+                    metrics[metric]["scale"])
+            output[start:start + values.shape[0]] = values
+
+        i = rows[-1] + 1
+
+    for output in outputs:
+        output.flush()
+
+    metadata = dict(
+        version=PAIR_SCORES_VERSION,
+        storageType=storageType,
+        numColors=n,
+        metrics=metrics
+    )
+    with open(os.path.join(outputPath, PAIR_SCORES_METADATA), 'w') as f:
+        json.dump(metadata, f, indent=2)
+
+
+def pairScoresExist(path):
+    """Whether a pair score table has been built in the path."""
+    return os.path.isfile(os.path.join(path, PAIR_SCORES_METADATA))
+
+
+class PairScoreTable():
+    """Memory-mapped lookup table of precomputed pairwise color scores.
+
+    Attributes:
+        labs: the n x 3 CIE Lab colors the table was built for.
+        numColors: the number of colors in the table's color space.
+        storageType: how the scores are stored on disk.
+        scores: the memory-mapped upper triangle of each metric.
+    """
+    def __init__(self, path, labs):
+        """Opens a pair score table built by `buildPairScores`.
+
+        Args:
+            path (str): the directory containing the table.
+            labs (np.ndarray): the n x 3 CIE Lab colors the table was built
+                for, such that the row of each color is its color index.
+        """
+        with open(os.path.join(path, PAIR_SCORES_METADATA), 'rb') as f:
+            metadata = json.load(f)
+
+        if metadata["version"] != PAIR_SCORES_VERSION:
+            raise ValueError("Pair score table in "+path+" is out of date.")
+        if metadata["numColors"] != labs.shape[0]:
+            raise ValueError("Pair score table in "+path+
+                " does not match the color space.")
+
+        self.labs = labs
+        self.numColors = metadata["numColors"]
+        self.storageType = metadata["storageType"]
+        self.metrics = metadata["metrics"]
+        self.scores = [
+            np.load(os.path.join(path, self.metrics[m]["file"]), mmap_mode='r')
+            for m in PAIR_SCORE_METRICS
+        ]
+
+        self.isAchromatic = np.logical_and(labs[:,1] == 0, labs[:,2] == 0)
+
+    def score(self, idx1, idx2):
+        """Look up the scores of color index pairs.
+
+        Args:
+            idx1 (np.ndarray): color indexes of the first color in each pair.
+            idx2 (np.ndarray): color indexes of the second color in each pair.
+
+        Returns:
+            scores (np.ndarray): an n x 3 array of the CIEDE2000, name
+                difference, and pair preference scores of each pair.
+        """
+        idx1, idx2 = np.broadcast_arrays(np.asarray(idx1), np.asarray(idx2))
+        offsets = triangleIndex(idx1, idx2, self.numColors)
+
+        scores = np.empty((offsets.shape[0], 3))
+        for col, metric in enumerate(PAIR_SCORE_METRICS):
+            values = self.scores[col][offsets]
+            if self.storageType == 'uint16':
+                scores[:,col] = values * self.metrics[metric]["scale"] + \
+                    self.metrics[metric]["offset"]
+            else:
+                scores[:,col] = values
+
+        # The triangle stores scores in (lower index, higher index) order, which
+        # only differs from the requested order for two achromatic colors.
+        isSwapped = np.logical_and(idx1 > idx2, np.logical_and(
+            self.isAchromatic[idx1], self.isAchromatic[idx2]))
+        if np.any(isSwapped):
+            pairs = np.hstack((self.labs[idx1[isSwapped]],
+                self.labs[idx2[isSwapped]]))
+            scores[isSwapped] = npc.scorePair(pairs)[:,0:3]
+
+        return scores
@@ -0,0 +1,102 @@
+"""Parallel candidate palette generation with a persistent process pool.
+
+Candidate palettes are split into tasks. Each task samples from its own
+`np.random.RandomState`, seeded from the request seed and the task's index, so
+that forked workers do not share (and duplicate) the global `np.random` state.
+The process pool runs tasks of a fixed number of palettes, so the palettes
+made for a seed do not depend on how many workers there are; a single process
+instead grows all palettes in one task (see `Model.makePreferablePalette`).
+"""
+import multiprocessing
+import numpy as np
+
+# The number of candidate palettes each task of the process pool grows
+# together. Changing this changes which palettes are made for a given seed.
+PALETTES_PER_TASK = 2
+
+# The Colorgorical model of a worker process, set once by `initializeWorker`.
+workerModel = None
+
+
+def initializeWorker(model):
+    """Initializes a worker process with the Colorgorical model's tables."""
+    global workerModel
+    workerModel = model
+
+
+def makeTasks(palSize, numPalettes, seed, kwargs,
+        palettesPerTask=PALETTES_PER_TASK, growth=1):
+    """Split the candidate palettes of a request into tasks.
+
+    Args:
+        palSize (int): the number of colors to sample for each palette.
+        numPalettes (int): the number of candidate palettes to make.
+        seed (int): the seed of the request.
+        kwargs (dict): keyword arguments passed on to `Model.makePalettes`.
+        palettesPerTask (int): the number of palettes of the first task.
+        growth (int): the factor each task has more palettes than the last.
+
+    Returns:
+        tasks (list): tuples of task arguments for `runTask`.
+    """
+    tasks = []
+    start = 0
+    while start < numPalettes:
+        size = min(palettesPerTask, numPalettes - start)
+        tasks.append((palSize, size, seed, len(tasks), kwargs))
+        start += size
+        palettesPerTask *= growth
+    return tasks
+
+
+def boundTask(task, abandonBelow):
+    """Make a task abandon palettes whose lowest pair preference falls below
+    abandonBelow (see `Model.makePalettes`)."""
+    palSize, numPalettes, seed, taskIndex, kwargs = task
+    return (palSize, numPalettes, seed, taskIndex,
+        dict(kwargs, abandonBelow=abandonBelow))
+
+
+def runTask(model, task):
+    """Make the candidate palettes of a task with its own random stream."""
+    palSize, numPalettes, seed, taskIndex, kwargs = task
+    randomState = np.random.RandomState([seed, taskIndex])
+    return model.makePalettes(palSize, numPalettes, randomState=randomState,
+        **kwargs)
+
+
+def runWorkerTask(task):
+    """Make the candidate palettes of a task inside a worker process."""
+    return runTask(workerModel, task)
+
+
+class PalettePool():
+    """A persistent pool of processes that make candidate palettes.
+
+    Attributes:
+        processes: the number of worker processes.
+    """
+    def __init__(self, model, processes=None):
+        """Starts the worker processes.
+
+        Workers are forked from the current process and initialized once with
+        the model, so they share its (read-only) tables copy-on-write.
+
+        Args:
+            model (src.model.Model): an initialized Colorgorical model.
+            processes (int): the number of workers. Defaults to the CPU count.
+        """
+        if processes is None:
+            processes = multiprocessing.cpu_count()
+        self.processes = processes
+        self._pool = multiprocessing.Pool(processes,
+            initializer=initializeWorker, initargs=(model,))
+
+    def run(self, tasks):
+        """Run tasks made by `makeTasks` and return their palettes in order."""
+        return self._pool.map(runWorkerTask, tasks, chunksize=1)
+
+    def close(self):
+        """Stops the worker processes."""
+        self._pool.close()
+        self._pool.join()
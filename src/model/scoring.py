@@ -0,0 +1,77 @@
+"""Multithreaded scoring with the numpyColorgorical ufuncs.
+
+The ufunc loops in `c/numpyColorgorical.c` are reentrant C without any Python
+API calls, so NumPy runs them without holding the GIL. Large inputs can
+therefore be scored on several cores by splitting them into row chunks that
+are scored concurrently by a pool of threads.
+"""
+import os
+from multiprocessing.pool import ThreadPool
+import threading
+import numpy as np
+
+import numpyColorgorical as npc
+
+# Inputs with fewer rows per thread than this are not worth splitting.
+MIN_ROWS_PER_CHUNK = 2**14
+
+
+class Scorer():
+    """Scores rows of colors with a ufunc, splitting large inputs over threads.
+
+    Attributes:
+        threads: the number of threads to score with.
+    """
+    def __init__(self, threads=1):
+        """Initializes the scorer.
+
+        Args:
+            threads (int): the number of threads to score with. Inputs are
+                scored in the calling thread if 1.
+        """
+        assert threads >= 1
+        self.threads = threads
+        self._pool = None
+        self._poolPid = None
+        self._poolLock = threading.Lock()
+
+    def getPool(self):
+        """Get the thread pool, (re)starting it in forked processes.
+
+        Scorers are shared by concurrent requests, so the pool is started under
+        a lock to never start more than one.
+        """
+        with self._poolLock:
+            if self._pool is None or self._poolPid != os.getpid():
+                self._pool = ThreadPool(self.threads)
+                self._poolPid = os.getpid()
+            return self._pool
+
+    def score(self, rows, ufunc=npc.score):
+        """Score rows of colors.
+
+        Args:
+            rows (np.ndarray): an n x m array in the row format of the ufunc,
+                e.g., two CIE Lab colors per row for `npc.score`.
+            ufunc (np.ufunc): the numpyColorgorical ufunc to score with.
+
+        Returns:
+            scores (np.ndarray): an n x m array of the ufunc's output.
+        """
+        # The ufuncs step through whole rows, which is only safe on contiguous
+        # double arrays that NumPy passes to the loop in one piece.
+        rows = np.ascontiguousarray(rows, dtype=np.float64)
+
+        numChunks = min(self.threads, rows.shape[0] // MIN_ROWS_PER_CHUNK)
+        if numChunks <= 1:
+            return ufunc(rows)
+
+        scores = np.empty_like(rows)
+        bounds = np.linspace(0, rows.shape[0], numChunks + 1).astype(int)
+
+        def scoreChunk(chunk):
+            start, end = chunk
+            ufunc(rows[start:end], scores[start:end])
+
+        self.getPool().map(scoreChunk, zip(bounds[:-1], bounds[1:]))
+        return scores
@@ -13,9 +13,12 @@ from os import walk
 def configuration(parent_package='', top_path=None):
     config = Configuration('.', parent_package, top_path)
 
-    # Add all .c files from the `c` directory
+    # Add all .c files from the `c` directory, except the table literals in
+    # `c/tables`, which `buildTables.py` converts into blobs loaded at runtime
     np_srcs = []
     for (dirpath, dirnames, filenames) in walk('c'):
+        if 'tables' in dirnames and dirpath == 'c':
+            dirnames.remove('tables')
         np_srcs.extend([path_join(dirpath,fn) for fn in filenames if fn[-2:] == ".c"])
 
     config.add_extension('numpyColorgorical', np_srcs, extra_compile_args=['-std=c99'])
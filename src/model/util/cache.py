@@ -0,0 +1,41 @@
+"""Caching utility classes."""
+import threading
+from collections import OrderedDict
+
+
+class LRUCache():
+    """A thread-safe cache that evicts its least recently used entries.
+
+    Attributes:
+        maxSize: the maximum number of entries kept in the cache.
+    """
+    def __init__(self, maxSize=128):
+        """Initializes an empty cache.
+
+        Args:
+            maxSize (int): the maximum number of entries kept in the cache.
+        """
+        assert maxSize > 0
+        self.maxSize = maxSize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Get the value stored for key and mark it as most recently used."""
+        with self._lock:
+            if key not in self._entries:
+                return default
+            value = self._entries.pop(key)
+            self._entries[key] = value
+            return value
+
+    def put(self, key, value):
+        """Store value for key, evicting the least recently used entry."""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = value
+            while len(self._entries) > self.maxSize:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
@@ -43,42 +43,16 @@ def convertHueRanges(hueRanges):
     notEqual = hueRanges[:,0] != hueRanges[:,1]
     hueRanges = hueRanges[notEqual]
 
-    hueRanges = np.sort(hueRanges, axis=0)
-
-    def reduceRange(ranges, r):
-        if ranges.shape[0] == 0:
-            return np.array([r])
-
-        lowerInside = np.array([np.logical_and(r[0] >= low, r[0] <= high) for low,high in ranges])
-        greaterInside = np.array([np.logical_and(r[1] >= low, r[1] <= high) for low,high in ranges])
-
-        # if the range is contained inside an existing range, return
-        if np.any(np.logical_and(lowerInside, greaterInside)):
-            return ranges
-        # if completely new, add the range to the list and return
-        elif not np.any(np.logical_or(lowerInside, greaterInside)):
-            return np.vstack( (ranges, r) )
-
-        # Else, the hue range extends existing range(s) that need to be extended
-        # Extend upper range bounds if the new range has a lower bound inside
-        #   an existing range
-        ranges[lowerInside, 1] = r[1]
-
-        # Do the same, but for extending the lower bound
-        ranges[greaterInside, 0] = r[0]
-
-        # Filter ranges down to unique rows
-        # h/t http://stackoverflow.com/questions/16970982
-        b = np.ascontiguousarray(ranges).view(np.dtype((np.void, ranges.dtype.itemsize * ranges.shape[1])))
-        _, idx = np.unique(b, return_index=True)
-        ranges = ranges[idx]
-
-        # Apply recursively until all merges have been completed
-        ranges = reduce(reduceRange, ranges, np.array([]))
-
-        return ranges
-
-    hueRanges = reduce(reduceRange, hueRanges, np.array([]))
+    # merge overlapping (or touching) ranges with one sweep over the ranges
+    # sorted by their lower bound
+    hueRanges = hueRanges[np.argsort(hueRanges[:,0], kind='mergesort')]
+    merged = []
+    for low, high in hueRanges:
+        if len(merged) > 0 and low <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], high)
+        else:
+            merged.append([low, high])
+    hueRanges = np.array(merged, dtype=hueRanges.dtype)
 
     degreeDiff = np.diff(hueRanges)
     degreeDiff = degreeDiff >= 360
@@ -88,27 +62,38 @@ def convertHueRanges(hueRanges):
 
     return hueRanges
 
-def convertLabToRGB(lab):
+def roundHalfAwayFromZero(values):
+    """Round like Python's `round`, whereas `np.round` rounds half to even."""
+    magnitudes = np.abs(values)
+    floors = np.floor(magnitudes)
+    return np.copysign(floors + (magnitudes - floors >= 0.5), values)
+
+
+def convertLabsToRGBs(labs):
     """Conversion between D65 CIE Lab and sRGB in the [0,255 range].
 
-    Converts D65 CIE Lab color into its sRGB equivalent. If the Lab color falls
-    outside the sRGB gamut on any of the red, green, or blue channels, the value
-    will be clammped to either 0 or 255 for the given channel(s). The following
-    implementation is adapted from Heer and Stone's Java implementation for the
-    C3 color-name project:
+    Converts D65 CIE Lab colors into their sRGB equivalents. If a Lab color
+    falls outside the sRGB gamut on any of the red, green, or blue channels, the
+    value will be clamped to either 0 or 255 for the given channel(s). The
+    following implementation is adapted from Heer and Stone's Java
+    implementation for the C3 color-name project:
     github.com/uwdata/c3/blob/master/java/src/edu/stanford/vis/color/LAB.java
     We also borrow from D3 (v.3) Lab->RGB function:
     https://github.com/mbostock/d3/blob/master/src/color/xyz.js
 
+    Every operation is done in the same order as the per-color math this
+    replaced, so the results are identical to it.
+
     Args:
-        lab (list): a 3-element list pertaining to a D65 CIE Lab color
+        labs (np.ndarray): an n x 3 array of D65 CIE Lab colors
 
     Returns:
-        rgbs (list): a 3-element list pertaining to an sRGB colors
+        rgbs (np.ndarray): an n x 3 integer array of sRGB colors
     """
-    L = lab[0]
-    a = lab[1]
-    b = lab[2]
+    labs = np.asarray(labs, dtype=np.float64).reshape((-1, 3))
+    L = labs[:,0]
+    a = labs[:,1]
+    b = labs[:,2]
 
     # D65 whitepoint needed for transform
     D65_X = 0.950470
@@ -120,9 +105,11 @@ def convertLabToRGB(lab):
     x = y + a/500.0
     z = y - b/200.0
 
-    x = D65_X * (x*x*x if x > 0.206893034 else (x - 4.0/29) / 7.787037)
-    y = D65_Y * (y*y*y if y > 0.206893034 else (y - 4.0/29) / 7.787037)
-    z = D65_Z * (z*z*z if z > 0.206893034 else (z - 4.0/29) / 7.787037)
+    xyz = np.column_stack((x, y, z))
+    xyz = np.where(xyz > 0.206893034, xyz*xyz*xyz, (xyz - 4.0/29) / 7.787037)
+    x = D65_X * xyz[:,0]
+    y = D65_Y * xyz[:,1]
+    z = D65_Z * xyz[:,2]
 
     # map CIE XYZ to sRGB
     r =  3.2404542*x - 1.5371385*y - 0.4985314*z
@@ -132,43 +119,70 @@ def convertLabToRGB(lab):
     # threshold based on D3, not on Lindbloom's suggested threshold
     #    https://github.com/mbostock/d3/blob/master/src/color/xyz.js
     #    http://www.brucelindbloom.com/index.html?Eqn_RGB_to_XYZ.html
-    r = 12.92*r if r <= 0.00304 else 1.055*pow(r,1/2.4) - 0.055
-    g = 12.92*g if g <= 0.00304 else 1.055*pow(g,1/2.4) - 0.055
-    b = 12.92*b if b <= 0.00304 else 1.055*pow(b,1/2.4) - 0.055
+    rgbs = np.column_stack((r, g, b))
+    # the power of negative values is never picked, so NaNs are fine
+    with np.errstate(invalid='ignore'):
+        rgbs = np.where(rgbs <= 0.00304, 12.92*rgbs,
+            1.055*np.power(rgbs, 1/2.4) - 0.055)
 
     # integer representation of RGB [0,1] values
-    ir = int(round(255*r))
-    ig = int(round(255*g))
-    ib = int(round(255*b))
+    rgbs = roundHalfAwayFromZero(255*rgbs)
 
-    ir = max(0, min(ir, 255))
-    ig = max(0, min(ig, 255))
-    ib = max(0, min(ib, 255))
+    return np.clip(rgbs, 0, 255).astype(int)
 
-    return (ir, ig, ib)
 
+def convertLabToRGB(lab):
+    """Convert a D65 CIE Lab color to sRGB; see `convertLabsToRGBs`.
+
+    Args:
+        lab (list): a 3-element list pertaining to a D65 CIE Lab color
+
+    Returns:
+        rgbs (list): a 3-element list pertaining to an sRGB colors
+    """
+    return tuple(int(c) for c in convertLabsToRGBs([lab])[0])
+
+
+def convertRGBsToLabs(rgbs):
+    """Inverse function of `convertLabsToRGBs`, based on D3.
+
+    Args:
+        rgbs (np.ndarray): an n x 3 array of sRGB colors in [0,255]
+
+    Returns:
+        labs (np.ndarray): an n x 3 array of D65 CIE Lab colors
+    """
+    rgbs = np.asarray(rgbs, dtype=np.float64).reshape((-1, 3))
 
-def convertRGBToLab(rgb):
-    """Inverse function of `convertLabToRGB`, based on D3."""
     # D65 whitepoint needed for transform
     D65_X = 0.950470
     D65_Y = 1.0
     D65_Z = 1.088830
 
-    def convert(v):
-        return v/12.92 if v <= 0.00304 else pow((v + 0.055)/1.055, 2.4)
-    r = convert(rgb[0]/255.0)
-    g = convert(rgb[1]/255.0)
-    b = convert(rgb[2]/255.0)
+    rgbs = rgbs/255.0
+    rgbs = np.where(rgbs <= 0.00304, rgbs/12.92,
+        np.power((rgbs + 0.055)/1.055, 2.4))
+    r = rgbs[:,0]
+    g = rgbs[:,1]
+    b = rgbs[:,2]
 
     x = (0.4124564*r + 0.3575761*g + 0.1804375*b) / D65_X
     y = (0.2126729*r + 0.7151522*g + 0.0721750*b) / D65_Y
     z = (0.0193339*r + 0.1191920*g + 0.9503041*b) / D65_Z
 
     # map CIE XYZ to CIE Lab
-    x = pow(x, 1.0/3) if x > 0.008856 else 7.787037*x + 4.0/29
-    y = pow(y, 1.0/3) if y > 0.008856 else 7.787037*y + 4.0/29
-    z = pow(z, 1.0/3) if z > 0.008856 else 7.787037*z + 4.0/29
+    xyz = np.column_stack((x, y, z))
+    # the power of negative values is never picked, so NaNs are fine
+    with np.errstate(invalid='ignore'):
+        xyz = np.where(xyz > 0.008856, np.power(xyz, 1.0/3),
+            7.787037*xyz + 4.0/29)
+    x = xyz[:,0]
+    y = xyz[:,1]
+    z = xyz[:,2]
+
+    return np.column_stack((116*y - 16, 500*(x-y), 200*(y-z)))
 
-    # return Lab
-    return (116*y - 16, 500*(x-y), 200*(y-z))
+
+def convertRGBToLab(rgb):
+    """Convert an sRGB color to D65 CIE Lab; see `convertRGBsToLabs`."""
+    return tuple(float(c) for c in convertRGBsToLabs([rgb])[0])
@@ -0,0 +1,107 @@
+"""Runs Colorgorical model calls off of the Tornado IOLoop.
+
+Making a palette can take seconds, and the IOLoop serves every client from a
+single thread, so the request handlers submit model calls to an executor and
+yield the returned futures instead of calling the model directly.
+
+The model is safe to share between threads: it is only modified while it is
+initialized, and the rest of its state (e.g., the starting color cache and the
+scoring thread pool) is guarded by locks. Its scoring ufuncs release the GIL,
+so concurrent requests in a thread executor overlap most of their work. A
+process executor sidesteps the GIL entirely; its workers are forked once, when
+the executor starts, and share the model's (read-only) tables copy-on-write.
+"""
+import multiprocessing
+import numpy as np
+
+# Python 2.7 only has concurrent.futures through the `futures` backport
+try:
+    import concurrent.futures
+except ImportError:
+    raise ImportError('Colorgorical needs concurrent.futures; on Python 2.7 '
+                      'install it with `pip install futures`')
+
+EXECUTOR_TYPES = ('thread', 'process')
+
+# The Colorgorical model of a worker process, inherited when it is forked.
+workerModel = None
+
+# Whether a worker process has reseeded its global NumPy random state.
+workerIsSeeded = False
+
+
+def callWorkerModel(methodName, args, kwargs):
+    """Call a model method inside a worker process.
+
+    Workers are forked with a copy of the server's global NumPy random state,
+    so each reseeds it from the OS before its first call; otherwise every
+    worker would make the same unseeded random draws.
+    """
+    global workerIsSeeded
+    if not workerIsSeeded:
+        np.random.seed()
+        workerIsSeeded = True
+    return getattr(workerModel, methodName)(*args, **kwargs)
+
+
+def startWorker():
+    """Does nothing; submitted to make a process executor fork its workers."""
+    return None
+
+
+class ModelExecutor():
+    """A bounded pool of threads or processes that calls model methods.
+
+    Attributes:
+        model: the Colorgorical model whose methods are called.
+        executorType: one of EXECUTOR_TYPES.
+        workers: the maximum number of model calls run concurrently.
+    """
+    def __init__(self, model, executorType='thread', workers=None):
+        """Starts the executor.
+
+        Args:
+            model (src.model.Model): an initialized Colorgorical model.
+            executorType (str): whether to call the model in threads of this
+                process or in worker processes.
+            workers (int): the number of threads or processes. Defaults to the
+                CPU count.
+        """
+        assert executorType in EXECUTOR_TYPES
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+
+        self.model = model
+        self.executorType = executorType
+        self.workers = workers
+
+        if executorType == 'thread':
+            self._executor = concurrent.futures.ThreadPoolExecutor(workers)
+        else:
+            global workerModel
+            workerModel = model
+            self._executor = concurrent.futures.ProcessPoolExecutor(workers)
+            # Fork every worker now, before the IOLoop or any request thread
+            # is running, rather than on the first request
+            self._executor.submit(startWorker).result()
+
+    def submit(self, methodName, *args, **kwargs):
+        """Call a model method in the executor.
+
+        Args:
+            methodName (str): the name of the `Model` method to call.
+            *args: positional arguments of the method.
+            **kwargs: keyword arguments of the method.
+
+        Returns:
+            future (concurrent.futures.Future): the method's return value,
+                which Tornado coroutines can yield.
+        """
+        if self.executorType == 'thread':
+            return self._executor.submit(getattr(self.model, methodName),
+                *args, **kwargs)
+        return self._executor.submit(callWorkerModel, methodName, args, kwargs)
+
+    def shutdown(self):
+        """Stops the executor after its pending calls are done."""
+        self._executor.shutdown(wait=True)
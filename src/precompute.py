@@ -1,31 +1,68 @@
 """Precompute various Colorgorical model data for improved performance."""
-import os
+from itertools import combinations
+import json
 import numpy as np
 
-import model
+from model import colorSpace
+from model import model
+from model import pairScores
 
-def precomputeStartingColors():
-    """Precomputes the starting color sub-space.
+def precomputeStartingColors(outputPath=None):
+    """Precomputes the starting colors for the default filter settings.
 
-    Creates a list of all colors in a subspace of the default 8,325 CIE Lab
-    colors (http://dx.doi.org/10.1145/2207676.2208547). These colors are
-    separated every 15 units along the L, a, and b axis. This function also
-    precomputes all pairwise color scores between the colors. It precomputes
-    CIEDE2000 (perceptual distance), name difference (see above DOI), and
-    pair preference (http://www.ncbi.nlm.nih.gov/pmc/articles/PMC3037488/).
+    Starting colors are sampled from a subspace of the default 8,325 CIE Lab
+    colors (http://dx.doi.org/10.1145/2207676.2208547), in which colors are
+    separated every 15 units along the L, a, and b axis, and only depend on the
+    palette's filter settings. This function computes the starting colors of
+    every lightness range the client can request (i.e., multiples of 5) without
+    hue filters, so that the model can look them up rather than score all pairs
+    of the subspace for every palette.
 
-    Returns:
-        subspace (np.ndarray): the precomputed subspace
-        subspaceScores (np.ndarray): color scores between all color pairs
+    Args:
+        outputPath (str): the path of the `.npz` file to write. Defaults to
+            `model.STARTING_COLORS_PATH`.
     """
-    intervals = model.CIE_LAB_STARTING_SUBSPACE_INTERVALS
+    if outputPath is None:
+        outputPath = model.STARTING_COLORS_PATH
 
-    # Load the 8,325 color space into memory
-    filePrefix = os.path.dirname(os.path.realpath(__file__))
-    colorspacePath = os.path.join(public_root, '../data/allColors.csv')
-    colorSpaces = np.loadtxt(open(colorPath, 'rb'), delimiter=',')
+    # Avoid loading an out-of-date table into the model doing the computing
+    colorgorical = model.Model(startingColorsPath='')
 
-    isL = colorSpaces[np.any([colorSpaces[:,0] == l for l in intervals["L"]])]
-    isa = colorSpaces[np.any([colorSpaces[:,1] == a for a in intervals["a"]])]
-    isb = colorSpaces[np.any([colorSpaces[:,2] == b for b in intervals["b"]])]
-    subspace = colorSpaces[np.all(isL, isa, isb),:]
+    keys = []
+    colors = []
+    lightnesses = range(0, 105, 5)
+    for low, high in combinations(lightnesses, 2):
+        key = colorgorical.getStartingColorKey(lightnessRange=[low, high])
+        if key in keys:
+            continue
+        keys.append(key)
+        colors.append(colorgorical.computeStartingColors(key))
+
+    offsets = np.cumsum([0] + [c.shape[0] for c in colors])
+
+    np.savez(outputPath, keys=np.array(json.dumps(keys)), offsets=offsets,
+        colors=np.vstack(colors))
+
+
+def precomputePairScores(storageType='float32', outputPath=None, threads=1):
+    """Precomputes the pairwise scores of all colors in the 8,325-color space.
+
+    Scores every pair of colors with CIEDE2000, name difference, and pair
+    preference and writes them as memory-mappable upper-triangle matrices,
+    which the model uses to look up scores instead of computing them.
+
+    Args:
+        storageType (str): how scores are stored on disk. Either `float32`,
+            `float16`, or `uint16` (linearly quantized).
+        outputPath (str): the directory to write the table to. Defaults to
+            `model.PAIR_SCORES_PATH`.
+        threads (int): the number of threads to score pairs with.
+    """
+    if outputPath is None:
+        outputPath = model.PAIR_SCORES_PATH
+
+    colorSpaces = colorSpace.loadColorSpace(model.COLOR_SPACE_PATH,
+        model.COLOR_SPACE_CSV_PATH)["colorSpaces"]
+
+    pairScores.buildPairScores(colorSpaces[:,:3], outputPath,
+        storageType=storageType, threads=threads)
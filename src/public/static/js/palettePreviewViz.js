@@ -188,9 +188,10 @@ palettePreviews.cloneScatter = function(selection, colorScale) {
 ////////////////////////////////////////////////////////////////////////////////
 ////////////////////////////////////////////////////////////////////////////////
 // MAP DRAWING
-// Assumes topo data is previously loaded (e.g., in index.html)
-var us = ghostMapData.topo;
+// Assumes the map data URLs are set (e.g., in index.html)
 palettePreviews.drawMap = function() {
+  var us = ghostMapData.topo;
+
   function chart(selection) {
     selection.each(function(data) {
       var svg = d3.select(this)
@@ -232,10 +233,29 @@ palettePreviews.drawMap = function() {
 };
 
 
-var ghostMap = d3.select('body').append('div').datum(['']).call(palettePreviews.drawMap());
-d3.selectAll('.colorgoricalMap')
-    .attr('display', 'none')
-    .attr('visibility', 'hidden');
+var ghostMap;
+
+d3.json(ghostMapDataUrls.topo, function(error, topo) {
+  if(error) throw error;
+  ghostMapData.topo = topo;
+
+  ghostMap = d3.select('body').append('div').datum([''])
+      .call(palettePreviews.drawMap());
+  d3.selectAll('.colorgoricalMap')
+      .attr('display', 'none')
+      .attr('visibility', 'hidden');
+});
+
+d3.json(ghostMapDataUrls.unemployment, function(error, unemployment) {
+  if(error) throw error;
+  ghostMapData.unemployment = unemployment;
+
+  ghostMapData.unemployment.forEach(function(d) {
+    rateById.set(d.id, +d.rate);
+    // Adjust random numbers by .15 to fit within unemployment range
+    rateByRandom.set(d.id, Math.random()*.15);
+  });
+});
 
 
 palettePreviews.cloneMap = function(selection, colorScale) {
@@ -244,6 +264,9 @@ palettePreviews.cloneMap = function(selection, colorScale) {
           .domain([0, 0.15])
           .range(d3.range(numColors).map(function(i) { return i; }));
 
+  // Palettes made before the map data has loaded are shown without a map
+  if(ghostMap === undefined) return;
+
   var mapClone = ghostMap.select('.colorgoricalMap').node().cloneNode(true);
   selection.node().appendChild(mapClone);
 
@@ -5,15 +5,16 @@ all Colorgorical server requests. The Colorgorical model is initialized as the
 server is initialized.
 """
 
-import codecs
 import json
 import os
 import tornado.ioloop
+import tornado.template as template
 import tornado.web as web
 
 # from ..model.model.model import Model
-import handlers.main, handlers.template, handlers.makePalette, handlers.scorePalette
+import handlers.asset, handlers.main, handlers.template, handlers.makePalette, handlers.scorePalette
 from model import model
+import modelExecutor
 
 class ColorgoricalServer:
     """The tornado webserver for Colorgorical.
@@ -21,28 +22,72 @@ class ColorgoricalServer:
     Attributes:
         application: the initialized Tornado web server.
         model: an instantiation of the Colorgorical model.
+        executor: a `modelExecutor.ModelExecutor` that handlers call the model
+            in, keeping the IOLoop free to serve other requests.
+        comparison: the scores of the industry-standard palettes that users
+            compare their palettes with (see `handlers.scorePalette`).
     """
-    def __init__(self):
-        """Initializes the web server and pairs it with a Colorgorical model."""
-        self.model = model.Model()
+    def __init__(self, numPalettes=10, processes=0, scoreThreads=1,
+        executorType='thread', executorWorkers=None, production=False,
+        timeBudget=None):
+        """Initializes the web server and pairs it with a Colorgorical model.
+
+        Args:
+            numPalettes (int): the number of candidate palettes to make for
+                each palette request, of which the most preferable is returned.
+            processes (int): the number of worker processes to make candidate
+                palettes in. Palettes are made in the server process if 0.
+            scoreThreads (int): the number of threads the model scores with.
+            executorType (str): whether requests call the model in threads or
+                in worker processes (see `modelExecutor`).
+            executorWorkers (int): the number of requests that call the model
+                concurrently. Defaults to the CPU count.
+            production (bool): whether to serve in production mode, which
+                compiles templates and hashes static files once rather than
+                reloading them as they change in debug mode.
+            timeBudget (float): the most seconds a palette request may make
+                candidate palettes for (see `Model.makePreferablePalette`), or
+                None to always make numPalettes of them.
+        """
+        self.model = model.Model(scoreThreads=scoreThreads)
+        # Process executor workers are forked here, so they must be started
+        # before the palette pool, whose processes they could not use
+        self.executor = modelExecutor.ModelExecutor(self.model,
+            executorType=executorType, workers=executorWorkers)
+        if processes > 0:
+            self.model.startPalettePool(processes)
 
         thisFilePath = os.path.dirname(__file__)
         public_root = os.path.join(thisFilePath, 'public/static')
         template_root = os.path.join(thisFilePath, 'templates')
-        data_root = os.path.join(public_root, 'data')
-
-        # load the data used to generate the visualizations that preview palettes
-        static_data = {}
 
+        # load the data used to generate the visualizations that preview
+        # palettes, which the client fetches as cacheable, precompressed assets
         mapDataPath=os.path.join(thisFilePath,'data/map-us-counties.json')
         mapValuePath=os.path.join(thisFilePath,'data/map-us-unemployment.json')
 
+        mapData = dict(
+            topo=handlers.asset.Asset(mapDataPath),
+            unemployment=handlers.asset.Asset(mapValuePath)
+        )
+        assetOps = dict(
+            assets=dict([(a.fileName, a) for a in mapData.values()])
+        )
         mainOps = dict(
-            topoData=codecs.open(mapDataPath, 'r', 'utf-8').read(),
-            valueData=codecs.open(mapValuePath, 'r', 'utf-8').read()
+            mapDataUrls=dict([(name, a.url) for name, a in mapData.items()])
         )
         makePaletteOps = dict(
-            model=self.model
+            executor=self.executor,
+            numPalettes=numPalettes,
+            timeBudget=timeBudget
+        )
+        # The industry palette comparison never changes, so it is scored and
+        # rendered once rather than by every request
+        self.comparison = handlers.scorePalette.makeComparison(self.model)
+        scorePaletteOps = dict(
+            executor=self.executor,
+            comparisonResponse=handlers.scorePalette.makeComparisonResponse(
+                self.comparison, template.Loader(template_root))
         )
 
         handlerList = [
@@ -50,13 +95,16 @@ class ColorgoricalServer:
           (r'/(.*).html', handlers.template.TemplateHandler, mainOps),
           (r'/color/makePalette', handlers.makePalette.MakePaletteHandler, makePaletteOps),
         #   (r'/model', handler.ModelHandler, handlerOps),
-          (r'/color/scorePalette', handlers.scorePalette.ScorePaletteHandler, makePaletteOps),
-        #   (r'/data/(.*)',  web.StaticFileHandler, {'path': data_root}),
+          (r'/color/scorePalette', handlers.scorePalette.ScorePaletteHandler, scorePaletteOps),
+          (r'/color/scorePalettes', handlers.scorePalette.ScorePalettesHandler,
+              dict(executor=self.executor)),
+          (handlers.asset.ASSET_URL_PREFIX + r'(.*)',
+              handlers.asset.AssetHandler, assetOps),
           (r'/static/(.*)', web.StaticFileHandler, {'path': public_root})
         ]
 
         settings = dict(
-          debug=True,
+          debug=not production,
           template_path=template_root,
           static_path=public_root,
           static_url_prefix="/static/"
@@ -0,0 +1,333 @@
+"""Parity checks between Colorgorical's fast paths and their reference paths.
+
+Each check prints the largest difference it found and returns whether it is
+within tolerance. Checks can be run with `python run.py --verify <name>`.
+"""
+from collections import OrderedDict
+import numpy as np
+
+import modelExecutor
+from model import buildTables
+from model import model
+from model import neighborIndex
+from model import parallel
+from model import numpyColorgorical as npc
+from model.util import convert
+from model.util import jnd
+
+
+def printParity(title, difference, tolerance):
+    """Print the largest difference of a parity check and whether it passed."""
+    passed = difference <= tolerance
+    print '  %-40s max |diff| = %.3g  (%s)' % (title, difference,
+        'ok' if passed else 'FAILED')
+    return passed
+
+
+def nanDifference(a, b):
+    """The largest difference of two arrays, which must be NaN in the same
+    places (infinity if they are not)."""
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    isNaN = np.isnan(a)
+    if not np.array_equal(isNaN, np.isnan(b)):
+        return np.inf
+    if np.all(isNaN):
+        return 0.0
+    return np.max(np.abs(a[~isNaN] - b[~isNaN]))
+
+
+def verifyPairPreferenceTables(numPairs=10**6, tolerance=1e-6):
+    """Check pair preference lookups of on-lattice colors against conversion.
+
+    On-lattice colors look up their Illuminant C lightness and hue, whereas
+    off-lattice colors convert them on every call. Nudging the lightness of
+    every color by 1e-9 moves it off the lattice without changing its score
+    beyond rounding, so both paths must agree.
+    """
+    colorgorical = model.Model(pairScorePath='', startingColorsPath='')
+    labs = colorgorical.colorSpaces[:,:3]
+
+    randomState = np.random.RandomState(0)
+    pairs = np.hstack((labs[randomState.randint(labs.shape[0], size=numPairs)],
+        labs[randomState.randint(labs.shape[0], size=numPairs)]))
+    nudgedPairs = pairs + [1e-9, 0, 0, 1e-9, 0, 0]
+
+    lookedUp = npc.pairPreference(np.ascontiguousarray(pairs))[:,0]
+    converted = npc.pairPreference(np.ascontiguousarray(nudgedPairs))[:,0]
+
+    print 'pairPreference: %d pairs' % numPairs
+    return printParity('lattice table vs conversion',
+        np.max(np.abs(lookedUp - converted)), tolerance)
+
+
+def verifyNameDifferenceProduct(numColors=1000, tolerance=1e-6):
+    """Check name differences from name term vectors against `nameDifference`.
+
+    Compares `Model.nameDifferences` of all pairs of a random subset of colors
+    with the per-pair term loop of `npc.nameDifference`.
+    """
+    colorgorical = model.Model(pairScorePath='', startingColorsPath='')
+    labs = colorgorical.colorSpaces[:,:3]
+
+    idx = np.random.RandomState(0).choice(labs.shape[0], numColors, False)
+    i, j = [m.ravel() for m in np.meshgrid(idx, idx, indexing='ij')]
+
+    product = colorgorical.nameDifferences(idx, idx).ravel()
+    termLoop = npc.nameDifference(np.ascontiguousarray(
+        np.hstack((labs[i], labs[j]))))[:,0]
+
+    print 'nameDifference: %d pairs' % i.shape[0]
+    return printParity('term vector product vs term loop',
+        nanDifference(product, termLoop), tolerance)
+
+
+def verifyTables(tolerance=1e-4):
+    """Check the extension's table blobs against their C array literals.
+
+    Integer tables must match exactly; float32 tables may differ by rounding.
+    """
+    print 'numpyColorgorical tables'
+    return all([
+        printParity(name, difference, tolerance)
+        for name, difference in buildTables.compareTables()
+    ])
+
+
+def verifyNonMemberColors():
+    """Check that colors outside of the color space score safely.
+
+    Name difference and name uniqueness are only defined for colors in the
+    color space; other lattice colors (e.g., [30, 0, -40]) and colors off the
+    lattice must score NaN for them rather than read outside of the name
+    tables, while their other scores stay finite. Palettes started from such
+    colors must still be made in full.
+    """
+    colorgorical = model.Model(startingColorsPath='')
+    member = colorgorical.labs[0]
+    others = np.array([[30.0, 0.0, -40.0], [100.0, 100.0, 95.0],
+        [52.0, 3.0, -7.0], [110.0, -90.0, 100.0]])
+    assert np.all(colorgorical.getColorIndexes(others) < 0)
+
+    pairs = np.hstack((others, np.tile(member, (others.shape[0], 1))))
+    scores = npc.score(pairs)
+    nameUniquenesses = npc.nameUniqueness(others)[:,0]
+    palette = colorgorical.makePreferablePalette(4, 10,
+        startPalette=[[30, 0, -40]], seed=0)
+
+    print 'nonMemberColors: %d colors' % others.shape[0]
+    return all([
+        printParity('finite de, pp (non-finite count)',
+            np.sum(np.logical_not(np.isfinite(scores[:,[0,2]]))), 0),
+        printParity('NaN nd, nu (non-NaN count)',
+            np.sum(np.logical_not(np.isnan(scores[:,[1,3]]))) +
+            np.sum(np.logical_not(np.isnan(nameUniquenesses))), 0),
+        printParity('palette size shortfall', 4 - len(palette), 0)
+    ])
+
+
+def verifyScorePalettes(numPalettes=500, maxSize=12, tolerance=1e-9):
+    """Check batch palette scores against scoring each palette on its own.
+
+    Compares `Model.scorePalettes` of palettes of 2 to maxSize colors with the
+    `minScores` of `Model.scorePalette`. Neither model uses a pair score table,
+    so both compute every score. A fifth of the palettes have a lattice color
+    that is not in the color space, whose name scores must be NaN in both.
+    """
+    colorgorical = model.Model(pairScorePath='', startingColorsPath='')
+    labs = colorgorical.colorSpaces[:,:3]
+    nonMembers = np.argwhere(colorgorical.latticeIndex < 0) * \
+        model.CIE_LAB_LATTICE_STEP + model.CIE_LAB_LATTICE_ORIGIN
+
+    randomState = np.random.RandomState(0)
+    palettes = [labs[randomState.choice(labs.shape[0], size)] for size in
+        randomState.randint(2, maxSize + 1, size=numPalettes)]
+    for palette in palettes[::5]:
+        palette[randomState.randint(palette.shape[0])] = \
+            nonMembers[randomState.randint(nonMembers.shape[0])]
+    weights = {"ciede2000":1, "nameDifference":1, "nameUniqueness":1,
+        "pairPreference":1}
+
+    batch = colorgorical.scorePalettes(palettes, weights=weights)
+    single = [colorgorical.scorePalette(p, weights=weights)["minScores"]
+        for p in palettes]
+
+    print 'scorePalettes: %d palettes' % numPalettes
+    return all([
+        printParity(name + ': batch vs single', nanDifference(batch[name],
+            [s[name] for s in single]), tolerance)
+        for name in ["de", "nd", "pp", "nu"]
+    ])
+
+
+def verifyFilterIndex(numFilters=1000):
+    """Check filter index selections against comparing every color.
+
+    Draws random hue ranges (with fractional and wrapping bounds) and
+    lightness ranges, and counts the colors on which `FilterIndex.select`
+    and masks computed over the whole color space disagree.
+    """
+    colorgorical = model.Model(pairScorePath='', startingColorsPath='')
+    hues = colorgorical.colorSpaces[:,3]
+    lightnesses = colorgorical.labs[:,0]
+    isCandidate = np.logical_and(colorgorical.isRGB,
+        np.logical_not(colorgorical.isUgly))
+
+    randomState = np.random.RandomState(0)
+    mismatches = 0
+    for i in xrange(numFilters):
+        hueFilters = convert.convertHueRanges(randomState.uniform(-30, 390,
+            size=(randomState.randint(0, 4), 2)))
+        minLightness, maxLightness = np.sort(randomState.uniform(-5, 105, 2))
+
+        selected = np.zeros(hues.shape[0], dtype=bool)
+        selected[colorgorical.filterIndex.select(hueFilters,
+            (minLightness, maxLightness), ["isRGB", "isNotUgly"])] = True
+
+        expected = isCandidate & (lightnesses >= minLightness) & \
+            (lightnesses <= maxLightness)
+        if hueFilters.size > 0:
+            with np.errstate(invalid='ignore'):
+                expected &= np.any([(hues >= low) & (hues <= high)
+                    for low, high in hueFilters], axis=0)
+        mismatches += np.sum(selected != expected)
+
+    print 'filterIndex: %d filter settings' % numFilters
+    return printParity('bitsets vs masks (colors)', mismatches, 0)
+
+
+def verifyNeighborPruning(numTrials=200):
+    """Check lattice neighbor pruning against comparing every candidate.
+
+    Draws random candidate sets, colors, and noticeable difference intervals,
+    prunes the candidates near each color with a `NeighborIndex` (also after
+    compacting it), and counts the candidates on which it and comparing the
+    color against every candidate disagree.
+    """
+    colorgorical = model.Model(pairScorePath='', startingColorsPath='')
+    numColors = colorgorical.labs.shape[0]
+
+    randomState = np.random.RandomState(0)
+    mismatches = 0
+    for i in xrange(numTrials):
+        colorIdx = np.flatnonzero(randomState.random_sample(numColors) <
+            randomState.uniform(0.05, 1))
+        candidates = colorgorical.labs[colorIdx]
+        intervals = [d * 3 for d in jnd.cieLabJND(randomState.uniform(0.1, 2))]
+        neighbors = neighborIndex.NeighborIndex(
+            colorgorical.latticeCoordinates[colorIdx],
+            model.CIE_LAB_LATTICE_SHAPE, model.CIE_LAB_LATTICE_STEP, intervals)
+
+        for compact in [False, True]:
+            if compact:
+                isLive = randomState.random_sample(colorIdx.shape[0]) < 0.5
+                neighbors.compact(isLive)
+                colorIdx = colorIdx[isLive]
+                candidates = candidates[isLive]
+
+            colors = randomState.choice(numColors, 10)
+            isNear = np.zeros((colors.shape[0], colorIdx.shape[0]), dtype=bool)
+            rows, positions = neighbors.getNeighbors(neighbors.getCells(
+                colorgorical.latticeCoordinates[colors]))
+            isNear[rows, positions] = True
+
+            expected = np.all(np.absolute(candidates[np.newaxis,:,:] -
+                colorgorical.labs[colors][:,np.newaxis,:]) < intervals, axis=2)
+            mismatches += np.sum(isNear != expected)
+
+    print 'neighborPruning: %d candidate sets' % numTrials
+    return printParity('lattice neighbors vs masks (candidates)',
+        mismatches, 0)
+
+
+def pickMostPreferable(colorgorical, palettes):
+    """Pick the most preferable of the largest palettes, as
+    `makePreferablePalette` does."""
+    maxLen = max(len(p) for p in palettes)
+    palettes = np.array([p for p in palettes if len(p) == maxLen])
+    return palettes[np.argmax(colorgorical.lowestPairPreferences(palettes))]
+
+
+def verifyBranchAndBound(numSettings=40):
+    """Check that abandoning losing palettes never changes the picked one.
+
+    Picks the most preferable of every complete candidate palette of random
+    seeds, sizes, and filters, and counts how often `runPaletteTasks`, which
+    abandons palettes of the palette pool's tasks that fall behind, picks
+    another palette. `makePreferablePalette` without the pool grows every
+    palette in one task, which must match its complete palettes as well.
+    """
+    colorgorical = model.Model(startingColorsPath='')
+    filters = [dict(), dict(hueFilters=[[0, 90], [200, 300]]),
+        dict(lightnessRange=[60, 70]),
+        dict(startPalette=[[50, 20, 20], [70, -30, 10]])]
+
+    mismatches = 0
+    serialMismatches = 0
+    for seed in xrange(numSettings):
+        palSize = [3, 5, 8, 12][seed % 4]
+        kwargs = filters[(seed / 4) % len(filters)]
+
+        tasks = parallel.makeTasks(palSize, 10, seed, kwargs)
+        expected = pickMostPreferable(colorgorical, [p for task in tasks
+            for p in parallel.runTask(colorgorical, task)])
+        palette = pickMostPreferable(colorgorical, [p for taskPalettes in
+            colorgorical.runPaletteTasks(tasks, palSize) for p in taskPalettes])
+        mismatches += not np.array_equal(palette, expected)
+
+        task, = parallel.makeTasks(palSize, 10, seed, kwargs,
+            palettesPerTask=10)
+        expected = pickMostPreferable(colorgorical,
+            parallel.runTask(colorgorical, task))
+        palette = colorgorical.makePreferablePalette(palSize, 10, seed=seed,
+            **kwargs)
+        serialMismatches += not np.array_equal(palette, expected)
+
+    print 'branchAndBound: %d settings' % numSettings
+    return all([
+        printParity('abandoning vs complete (palettes)', mismatches, 0),
+        printParity('one task vs complete (palettes)', serialMismatches, 0)
+    ])
+
+
+def verifyProcessExecutor(workers=4):
+    """Check that unseeded palettes made in worker processes differ.
+
+    Worker processes are forked with the same global NumPy random state, so
+    palettes made without a seed in different workers must still be drawn
+    from different seeds.
+    """
+    colorgorical = model.Model(startingColorsPath='')
+    executor = modelExecutor.ModelExecutor(colorgorical, 'process', workers)
+    futures = [executor.submit('makePreferablePalette', 5, 10)
+        for i in xrange(2 * workers)]
+    palettes = [tuple(map(tuple, future.result())) for future in futures]
+    executor.shutdown()
+
+    print 'processExecutor: %d palettes in %d workers' % (len(palettes),
+        workers)
+    return printParity('duplicate unseeded palettes',
+        len(palettes) - len(set(palettes)), 0)
+
+
+CHECKS = OrderedDict([
+    ('pairPreferenceTables', verifyPairPreferenceTables),
+    ('nameDifferenceProduct', verifyNameDifferenceProduct),
+    ('tables', verifyTables),
+    ('nonMemberColors', verifyNonMemberColors),
+    ('scorePalettes', verifyScorePalettes),
+    ('filterIndex', verifyFilterIndex),
+    ('neighborPruning', verifyNeighborPruning),
+    ('branchAndBound', verifyBranchAndBound),
+    ('processExecutor', verifyProcessExecutor),
+])
+
+
+def run(name):
+    """Run a parity check by name, or all checks if name is 'all'.
+
+    Returns:
+        passed (bool): whether every check that ran passed.
+    """
+    names = CHECKS.keys() if name == 'all' else [name]
+    return all([CHECKS[checkName]() for checkName in names])